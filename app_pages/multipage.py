@@ -1,5 +1,12 @@
+import importlib
+import time
+
+import pandas as pd
 import streamlit as st
 
+from src import metrics
+from src.figure_cache import figure_cache
+
 
 class MultiPage:
     """
@@ -7,7 +14,9 @@ class MultiPage:
 
     Pages are stored as dictionaries with:
         "title": the sidebar label
-        "function": the function that renders the page
+        "function": the function that renders the page, or its import
+            path as "package.module:function_name". Pages registered by
+            path are only imported when first selected.
     """
     def __init__(self, app_name) -> None:
         self.pages = []
@@ -19,9 +28,22 @@ class MultiPage:
         )
 
     def add_page(self, title, func) -> None:
-        """Add a page to the app sidebar navigation."""
+        """
+        Add a page to the app sidebar navigation. `func` is the render
+        function or its "module:function" import path.
+        """
         self.pages.append({"title": title, "function": func})
 
+    @staticmethod
+    def page_function(page):
+        """Return the render function of a page, importing it if needed."""
+        func = page["function"]
+        if isinstance(func, str):
+            module_name, _, function_name = func.partition(":")
+            func = getattr(importlib.import_module(module_name),
+                           function_name)
+        return func
+
     def run(self):
         """Render the sidebar and run the selected page function."""
         st.title(self.app_name)
@@ -30,4 +52,48 @@ class MultiPage:
             self.pages,
             format_func=lambda page: page["title"],
         )
-        page["function"]()
+        render = self.page_function(page)
+        if not metrics.ENABLED:
+            render()
+            return
+
+        start = time.perf_counter()
+        try:
+            render()
+        finally:
+            metrics.PAGE_RENDER_SECONDS.observe(
+                time.perf_counter() - start, page=page["title"]
+            )
+            metrics.export()
+        if st.sidebar.checkbox("Show diagnostics"):
+            diagnostics_panel()
+
+
+def diagnostics_panel():
+    """Sidebar summary of the process-wide metrics (see src/metrics.py)."""
+    st.sidebar.caption("Diagnostics (this server process)")
+    for label, histogram in [
+        ("Page render (s)", metrics.PAGE_RENDER_SECONDS),
+        ("Loader I/O (s)", metrics.LOADER_SECONDS),
+        ("Prediction latency (s)", metrics.PREDICTION_SECONDS),
+        ("Prediction batch size", metrics.PREDICTION_BATCH_SIZE),
+    ]:
+        rows = histogram.summary()
+        if rows:
+            st.sidebar.write(f"**{label}**")
+            st.sidebar.dataframe(
+                pd.DataFrame(rows).round(4), hide_index=True
+            )
+
+    loaders = pd.DataFrame({
+        "rows": {dict(k)["loader"]: v
+                 for k, v in metrics.LOADER_ROWS.series.items()},
+        "bytes": {dict(k)["loader"]: v
+                  for k, v in metrics.LOADER_BYTES.series.items()},
+    })
+    if not loaders.empty:
+        st.sidebar.write("**Last loader result**")
+        st.sidebar.dataframe(loaders)
+
+    st.sidebar.write("**Figure cache**")
+    st.sidebar.json(figure_cache.stats(), expanded=False)
@@ -1,10 +1,60 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 from src.data_management import (
+    CLEANED_DATA_PATH, RAW_DATA_PATH, load_dataset_stats,
     load_electricity_data, load_electricity_data_raw)
+from src.dataset_stats import correlation_matrix
+from src.figure_cache import show_figure
+from src.model_registry import current_version, file_hash
+from src.plotting import (
+    DENSITY_THRESHOLD, importance_bars, scatter_or_density)
+from src.machine_learning.permutation_importance import (
+    importance_table, load_permutation_importance)
+from src.machine_learning.schema import INPUT_LABELS
+
+# Plotting libraries are imported inside the draw functions: they are
+# only loaded when a chart is not already in the figure cache.
+
+# Key takeaways: inputs named as the model's main drivers, and the test
+# R² drop below which an input counts as having little effect on its own
+TOP_DRIVERS = 4
+WEAK_DRIVER_R2 = 0.01
+
+
+def label_list(columns) -> str:
+    """Bold display labels joined as "A, B and C"."""
+    labels = [f"**{INPUT_LABELS[column]}**" for column in columns]
+    if len(labels) < 2:
+        return "".join(labels)
+    return f"{', '.join(labels[:-1])} and {labels[-1]}"
+
+
+def key_takeaways(summary: dict) -> str:
+    """
+    Takeaways from the serving model's stored permutation importance, so
+    the ranking they state is the one shown further down the page.
+    """
+    ranked = [row["input"] for row in summary["importances"]]
+    weak = [
+        row["input"] for row in summary["importances"][TOP_DRIVERS:]
+        if row["importance"] < WEAK_DRIVER_R2
+    ]
+    lines = [
+        "* Electricity cost generally increases with **site scale** and "
+        "**operational intensity**.",
+        f"* The inputs the trained model relies on most are "
+        f"{label_list(ranked[:TOP_DRIVERS])}: shuffling them costs the "
+        f"most accuracy on the test sites.",
+    ]
+    if weak:
+        lines.append(
+            f"* {label_list(weak)} add little on their own (under "
+            f"{WEAK_DRIVER_R2} test R² each), but can still refine "
+            f"estimates when combined with the others."
+        )
+    return "\n".join(lines)
 
 
 def page_cost_drivers_body():
@@ -24,27 +74,23 @@ def page_cost_drivers_body():
         "analysis."
     )
 
-    df = load_electricity_data()
-    df_raw = load_electricity_data_raw()
+    # Small precomputed summary; full datasets are only loaded by the
+    # sections that display row-level data.
+    stats = load_dataset_stats()
+    # Stored with the model version; only computed if missing or stale
+    importance = load_permutation_importance(current_version(), workers=1)
 
     st.write("---")
     st.write("### Key Takeaways")
 
-    st.success(
-        "* Electricity cost generally increases with **site scale** and "
-        "**operational intensity**.\n"
-        "* The strongest drivers observed were typically **site area**, "
-        "**water consumption**, **utilisation rate**, and **resident/occupant "
-        "count**.\n"
-        "* Some factors have weaker direct relationships, but still improve "
-        "estimates when combined."
-    )
+    st.success(key_takeaways(importance))
 
     st.write("---")
 
     with st.expander("Explore the analysis", expanded=False):
         # Preview of dataset (no engineered/encoded columns)
         if st.checkbox("Inspect dataset preview"):
+            df_raw = load_electricity_data_raw()
             base_cols = [
                 "site_area",
                 "structure_type",
@@ -73,16 +119,8 @@ def page_cost_drivers_body():
                 "a weaker relationship."
             )
 
-            numeric_cols = (
-                df
-                .select_dtypes(include=["int64", "float64"])
-                .columns
-                .tolist()
-            )
-
             corr = (
-                df[numeric_cols]
-                .corr(numeric_only=True)["electricity_cost"]
+                correlation_matrix(stats)["electricity_cost"]
                 .drop("electricity_cost")
                 .sort_values(key=lambda s: s.abs(), ascending=False)
             )
@@ -102,11 +140,19 @@ def page_cost_drivers_body():
             )
             top_corr = corr.abs().head(8).sort_values()
 
-            fig, axes = plt.subplots()
-            axes.barh(top_corr.index, top_corr.values)
-            axes.set_xlabel("Absolute correlation with electricity_cost")
-            axes.set_ylabel("Feature")
-            st.pyplot(fig)
+            def draw_top_correlations():
+                import matplotlib.pyplot as plt
+
+                fig, axes = plt.subplots()
+                axes.barh(top_corr.index, top_corr.values)
+                axes.set_xlabel("Absolute correlation with electricity_cost")
+                axes.set_ylabel("Feature")
+                return fig
+
+            show_figure(
+                ("top_correlations", tuple(top_corr.items())),
+                draw_top_correlations,
+            )
 
         # Structure type distribution
         if st.checkbox("Show structure type distribution"):
@@ -115,15 +161,23 @@ def page_cost_drivers_body():
                 "the dataset."
             )
 
-            counts = df_raw["structure_type"].value_counts()
+            counts = pd.Series(stats["value_counts"]["structure_type"])
+
+            def draw_structure_counts():
+                import matplotlib.pyplot as plt
 
-            fig, axes = plt.subplots(figsize=(6, 4))
-            axes.bar(counts.index, counts.values)
-            axes.set_title("Counts of Structure Type")
-            axes.set_xlabel("Structure type")
-            axes.set_ylabel("Number of sites")
-            plt.xticks(rotation=45, ha="right")
-            st.pyplot(fig)
+                fig, axes = plt.subplots(figsize=(6, 4))
+                axes.bar(counts.index, counts.values)
+                axes.set_title("Counts of Structure Type")
+                axes.set_xlabel("Structure type")
+                axes.set_ylabel("Number of sites")
+                plt.setp(axes.get_xticklabels(), rotation=45, ha="right")
+                return fig
+
+            show_figure(
+                ("structure_counts", tuple(counts.items())),
+                draw_structure_counts,
+            )
 
         # Residents vs no residents boxplot
         if st.checkbox(
@@ -135,45 +189,75 @@ def page_cost_drivers_body():
                 "industrial sites)."
             )
 
-            df_plot = df_raw.copy()
-            df_plot["Residents"] = df_plot["resident_count"].apply(
-                lambda x: "No residents" if x == 0 else "Has residents"
+            def draw_residents_boxplot():
+                import matplotlib.pyplot as plt
+                import seaborn as sns
+
+                df_raw = load_electricity_data_raw()
+                residents = np.where(
+                    df_raw["resident_count"] == 0,
+                    "No residents", "Has residents"
+                )
+
+                fig, ax = plt.subplots(figsize=(6, 4))
+                sns.boxplot(
+                    x=residents,
+                    y=df_raw["electricity_cost"],
+                    ax=ax
+                )
+                ax.set_title(
+                    "Electricity Cost: Sites With vs Without Residents"
+                )
+                ax.set_xlabel("Residents")
+                ax.set_ylabel("Electricity cost (USD)")
+                return fig
+
+            show_figure(
+                ("residents_boxplot", file_hash(RAW_DATA_PATH)),
+                draw_residents_boxplot,
             )
 
-            fig, ax = plt.subplots(figsize=(6, 4))
-            sns.boxplot(
-                data=df_plot,
-                x="Residents",
-                y="electricity_cost",
-                ax=ax
-            )
-            ax.set_title("Electricity Cost: Sites With vs Without Residents")
-            ax.set_ylabel("Electricity cost (USD)")
-            st.pyplot(fig)
-
-        # Feature importance (Notebook 04 outputs)
+        # Permutation importance of the serving model (stored per version)
         if st.checkbox("Show model-based cost drivers (feature importance)"):
-            version = "v1"
-            model_path = f"outputs/ml_pipeline/electricity_cost/{version}"
+            table = importance_table(importance)
 
             st.caption(
-                "This view shows which inputs the trained model relied on "
-                "most when producing estimates."
+                "This view shows which inputs the trained model relies on "
+                "most: each input is shuffled across the test sites and the "
+                "loss in accuracy (test R²) is measured."
             )
 
-            feat_imp = pd.read_csv(f"{model_path}/feature_importance.csv")
-            st.write("#### Feature importance table (top 10)")
-            st.dataframe(feat_imp.head(10))
+            st.write("#### Feature importance table")
+            st.dataframe(
+                table.round(4).rename(columns={
+                    "input": "Input",
+                    "importance": "Importance (R² drop)",
+                    "std": "Std over repeats",
+                    "ci_low": "95% CI low",
+                    "ci_high": "95% CI high",
+                }),
+                hide_index=True,
+            )
 
             st.caption(
-                "Higher importance means the model relied more on that "
-                "feature when making predictions. It does not indicate "
-                "whether the feature increases or decreases electricity cost."
+                "Higher importance means the estimates get worse when that "
+                "input is scrambled. It does not indicate whether the input "
+                "increases or decreases electricity cost."
             )
 
-            st.image(
-                f"{model_path}/feature_importance.png",
-                caption="Feature importance (Random Forest)"
+            def draw_importance():
+                import matplotlib.pyplot as plt
+
+                fig, ax = plt.subplots(figsize=(8, 5))
+                importance_bars(ax, table)
+                ax.set_title("Permutation importance (test set)")
+                fig.tight_layout()
+                return fig
+
+            show_figure(
+                ("permutation_importance",)
+                + tuple(importance["key"].values()),
+                draw_importance,
             )
 
         # Interactive Scatter plot (relationships)
@@ -192,7 +276,7 @@ def page_cost_drivers_body():
                 "air_quality_index",
                 "recycling_rate",
             ]
-            available = [c for c in candidates if c in df.columns]
+            available = [c for c in candidates if c in stats["columns"]]
 
             feature = st.selectbox("Choose a variable", options=available)
 
@@ -201,12 +285,29 @@ def page_cost_drivers_body():
                 "relationship; a more scattered cloud suggests a weaker "
                 "relationship."
             )
-
-            fig2, ax2 = plt.subplots()
-            ax2.scatter(df[feature], df["electricity_cost"], alpha=0.4)
-            ax2.set_xlabel(feature)
-            ax2.set_ylabel("electricity_cost (USD)")
-            st.pyplot(fig2)
+            if stats["rows"] > DENSITY_THRESHOLD:
+                st.caption(
+                    f"With more than {DENSITY_THRESHOLD:,} sites the plot "
+                    "shows how many sites fall in each cell instead of "
+                    "individual points."
+                )
+
+            def draw_scatter():
+                import matplotlib.pyplot as plt
+
+                df = load_electricity_data()
+                fig2, ax2 = plt.subplots()
+                scatter_or_density(
+                    ax2, df[feature], df["electricity_cost"], alpha=0.4
+                )
+                ax2.set_xlabel(feature)
+                ax2.set_ylabel("electricity_cost (USD)")
+                return fig2
+
+            show_figure(
+                ("scatter", file_hash(CLEANED_DATA_PATH), feature),
+                draw_scatter,
+            )
 
     st.caption(
         "Plots show patterns in the dataset. They help identify associations, "
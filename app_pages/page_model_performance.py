@@ -1,24 +1,90 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-
-from sklearn.metrics import (
-    r2_score, root_mean_squared_error, mean_absolute_error)
 
 from src.data_management import load_pkl_file
+from src.figure_cache import show_figure
+from src.model_registry import artifact_paths
+from src.plotting import importance_bars, scatter_or_density
+from src.machine_learning.evaluate import (
+    SUCCESS_R2, SUCCESS_RMSE, SUCCESS_MAE, FAIL_R2, FAIL_RMSE, GAP_THRESHOLD,
+    load_evaluation)
+from src.machine_learning.permutation_importance import (
+    importance_table, load_permutation_importance)
+from src.machine_learning.leaderboard import (
+    leaderboard_table, read_leaderboard)
+
+# Plotting libraries are imported inside the draw functions: they are
+# only loaded when a chart is not already in the figure cache.
+
+
+def leaderboard_section():
+    """
+    Show the published comparison of candidate models: accuracy next to
+    what each would cost to serve.
+    """
+    st.write("#### Candidate models: accuracy versus serving cost")
 
+    leaderboard = read_leaderboard()
+    if leaderboard is None:
+        st.caption(
+            "No leaderboard has been published yet. Run "
+            "`python -m src.machine_learning.leaderboard` to compare the "
+            "candidate models."
+        )
+        return
+
+    table = leaderboard_table(leaderboard)
+    st.dataframe(
+        pd.DataFrame({
+            "Model": table["model"],
+            "CV R²": table["cv_r2_mean"].round(4),
+            "Test RMSE": table["test_rmse"].round(1),
+            "Test MAE": table["test_mae"].round(1),
+            "Single-row latency (ms)": table["serving_latency_ms"].round(2),
+            "Batch rows/s": table["batch_rows_per_s"].round(),
+            "Artifact (MB)": table["artifact_mb"].round(2),
+            "Load time (ms)": table["load_time_ms"].round(1),
+            "Meets criteria": table["meets_success"].map(
+                {True: "✅", False: "⚠️"}
+            ),
+            "Best trade-off": table["pareto_optimal"].map(
+                {True: "✅", False: ""}
+            ),
+        }),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(
+        f"{leaderboard['cv_folds']}-fold cross-validated R² on the "
+        f"training split; test metrics, latency and throughput on the "
+        f"{leaderboard['test_rows']:,} test rows. Latency is per "
+        f"single-site call, through the compiled engine for forests. "
+        f"\"Best trade-off\" marks models that no other candidate beats on "
+        f"both accuracy and latency. Timings were measured on "
+        f"{leaderboard['machine']['cpu_count']} CPU(s) on "
+        f"{leaderboard['created'][:10]}."
+    )
 
-def regression_metrics(y_true, y_pred):
-    """
-    Helper function to compute regression metrics
+    def draw_trade_off():
+        import matplotlib.pyplot as plt
 
-    Returns:
-        tuple: (r2, rmse, mae)
-    """
-    r2 = r2_score(y_true, y_pred)
-    rmse = root_mean_squared_error(y_true, y_pred)
-    mae = mean_absolute_error(y_true, y_pred)
-    return r2, rmse, mae
+        fig, axes = plt.subplots(figsize=(6, 4))
+        axes.scatter(table["serving_latency_ms"], table["cv_r2_mean"],
+                     s=20 + 4 * table["artifact_mb"], color="tab:blue",
+                     alpha=0.6)
+        for _, row in table.iterrows():
+            axes.annotate(row["model"],
+                          (row["serving_latency_ms"], row["cv_r2_mean"]),
+                          xytext=(5, 5), textcoords="offset points",
+                          fontsize=8)
+        axes.set_xscale("log")
+        axes.set_xlabel("Single-row latency (ms, log scale)")
+        axes.set_ylabel("Cross-validated R²")
+        axes.set_title("Accuracy vs latency (marker size: artifact size)")
+        fig.tight_layout()
+        return fig
+
+    show_figure(("leaderboard", leaderboard["created"]), draw_trade_off)
 
 
 def page_model_performance_body():
@@ -44,16 +110,24 @@ def page_model_performance_body():
 
     st.write("---")
 
-    # Load model and saved train/test splits.
-    version = "v1"
-    model_path = f"outputs/ml_pipeline/electricity_cost/{version}"
+    # Stored evaluation of the current model version (recomputed only if
+    # the model or the saved train/test splits have changed).
+    evaluation, predictions = load_evaluation()
+    version = evaluation["version"]
+    metrics = evaluation["metrics"]
+    verdicts = evaluation["verdicts"]
 
-    model = load_pkl_file(f"{model_path}/random_forest_model.pkl")
+    test_rows = predictions[predictions["split"] == "test"]
+    y_test = test_rows["actual"]
+    y_test_pred = test_rows["predicted"]
+    # Identifies the model and splits the plots were drawn from
+    plot_key = (evaluation["key"]["model_hash"],
+                evaluation["key"]["splits_hash"])
 
-    X_train = pd.read_csv(f"{model_path}/X_train.csv")
-    X_test = pd.read_csv(f"{model_path}/X_test.csv")
-    y_train = pd.read_csv(f"{model_path}/y_train.csv").squeeze()
-    y_test = pd.read_csv(f"{model_path}/y_test.csv").squeeze()
+    st.caption(
+        f"Model version: `{version}` "
+        f"(artifact hash `{evaluation['key']['model_hash'][:12]}`)"
+    )
 
     st.write("#### Final Model Selection")
 
@@ -66,11 +140,12 @@ def page_model_performance_body():
 
     st.write("---")
 
-    y_train_pred = model.predict(X_train)
-    y_test_pred = model.predict(X_test)
-
-    r2_train, rmse_train, mae_train = regression_metrics(y_train, y_train_pred)
-    r2_test, rmse_test, mae_test = regression_metrics(y_test, y_test_pred)
+    r2_train = metrics["train"]["r2"]
+    rmse_train = metrics["train"]["rmse"]
+    mae_train = metrics["train"]["mae"]
+    r2_test = metrics["test"]["r2"]
+    rmse_test = metrics["test"]["rmse"]
+    mae_test = metrics["test"]["mae"]
 
     st.write("#### Performance summary (train vs test)")
 
@@ -98,23 +173,16 @@ def page_model_performance_body():
 
     st.write("#### Success criteria (from ML Business Case)")
 
-    # Success thresholds (test set)
-    success_r2 = 0.90
-    success_rmse = 300
-    success_mae = 250
-
-    # Failure thresholds
-    fail_r2 = 0.85
-    fail_rmse = 400
-    gap_threshold = 0.05
+    success_r2 = SUCCESS_R2
+    success_rmse = SUCCESS_RMSE
+    success_mae = SUCCESS_MAE
+    gap_threshold = GAP_THRESHOLD
 
-    meets_r2 = r2_test >= success_r2
-    meets_rmse = rmse_test <= success_rmse
-    meets_mae = mae_test <= success_mae
-    criteria_pass = meets_r2 and meets_rmse and meets_mae
-
-    train_test_gap = r2_train - r2_test
-    gap_ok = train_test_gap <= gap_threshold
+    meets_r2 = verdicts["meets_r2"]
+    meets_rmse = verdicts["meets_rmse"]
+    meets_mae = verdicts["meets_mae"]
+    train_test_gap = verdicts["train_test_gap"]
+    gap_ok = verdicts["gap_ok"]
 
     st.caption(
         f"Targets (test set): R² ≥ {success_r2}, RMSE ≤ {success_rmse} USD, "
@@ -122,18 +190,12 @@ def page_model_performance_body():
         f"gap ≤ {gap_threshold}. Guardrails are defined for R² and RMSE."
     )
 
-    failure_triggered = (
-        (r2_test < fail_r2)
-        or (rmse_test > fail_rmse)
-        or (not gap_ok)
-    )
-
-    if criteria_pass and gap_ok:
+    if verdicts["status"] == "pass":
         st.success(
             "The final model meets the success criteria on the held-out "
             "test set and shows no concerning train/test gap."
         )
-    elif failure_triggered:
+    elif verdicts["status"] == "fail":
         st.warning(
             "The model is below the minimum reliability guardrails "
             "and/or shows a large train/test gap."
@@ -168,9 +230,9 @@ def page_model_performance_body():
             ],
             "Status": [
                 "✅" if meets_r2
-                else ("❌" if r2_test < fail_r2 else "⚠️"),
+                else ("❌" if r2_test < FAIL_R2 else "⚠️"),
                 "✅" if meets_rmse
-                else ("❌" if rmse_test > fail_rmse else "⚠️"),
+                else ("❌" if rmse_test > FAIL_RMSE else "⚠️"),
                 "✅" if meets_mae
                 else "⚠️",
                 "✅" if gap_ok
@@ -196,7 +258,9 @@ def page_model_performance_body():
         )
 
         if st.checkbox("Show feature list"):
-            model_features = load_pkl_file(f"{model_path}/model_features.pkl")
+            model_features = load_pkl_file(
+                artifact_paths(version)["features"]
+            )
             st.write(model_features)
 
         st.write("---")
@@ -213,19 +277,29 @@ def page_model_performance_body():
                 "predictions. Larger deviations indicate higher uncertainty."
             )
 
-            fig, axes = plt.subplots(figsize=(6, 6,))
-            axes.scatter(y_test, y_test_pred, alpha=0.2, color="tab:blue")
-            axes.plot(
-                [y_test.min(), y_test.max()],
-                [y_test.min(), y_test.max()],
-                linestyle="--",
-                linewidth=1,
-                color="tab:orange"
+            def draw_actual_vs_predicted():
+                import matplotlib.pyplot as plt
+
+                fig, axes = plt.subplots(figsize=(6, 6,))
+                scatter_or_density(
+                    axes, y_test, y_test_pred, alpha=0.2, color="tab:blue"
+                )
+                axes.plot(
+                    [y_test.min(), y_test.max()],
+                    [y_test.min(), y_test.max()],
+                    linestyle="--",
+                    linewidth=1,
+                    color="tab:orange"
+                )
+                axes.set_xlabel("Actual electricity_cost (USD)")
+                axes.set_ylabel("Predicted electricity_cost (USD)")
+                axes.set_title("Actual vs Predicted (Test Set)")
+                return fig
+
+            show_figure(
+                ("actual_vs_predicted",) + plot_key,
+                draw_actual_vs_predicted,
             )
-            axes.set_xlabel("Actual electricity_cost (USD)")
-            axes.set_ylabel("Predicted electricity_cost (USD)")
-            axes.set_title("Actual vs Predicted (Test Set)")
-            st.pyplot(fig)
 
         if st.checkbox("Show residual distribution"):
             st.caption(
@@ -233,48 +307,76 @@ def page_model_performance_body():
                 "values. A roughly centred distribution suggests limited bias."
             )
 
-            residuals = y_test - y_test_pred
-            fig, axes = plt.subplots(figsize=(6, 4))
-            axes.hist(residuals, bins=40)
-            axes.set_xlabel("Residual (Actual - Predicted)")
-            axes.set_ylabel("Frequency")
-            axes.set_title("Residual Distribution (Test Set)")
-            st.pyplot(fig)
+            def draw_residuals():
+                import matplotlib.pyplot as plt
+
+                fig, axes = plt.subplots(figsize=(6, 4))
+                axes.hist(test_rows["residual"], bins=40)
+                axes.set_xlabel("Residual (Actual - Predicted)")
+                axes.set_ylabel("Frequency")
+                axes.set_title("Residual Distribution (Test Set)")
+                return fig
+
+            show_figure(("residuals",) + plot_key, draw_residuals)
 
         st.write("---")
 
         st.write("#### Feature importance (model-based cost drivers)")
         st.caption(
-            "Feature importance indicates which variables contributed most to "
-            "the model's predictions. It shows relative contribution, not "
-            "direction (increase/decrease)."
+            "Permutation importance: each input is shuffled across the test "
+            "set and the drop in test R² is measured, averaged over repeated "
+            "shuffles. Unlike the forest's impurity importance it is not "
+            "biased toward inputs with many distinct values, and inputs "
+            "encoded as several features (structure type) are shuffled "
+            "together. It shows relative contribution, not direction "
+            "(increase/decrease)."
         )
 
         if st.checkbox("Show feature importance"):
-            feat_imp = pd.read_csv(f"{model_path}/feature_importance.csv")
-            st.write("Top 10 features by importance:")
-            st.dataframe(feat_imp.head(10))
+            importance = load_permutation_importance(version, workers=1)
+            table = importance_table(importance)
+            st.dataframe(table.round(4), hide_index=True)
             st.caption(
-                "Higher values indicate greater contribution to predictions "
-                "within this model."
+                f"Baseline test R²: {importance['baseline_r2']:.4f}. The "
+                f"interval is the 95% confidence interval of the mean over "
+                f"{importance['key']['n_repeats']} shuffles."
             )
 
-            st.image(
-                f"{model_path}/feature_importance.png",
-                caption="Feature importance (Random Forest)"
+            def draw_importance():
+                import matplotlib.pyplot as plt
+
+                fig, axes = plt.subplots(figsize=(8, 5))
+                importance_bars(axes, table)
+                axes.set_title("Permutation importance (test set)")
+                fig.tight_layout()
+                return fig
+
+            show_figure(
+                ("permutation_importance",)
+                + tuple(importance["key"].values()),
+                draw_importance,
             )
 
     st.write("---")
 
+    leaderboard_section()
+
+    st.write("---")
+
     st.write("#### Limitations and Interpretation")
 
     st.info(
         "* Predictions are based on patterns in the historical dataset and "
         "should be treated as estimates.\n"
+        "* The range shown next to each prediction is the 10th to 90th "
+        "percentile of the individual trees' predictions. It shows how much "
+        "the trees disagree; it is not a calibrated confidence interval.\n"
         "* The model does not include external drivers such as tariffs, "
         "weather, equipment efficiency, or regional energy pricing.\n"
         "* Predictions are most reliable when inputs remain within the ranges "
-        "observed in the dataset.\n"
+        "observed in the dataset. The prediction page flags profiles that "
+        "are far from every training site, including unusual combinations "
+        "of otherwise typical values.\n"
         "* A Random Forest can slightly overfit; the train/test comparison "
         "above is included to monitor generalisation."
     )
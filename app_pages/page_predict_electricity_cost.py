@@ -1,10 +1,39 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import math
 
-from src.data_management import load_pkl_file, load_electricity_data
+from src.data_management import load_dataset_stats
+from src.dataset_stats import cost_quartiles
+from src.figure_cache import show_figure
+from src.model_registry import ENGINE_MAX_ROWS, get_model
+from src.plotting import waterfall
+from src.machine_learning.contributions import (
+    EXPLAIN_CHUNK_ROWS, get_explainer, input_contributions)
+from src.machine_learning.feature_engineering import PROFILE_COLUMNS
+from src.machine_learning.schema import INPUT_LABELS
 from src.machine_learning.predict_electricity_cost import (
-    prepare_features, predict_cost)
+    INTERVAL_QUANTILES, predict_cost_cached, prepare_features,
+    prepare_features_batch, predict_cost_batch,
+    predict_cost_batch_interval, sensitivity_sweep, canonical_profile)
+from src.machine_learning.comparable_sites import (
+    COMPARABLE_K, load_comparable_index)
+from src.machine_learning.support_index import load_support_index
+
+
+# Inputs offered in the what-if sweep, with their display labels
+SWEEP_FEATURES = {
+    "site_area": "Site area (m²)",
+    "utilisation_rate": "Utilisation rate (%)",
+    "resident_count": "Resident / occupant count",
+    "water_consumption": "Water consumption (liters/day)",
+}
+SWEEP_POINTS = 60
+# What-if curves kept per process (profile, input and model version)
+SWEEP_CACHE_ENTRIES = 256
+
+# Strongest inputs named in a prediction's interpretation
+DRIVERS_SHOWN = 4
 
 
 def round_up(n, base):
@@ -21,19 +50,31 @@ def round_up(n, base):
     return int(base * math.ceil(n / base))
 
 
-def interpret_prediction(prediction: float, dataset: pd.DataFrame):
+def input_bound(stats: dict, column: str, key: str, default: int) -> int:
+    """
+    Return an integer widget bound/default from the dataset statistics
+    artifact, or the fallback if the column is not summarised.
+    """
+    col_stats = stats["columns"].get(column)
+    return int(col_stats[key]) if col_stats else default
+
+
+def interpret_prediction(prediction: float, quartiles: tuple):
     """
     Provide a general interpretation of the predicted electricity cost
     based on quartiles and key cost drivers identified in analysis.
 
+    Args:
+        prediction (float): predicted monthly electricity cost.
+        quartiles (tuple): (q25, median, q75) of electricity_cost in the
+            dataset, from the statistics artifact.
+
     Returns:
         band (str): cost category label
         message (str): short interpretation message
     """
 
-    q1 = dataset["electricity_cost"].quantile(0.25)
-    q2 = dataset["electricity_cost"].quantile(0.50)
-    q3 = dataset["electricity_cost"].quantile(0.75)
+    q1, q2, q3 = quartiles
 
     if prediction <= q1:
         band = "Lower Cost Range"
@@ -66,6 +107,379 @@ def interpret_prediction(prediction: float, dataset: pd.DataFrame):
     return band, message
 
 
+def cost_bands(predictions, quartiles: tuple) -> np.ndarray:
+    """
+    Vectorised version of the band labels used by interpret_prediction,
+    for scoring many sites at once.
+    """
+    labels = np.array([
+        "Lower Cost Range",
+        "Below Median Cost",
+        "Above Median Cost",
+        "Higher Cost Range",
+    ])
+    # side="left" keeps values equal to a quartile in the lower band,
+    # matching the "<=" comparisons in interpret_prediction.
+    idx = np.searchsorted(np.asarray(quartiles), predictions, side="left")
+    return labels[idx]
+
+
+def sweep_values(stats: dict, feature: str,
+                 points: int = SWEEP_POINTS) -> np.ndarray:
+    """
+    Evenly spaced values across the range of `feature` in the dataset
+    (whole numbers only for resident_count).
+    """
+    col_stats = stats["columns"][feature]
+    values = np.linspace(col_stats["min"], col_stats["max"], points)
+    if feature == "resident_count":
+        values = np.unique(values.round().astype(int))
+    return values
+
+
+def support_section(loaded, X_live: pd.DataFrame):
+    """
+    Show how close the profile is to the sites the model was trained on,
+    with a warning when it is outside that data.
+    """
+    support = load_support_index(loaded.version).score(X_live).iloc[0]
+    if not support["outside_training_data"]:
+        st.caption(
+            f"Similar sites exist in the training data (support score "
+            f"{support['support_score']:.2f}; above 1 means unusual)."
+        )
+        return
+
+    reason = (
+        f"Outside the training range: {support['out_of_range_features']}."
+        if support["out_of_range_features"]
+        else "Each value is within the training ranges, but this "
+             "combination of values is rare in the data."
+    )
+    st.warning(
+        f"**This profile is unlike the sites the model was trained on** "
+        f"(support score {support['support_score']:.2f}; above 1 means "
+        f"further from the data than 99% of training sites). {reason} "
+        f"Treat the estimate with caution."
+    )
+
+
+def explain_inputs(loaded, X: pd.DataFrame):
+    """
+    Exact per-input contributions of the serving model for model-feature
+    rows, plus the average prediction they are measured from. Returns
+    (None, None) when the model can't be explained (no compiled forest,
+    or a compact artifact exported without node cover).
+    """
+    if loaded.engine is None or loaded.engine.cover is None:
+        return None, None
+
+    explainer = get_explainer(loaded.engine, loaded.model_hash)
+    contributions = input_contributions(
+        explainer.shap_values(X), loaded.model_features, index=X.index
+    )
+    return contributions, explainer.expected_value
+
+
+def explain_batch(loaded, X: pd.DataFrame):
+    """
+    `explain_inputs` for an uploaded file, EXPLAIN_CHUNK_ROWS rows at a
+    time so memory stays bounded however large it is, with a progress
+    bar.
+    """
+    if loaded.engine is None or loaded.engine.cover is None:
+        return None, None
+
+    progress = st.progress(0.0, text="Computing contributions...")
+    parts = []
+    for start in range(0, len(X), EXPLAIN_CHUNK_ROWS):
+        contributions, base = explain_inputs(
+            loaded, X.iloc[start:start + EXPLAIN_CHUNK_ROWS]
+        )
+        parts.append(contributions)
+        done = min(start + EXPLAIN_CHUNK_ROWS, len(X))
+        progress.progress(
+            done / len(X),
+            text=f"Computing contributions... {done:,} / {len(X):,} rows",
+        )
+    progress.empty()
+    return pd.concat(parts), base
+
+
+def contributions_section(loaded, user_inputs: dict,
+                          X_live: pd.DataFrame, message: str):
+    """
+    Show how each input moved this estimate away from the average
+    prediction, as a waterfall, and name this profile's strongest drivers
+    in the interpretation.
+    """
+    contributions, base = explain_inputs(loaded, X_live)
+    if contributions is None:
+        st.info(f"### Interpretation\n\n{message}")
+        st.caption(
+            f"Explanations are unavailable for model version "
+            f"`{loaded.version}`: it is not a compiled forest with node "
+            f"cover, so this estimate's drivers can't be computed."
+        )
+        return
+
+    contributions = contributions.iloc[0]
+    labels = [
+        f"{INPUT_LABELS[column]} = {user_inputs[column]}"
+        if isinstance(user_inputs[column], str)
+        else f"{INPUT_LABELS[column]} = {user_inputs[column]:,.0f}"
+        for column in contributions.index
+    ]
+
+    def draw_waterfall():
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(figsize=(7, 4.5))
+        waterfall(axes, base, contributions.to_numpy(), labels)
+        axes.set_xlabel("Predicted monthly electricity cost (USD)")
+        axes.set_title("How each input moves this estimate")
+        fig.tight_layout()
+        return fig
+
+    st.write("#### What drives this estimate")
+    show_figure(
+        ("waterfall", loaded.model_hash, canonical_profile(user_inputs)),
+        draw_waterfall,
+    )
+    st.caption(
+        f"Starting from the model's average prediction "
+        f"(\\${base:,.0f}), "
+        f"each bar is an input's exact Shapley contribution for this "
+        f"profile: red raises the estimate, green lowers it."
+    )
+
+    drivers = contributions.reindex(
+        contributions.abs().sort_values(ascending=False).index
+    ).head(DRIVERS_SHOWN)
+    lines = "\n".join(
+        f"- **{INPUT_LABELS[column]}**: "
+        f"{'+' if value >= 0 else '-'}\\${abs(value):,.0f}"
+        for column, value in drivers.items()
+    )
+    st.info(
+        f"### Interpretation\n\n"
+        f"{message}\n\n"
+        f"For this profile, the inputs that moved the estimate most from "
+        f"the average site were:\n"
+        f"{lines}\n\n"
+        f"Changes in these factors are likely to have the greatest "
+        f"impact on this site's predicted electricity expenditure."
+    )
+
+
+def comparable_sites_section(user_inputs: dict, prediction: float):
+    """
+    List the most similar historical sites (same structure type) with
+    their actual electricity cost, next to the estimate.
+    """
+    sites = load_comparable_index().query(
+        pd.DataFrame([user_inputs]), k=COMPARABLE_K
+    )
+    if sites.empty:
+        return
+
+    st.write(f"#### {len(sites)} most similar sites in the dataset")
+    columns = [
+        "electricity_cost", "site_area", "resident_count",
+        "utilisation_rate", "water_consumption", "recycling_rate",
+        "air_quality_index", "issue_resolution_time",
+    ]
+    table = sites[columns].round().astype(int)
+    table["distance"] = sites["distance"].round(2)
+    table = table.rename(columns={
+        "electricity_cost": "Actual cost (USD)",
+        "site_area": "Site area (m²)",
+        "resident_count": "Residents",
+        "utilisation_rate": "Utilisation (%)",
+        "water_consumption": "Water (l/day)",
+        "recycling_rate": "Recycling (%)",
+        "air_quality_index": "AQI",
+        "issue_resolution_time": "Issue resolution (h)",
+        "distance": "Distance",
+    })
+    st.dataframe(table, hide_index=True, use_container_width=True)
+
+    median = sites["electricity_cost"].median()
+    st.caption(
+        f"{user_inputs['structure_type']} sites only, ranked by distance "
+        f"over the standardised numeric inputs (0 = identical). Their "
+        f"median actual cost is ${median:,.0f}, against an estimate of "
+        f"${prediction:,.0f}."
+    )
+
+
+@st.cache_data(max_entries=SWEEP_CACHE_ENTRIES, show_spinner=False)
+def sweep_curve(profile: tuple, feature: str, values: np.ndarray,
+                model_hash: str, _loaded) -> pd.DataFrame:
+    """
+    `sensitivity_sweep` cached on the canonical profile, the swept input
+    and its values and the model's content hash (`_loaded` itself is not
+    hashed), so reruns that don't change them cost no predictions.
+    """
+    return sensitivity_sweep(
+        user_inputs=dict(profile),
+        feature=feature,
+        values=values,
+        model=_loaded.predictor(n_rows=len(values)),
+        model_features=_loaded.model_features
+    )
+
+
+def sensitivity_section(loaded, stats: dict, user_inputs: dict):
+    """
+    Render the what-if curve: the predicted cost as one input sweeps its
+    observed range while the rest of the profile stays as entered. The
+    sweep only runs once asked for, not on every rerun of the page.
+    """
+    if not st.toggle("Show the what-if curve"):
+        st.caption(
+            "Turn on to see how the estimate changes as one input sweeps "
+            "its observed range."
+        )
+        return
+
+    feature = st.selectbox(
+        "Input to vary",
+        options=list(SWEEP_FEATURES),
+        format_func=SWEEP_FEATURES.get,
+    )
+
+    values = sweep_values(stats, feature)
+    curve = sweep_curve(
+        canonical_profile(user_inputs), feature, values, loaded.model_hash,
+        loaded,
+    )
+
+    st.line_chart(
+        curve.set_index(feature),
+        x_label=SWEEP_FEATURES[feature],
+        y_label="Predicted monthly cost (USD)",
+    )
+
+    low = curve["predicted_electricity_cost"].min()
+    high = curve["predicted_electricity_cost"].max()
+    st.caption(
+        f"Your profile has {SWEEP_FEATURES[feature].lower()} = "
+        f"{user_inputs[feature]:,.0f}. Across the range seen in the data, "
+        f"and with everything else unchanged, the estimate moves between "
+        f"${low:,.0f} and ${high:,.0f}."
+    )
+
+
+def batch_prediction_section(loaded, quartiles):
+    """
+    Render the CSV upload/download mode: score every uploaded site profile
+    in a single model call and offer the results as a CSV download.
+    """
+    st.write("### Batch prediction (CSV upload)")
+
+    st.caption(
+        "Upload a CSV with one row per site and the columns: "
+        f"{', '.join(f'`{c}`' for c in PROFILE_COLUMNS)}. "
+        "Structure type must be one of Commercial, Residential, Mixed-use "
+        "or Industrial. Results include `prediction_low`/`prediction_high`, "
+        "the 10th–90th percentile across the model's trees, and "
+        "`outside_training_data` for profiles unlike the training data."
+    )
+
+    template = pd.DataFrame(columns=PROFILE_COLUMNS)
+    st.download_button(
+        "Download CSV template",
+        data=template.to_csv(index=False),
+        file_name="site_profiles_template.csv",
+        mime="text/csv",
+    )
+
+    uploaded = st.file_uploader("Site profiles CSV", type="csv")
+    explain = st.checkbox(
+        "Add per-input contributions (`contribution_<input>` columns "
+        "that sum with `average_prediction` to the estimate; about 20 ms "
+        "per row)"
+    )
+    if uploaded is None:
+        return
+
+    try:
+        site_profiles = pd.read_csv(uploaded)
+        if site_profiles.empty:
+            st.warning("The uploaded file contains no site profiles.")
+            return
+
+        X_batch = prepare_features_batch(
+            site_profiles=site_profiles,
+            model_features=loaded.model_features
+        )
+
+        results = site_profiles.copy()
+        model = loaded.predictor(n_rows=len(X_batch))
+        if model is loaded.engine:
+            # One pass over the stacked per-tree outputs gives the
+            # estimate and its interval
+            preds, low, high = predict_cost_batch_interval(
+                engine=model, X=X_batch
+            )
+            results["predicted_electricity_cost"] = preds.round(2)
+            results["prediction_low"] = low.round(2)
+            results["prediction_high"] = high.round(2)
+        else:
+            # Past the engine's crossover, sklearn scores faster; its
+            # per-tree interval would cost a second pass over every tree
+            preds = predict_cost_batch(model=model, X=X_batch)
+            results["predicted_electricity_cost"] = preds.round(2)
+
+        support = load_support_index(loaded.version).score(X_batch)
+    except (ValueError, TypeError) as e:
+        st.error(f"Could not score the uploaded file:\n\n{e}")
+        return
+
+    results["cost_category"] = cost_bands(
+        predictions=preds, quartiles=quartiles
+    )
+
+    results["support_score"] = support["support_score"].round(2)
+    results["outside_training_data"] = support["outside_training_data"]
+
+    if explain:
+        contributions, base = explain_batch(loaded, X_batch)
+        if contributions is None:
+            st.warning(
+                "This model version can't be explained; re-export its "
+                "compact artifact to add contributions."
+            )
+        else:
+            results["average_prediction"] = round(base, 2)
+            for column in PROFILE_COLUMNS:
+                results[f"contribution_{column}"] = (
+                    contributions[column].round(2)
+                )
+
+    st.success(f"Scored {len(results):,} site profiles.")
+    if "prediction_low" not in results:
+        st.caption(
+            f"Intervals are included for up to {ENGINE_MAX_ROWS:,} rows; "
+            f"larger files are scored with the faster batch model only."
+        )
+    outside = int(support["outside_training_data"].sum())
+    if outside:
+        st.warning(
+            f"{outside:,} profile(s) are unlike the training data "
+            "(`outside_training_data`); treat their estimates with caution."
+        )
+    st.dataframe(results.head(100))
+
+    st.download_button(
+        "Download predictions (CSV)",
+        data=results.to_csv(index=False),
+        file_name="electricity_cost_predictions.csv",
+        mime="text/csv",
+    )
+
+
 def page_predict_electricity_cost_body():
     """
     Render the Electricity Cost Prediction page.
@@ -85,14 +499,13 @@ def page_predict_electricity_cost_body():
 
     st.write("---")
 
-    version = "v1"
-    model_path = f"outputs/ml_pipeline/electricity_cost/{version}"
+    # Current model version from the registry (loaded once per process).
+    loaded = get_model()
+    model_features = loaded.model_features
 
-    model = load_pkl_file(f"{model_path}/random_forest_model.pkl")
-    model_features = load_pkl_file(f"{model_path}/model_features.pkl")
-
-    # load dataset
-    df = load_electricity_data()
+    # Precomputed dataset statistics (widget ranges and cost quartiles)
+    stats = load_dataset_stats()
+    quartiles = cost_quartiles(stats)
 
     st.write("### Site profile inputs")
 
@@ -105,27 +518,17 @@ def page_predict_electricity_cost_body():
     with col1:
         site_area = st.number_input(
             "Site area (m²)",
-            min_value=(
-                int(df["site_area"].min())
-                if "site_area" in df.columns
-                else 1
-            ),
-            max_value=(
-                int(df["site_area"].max())
-                if "site_area" in df.columns
-                else 20000
-            ),
-            value=(
-                int(df["site_area"].median())
-                if "site_area" in df.columns
-                else 2750
-            ),
+            min_value=input_bound(stats, "site_area", "min", 1),
+            max_value=input_bound(stats, "site_area", "max", 20000),
+            value=input_bound(stats, "site_area", "median", 2750),
             step=1,
         )
 
-        resident_min = int(df["resident_count"].min())
-        resident_max = round_up(df["resident_count"].max(), base=50)
-        resident_default = int(df["resident_count"].median())
+        resident_min = input_bound(stats, "resident_count", "min", 0)
+        resident_max = round_up(
+            stats["columns"]["resident_count"]["max"], base=50
+        )
+        resident_default = input_bound(stats, "resident_count", "median", 0)
 
         resident_count = st.number_input(
             "Resident / occupant count",
@@ -145,16 +548,14 @@ def page_predict_electricity_cost_body():
             "Utilisation rate (%)",
             min_value=0,
             max_value=100,
-            value=(
-                int(df["utilisation_rate"].median())
-                if "utilisation_rate" in df.columns
-                else 70
-            ),
+            value=input_bound(stats, "utilisation_rate", "median", 70),
         )
     with col2:
-        water_min = int(df["water_consumption"].min())
-        water_max = round_up(df["water_consumption"].max(), base=500)
-        water_default = int(df["water_consumption"].median())
+        water_min = input_bound(stats, "water_consumption", "min", 0)
+        water_max = round_up(
+            stats["columns"]["water_consumption"]["max"], base=500
+        )
+        water_default = input_bound(stats, "water_consumption", "median", 0)
 
         water_consumption = st.number_input(
             "Water consumption (liters/day)",
@@ -166,41 +567,17 @@ def page_predict_electricity_cost_body():
 
         issue_resolution_time = st.number_input(
             "Issue resolution time (hours)",
-            min_value=(
-                int(df["issue_resolution_time"].min())
-                if "issue_resolution_time" in df.columns
-                else 1
-            ),
-            max_value=(
-                int(df["issue_resolution_time"].max())
-                if "issue_resolution_time" in df.columns
-                else 72
-            ),
-            value=(
-                int(df["issue_resolution_time"].median())
-                if "issue_resolution_time" in df.columns
-                else 24
-            ),
+            min_value=input_bound(stats, "issue_resolution_time", "min", 1),
+            max_value=input_bound(stats, "issue_resolution_time", "max", 72),
+            value=input_bound(stats, "issue_resolution_time", "median", 24),
             step=1,
         )
 
         air_quality_index = st.number_input(
             "Air quality index (AQI)",
-            min_value=(
-                int(df["air_quality_index"].min())
-                if "air_quality_index" in df.columns
-                else 0
-            ),
-            max_value=(
-                int(df["air_quality_index"].max())
-                if "air_quality_index" in df.columns
-                else 500
-            ),
-            value=(
-                int(df["air_quality_index"].median())
-                if "air_quality_index" in df.columns
-                else 100
-            ),
+            min_value=input_bound(stats, "air_quality_index", "min", 0),
+            max_value=input_bound(stats, "air_quality_index", "max", 500),
+            value=input_bound(stats, "air_quality_index", "median", 100),
             step=5,
         )
 
@@ -208,11 +585,7 @@ def page_predict_electricity_cost_body():
             "Recycling rate (%)",
             min_value=0,
             max_value=100,
-            value=(
-                int(df["recycling_rate"].median())
-                if "recycling_rate" in df.columns
-                else 50
-            ),
+            value=input_bound(stats, "recycling_rate", "median", 50),
         )
 
     st.write("")
@@ -233,13 +606,15 @@ def page_predict_electricity_cost_body():
         st.write("### :bar_chart: Prediction Result")
 
         X_live = prepare_features(
-            user_inputs=user_inputs,
-            model_features=model_features
+            user_inputs=user_inputs, model_features=model_features
+        )
+        pred, low, high = predict_cost_cached(
+            user_inputs=user_inputs, loaded=loaded, X_live=X_live
         )
 
-        pred = predict_cost(model=model, X_live=X_live)
-
-        band, message = interpret_prediction(prediction=pred, dataset=df)
+        band, message = interpret_prediction(
+            prediction=pred, quartiles=quartiles
+        )
 
         colA, colB = st.columns(2)
         with colA:
@@ -248,6 +623,15 @@ def page_predict_electricity_cost_body():
                     label="Estimated monthly electricity cost (USD)",
                     value=f"${pred:,.2f}"
                 )
+                if low is not None:
+                    lower_pct, upper_pct = (
+                        round(q * 100) for q in INTERVAL_QUANTILES
+                    )
+                    st.caption(
+                        f"Likely range: **\\${low:,.0f} – \\${high:,.0f}** "
+                        f"({lower_pct}th–{upper_pct}th percentile of the "
+                        f"model's {loaded.engine.n_trees} trees)"
+                    )
         with colB:
             with st.container():
                 st.metric(
@@ -255,21 +639,25 @@ def page_predict_electricity_cost_body():
                     value=band
                 )
 
-        st.info(
-            f"### Interpretation\n\n"
-            f"{message}\n\n"
-            f"Based on the exploratory data analysis and Random Forest model, "
-            f"the strongest drivers of electricity cost were:\n"
-            f"- **Site area**\n"
-            f"- **Water consumption**\n"
-            f"- **Utilisation rate**\n"
-            f"- **Resident / occupant count**\n\n"
-            f"Changes in these factors are likely to have the greatest "
-            f"impact on predicted electricity expenditure."
+        support_section(loaded=loaded, X_live=X_live)
+
+        contributions_section(
+            loaded=loaded, user_inputs=user_inputs, X_live=X_live,
+            message=message,
         )
 
+        comparable_sites_section(user_inputs=user_inputs, prediction=pred)
+
         st.caption(
             "This prediction is an estimate based on patterns in the "
             "historical dataset. Actual costs may vary due to factors not "
             "included in the data."
         )
+
+    with st.expander("What-if: vary one input", expanded=False):
+        sensitivity_section(
+            loaded=loaded, stats=stats, user_inputs=user_inputs
+        )
+
+    with st.expander("Score many sites at once", expanded=False):
+        batch_prediction_section(loaded=loaded, quartiles=quartiles)
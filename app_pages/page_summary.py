@@ -1,5 +1,5 @@
 import streamlit as st
-from src.data_management import load_electricity_data
+from src.data_management import load_dataset_stats
 
 
 def page_summary_body():
@@ -43,10 +43,11 @@ def page_summary_body():
     st.write("---")
     st.write("### Dataset Snapshot")
 
-    df = load_electricity_data()
-    min_cost = df["electricity_cost"].min()
-    med_cost = df["electricity_cost"].median()
-    max_cost = df["electricity_cost"].max()
+    stats = load_dataset_stats()
+    cost = stats["columns"]["electricity_cost"]
+    min_cost = cost["min"]
+    med_cost = cost["median"]
+    max_cost = cost["max"]
 
     col1, col2, col3 = st.columns(3)
 
@@ -54,7 +55,7 @@ def page_summary_body():
         with st.container():
             st.metric(
                 "Number of sites",
-                f"{df.shape[0]:,}"
+                f"{stats['rows']:,}"
             )
 
     with col2:
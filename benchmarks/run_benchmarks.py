@@ -0,0 +1,338 @@
+"""
+Reproducible benchmarks for the prediction and data-loading hot paths.
+
+    python -m benchmarks.run_benchmarks --save benchmarks/baselines/local.json
+    python -m benchmarks.run_benchmarks \
+        --compare benchmarks/baselines/local.json --tolerance 0.25
+
+A run is flagged as a regression when a benchmark's median time exceeds
+the baseline median by more than the tolerance; the exit code is then 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from streamlit.testing.v1 import AppTest
+
+from src.data_management import (
+    load_compact_model, load_electricity_data, load_electricity_data_raw,
+    load_pkl_file)
+from src.model_registry import (
+    artifact_paths, current_version, get_model, serves_compact)
+from src.machine_learning.feature_engineering import (
+    PROFILE_COLUMNS, standardise_columns)
+from src.machine_learning.predict_electricity_cost import (
+    prepare_features, predict_cost, prepare_features_batch,
+    predict_cost_batch)
+
+
+GROUPS = ["prediction", "loading", "pages", "startup"]
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+RAW_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+
+PAGES = {
+    "summary": ("app_pages.page_summary", "page_summary_body"),
+    "hypothesis": ("app_pages.page_project_hypothesis",
+                   "page_project_hypothesis_body"),
+    "cost_drivers": ("app_pages.page_cost_drivers",
+                     "page_cost_drivers_body"),
+    "prediction": ("app_pages.page_predict_electricity_cost",
+                   "page_predict_electricity_cost_body"),
+    "model_performance": ("app_pages.page_model_performance",
+                          "page_model_performance_body"),
+}
+
+SAMPLE_PROFILE = {
+    "site_area": 2750.0,
+    "water_consumption": 3000.0,
+    "recycling_rate": 50.0,
+    "utilisation_rate": 65.0,
+    "air_quality_index": 100.0,
+    "issue_resolution_time": 36.0,
+    "resident_count": 100,
+    "structure_type": "Commercial",
+}
+
+
+def measure(func, repeats: int, warmup: int = 1, setup=None) -> dict:
+    """
+    Time `func` over `repeats` runs after `warmup` untimed runs. `setup`
+    (untimed) runs before every call, e.g. to clear a cache.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    times = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeats": repeats,
+    }
+
+
+def repeats_for(n_rows: int, base: int) -> int:
+    """Fewer repeats for the very large batch sizes."""
+    if n_rows >= 1_000_000:
+        return 1
+    if n_rows >= 10_000:
+        return max(3, base // 5)
+    return base
+
+
+def site_profiles(n_rows: int) -> pd.DataFrame:
+    """Sample `n_rows` raw site profiles (with replacement) from the data."""
+    raw = standardise_columns(pd.read_csv(RAW_PATH))[PROFILE_COLUMNS]
+    return raw.sample(n_rows, replace=True, random_state=0).reset_index(
+        drop=True
+    )
+
+
+def bench_prediction(repeats: int, sizes: list) -> dict:
+    loaded = get_model()
+    features = loaded.model_features
+    X_live = prepare_features(SAMPLE_PROFILE, features)
+
+    results = {
+        "prepare_features": measure(
+            lambda: prepare_features(SAMPLE_PROFILE, features), repeats * 10
+        ),
+    }
+    # A version served from its compact artifact has no sklearn model
+    if loaded.model is not loaded.engine:
+        results["predict_cost[sklearn]"] = measure(
+            lambda: predict_cost(loaded.model, X_live), repeats * 2
+        )
+    if loaded.engine is not None:
+        results["predict_cost[engine]"] = measure(
+            lambda: predict_cost(loaded.engine, X_live), repeats * 10
+        )
+
+    for n_rows in sizes:
+        profiles = site_profiles(n_rows)
+        n_repeats = repeats_for(n_rows, repeats)
+        X = prepare_features_batch(profiles, features)
+        model = loaded.predictor(n_rows)
+
+        results[f"prepare_features_batch[{n_rows}]"] = measure(
+            lambda: prepare_features_batch(profiles, features), n_repeats
+        )
+        results[f"predict_cost_batch[{n_rows}]"] = measure(
+            lambda: predict_cost_batch(model, X), n_repeats
+        )
+    return results
+
+
+def bench_loading(repeats: int) -> dict:
+    paths = artifact_paths(current_version())
+    results = {
+        "load_electricity_data": measure(load_electricity_data, repeats),
+        # cache_data would otherwise turn every call after the first into
+        # a cache lookup
+        "load_electricity_data_raw": measure(
+            load_electricity_data_raw, repeats,
+            setup=load_electricity_data_raw.clear,
+        ),
+    }
+    if serves_compact(paths):
+        results["load_compact_model"] = measure(
+            lambda: load_compact_model(paths["compact"]), repeats
+        )
+    # The pickle is a local training artifact, not shipped with the repo
+    if os.path.exists(paths["model"]):
+        results["load_pkl_file[model]"] = measure(
+            lambda: load_pkl_file(paths["model"]), max(1, repeats // 3)
+        )
+    return results
+
+
+def _render_page(module_name, function_name):
+    import importlib
+
+    getattr(importlib.import_module(module_name), function_name)()
+
+
+def bench_pages(repeats: int) -> dict:
+    results = {}
+    for name, (module_name, function_name) in PAGES.items():
+        def render():
+            app = AppTest.from_function(
+                _render_page, args=(module_name, function_name),
+                default_timeout=300,
+            )
+            app.run()
+            if app.exception:
+                raise RuntimeError(
+                    f"Page {name} raised: {app.exception[0].value}"
+                )
+        results[f"render[{name}]"] = measure(render, repeats)
+    return results
+
+
+# Runs in a fresh interpreter: first render of app.py (default page)
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=300)
+app.run()
+assert not app.exception, app.exception
+print(time.perf_counter() - start)
+"""
+
+
+def bench_startup(repeats: int) -> dict:
+    """
+    Cold start: a new process importing the app and rendering the default
+    page, timed end to end (process wall time) and in-process (first
+    render).
+    """
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    first_render = []
+
+    def cold_start():
+        output = subprocess.check_output(
+            [sys.executable, "-c", COLD_START_SCRIPT], env=env, text=True,
+            stderr=subprocess.DEVNULL,
+        )
+        first_render.append(float(output.split()[-1]))
+
+    results = {"cold_start[process]": measure(cold_start, repeats)}
+    # the warm-up run is not part of the measured repeats
+    times = first_render[1:]
+    results["cold_start[first_render]"] = {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeats": len(times),
+    }
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(groups: list, repeats: int, sizes: list) -> dict:
+    results = {}
+    if "prediction" in groups:
+        results.update(bench_prediction(repeats, sizes))
+    if "loading" in groups:
+        results.update(bench_loading(repeats))
+    if "pages" in groups:
+        results.update(bench_pages(repeats))
+    if "startup" in groups:
+        results.update(bench_startup(max(3, repeats // 2)))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return one row per benchmark present in both runs, with the ratio of
+    medians and whether it regressed beyond `tolerance`.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        rows.append({
+            "benchmark": name,
+            "baseline_s": base["median_s"],
+            "current_s": result["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def print_results(report: dict) -> None:
+    for name, result in report["results"].items():
+        print(
+            f"{name:<40} median {result['median_s'] * 1000:>10.3f} ms   "
+            f"min {result['min_s'] * 1000:>10.3f} ms   "
+            f"(n={result['repeats']})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark prediction, loading, page render and "
+                    "cold-start paths."
+    )
+    parser.add_argument(
+        "--groups", nargs="+", choices=GROUPS,
+        default=["prediction", "loading", "pages", "startup"],
+    )
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--sizes", type=int, nargs="+", default=BATCH_SIZES,
+                        help="Batch sizes for batch scoring.")
+    parser.add_argument("--save", help="Write the results as a JSON baseline.")
+    parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    report = run(args.groups, args.repeats, args.sizes)
+    print_results(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print(f"\nCompared with {args.compare} "
+              f"(tolerance {args.tolerance:.0%}):")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['benchmark']:<40} x{row['ratio']:.2f}  {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.hashing import file_hash
+
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 2
+
+# Rows parsed at a time when a store is built from a CSV
+CHUNK_ROWS = 50_000
+
+# CSV outputs that get a columnar copy when the store is (re)built.
+DATASET_CSVS = [
+    "inputs/datasets/raw/electricity_cost_dataset.csv",
+    "outputs/datasets/cleaned/ElectricityCostCleaned.csv",
+]
+SPLIT_FILES = ["X_train.csv", "X_test.csv", "y_train.csv", "y_test.csv"]
+
+
+def columnar_path(csv_path: str) -> str:
+    """Return the store directory that sits next to a CSV file."""
+    return f"{os.path.splitext(csv_path)[0]}.columnar"
+
+
+def write_columnar(df: pd.DataFrame, directory: str,
+                   source: str = None) -> None:
+    """
+    Write a DataFrame as one `.npy` file per column plus a JSON schema.
+
+    Text columns are stored as fixed-width unicode so every column can be
+    memory-mapped. If `source` is given, its content hash is recorded so
+    readers can tell when the CSV has been regenerated since.
+    """
+    write_columnar_chunks([df], directory, source)
+
+
+def write_columnar_chunks(chunks, directory: str,
+                          source: str = None) -> None:
+    """
+    Write a store from an iterable of DataFrame chunks with the same
+    columns, as `write_columnar` would from their concatenation. Each
+    chunk is saved as it arrives and the column files are assembled from
+    those parts one column at a time, so memory is bounded by the chunk
+    size rather than the table.
+    """
+    # A private build directory, so concurrent writers don't collide
+    tmp_dir = tempfile.mkdtemp(
+        prefix=f"{os.path.basename(directory)}.", suffix=".tmp",
+        dir=os.path.dirname(directory) or ".",
+    )
+    # mkdtemp creates it private; stores are read by other processes
+    os.chmod(tmp_dir, 0o755)
+    try:
+        _write_columns(chunks, tmp_dir, source)
+        # Swap the finished store into place so readers never see half
+        # of it.
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_columns(chunks, tmp_dir: str, source: str) -> None:
+    """Write the column files and schema of a store into `tmp_dir`."""
+    names, part_dtypes, rows = None, [], 0
+    for k, chunk in enumerate(chunks):
+        if names is None:
+            names = list(chunk.columns)
+        elif list(chunk.columns) != names:
+            raise ValueError(f"Chunk {k} has different columns")
+        dtypes = []
+        for i, name in enumerate(names):
+            values = chunk[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(f"{tmp_dir}/part_{k:05d}_{i:03d}.npy",
+                    np.ascontiguousarray(values))
+            dtypes.append(values.dtype)
+        part_dtypes.append(dtypes)
+        rows += len(chunk)
+
+    columns = []
+    for i, name in enumerate(names or []):
+        # The type every chunk fits in, as one parse of the whole CSV
+        # would infer it: ints and floats give floats, text stays text
+        dtype = np.result_type(*[dtypes[i] for dtypes in part_dtypes])
+        file_name = f"col_{i:03d}.npy"
+        column = np.lib.format.open_memmap(
+            f"{tmp_dir}/{file_name}", mode="w+", dtype=dtype,
+            shape=(rows,),
+        )
+        start = 0
+        for k in range(len(part_dtypes)):
+            part_path = f"{tmp_dir}/part_{k:05d}_{i:03d}.npy"
+            values = np.load(part_path)
+            column[start:start + len(values)] = values
+            start += len(values)
+            os.remove(part_path)
+        column.flush()
+        del column
+        columns.append(
+            {"name": name, "dtype": dtype.str, "file": file_name}
+        )
+
+    schema = {
+        "format": FORMAT_VERSION,
+        "rows": rows,
+        "columns": columns,
+        "source_hash": file_hash(source) if source else None,
+    }
+    with open(f"{tmp_dir}/{SCHEMA_FILE}", "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+
+
+def read_schema(directory: str) -> dict:
+    with open(f"{directory}/{SCHEMA_FILE}", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_columnar(directory: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    Read a store written by `write_columnar`. With `mmap`, columns are
+    memory-mapped read-only, so loading costs no parsing at all.
+    """
+    schema = read_schema(directory)
+    mmap_mode = "r" if mmap else None
+    data = {
+        col["name"]: np.load(f"{directory}/{col['file']}",
+                             mmap_mode=mmap_mode)
+        for col in schema["columns"]
+    }
+    # Fixed-width text is converted back to object strings for pandas.
+    for col in schema["columns"]:
+        if np.dtype(col["dtype"]).kind == "U":
+            data[col["name"]] = data[col["name"]].astype(object)
+    return pd.DataFrame(data, copy=False)
+
+
+def is_fresh(csv_path: str) -> bool:
+    """
+    True if a columnar copy of `csv_path` exists and still matches it.
+    Freshness is judged on the CSV's content hash, so a rewrite with the
+    same size is caught; the hash is memoised against size and mtime, so
+    after the first call this costs one stat().
+    """
+    directory = columnar_path(csv_path)
+    try:
+        schema = read_schema(directory)
+    except (FileNotFoundError, ValueError):
+        return False
+    if schema.get("format") != FORMAT_VERSION:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return schema.get("source_hash") == file_hash(csv_path)
+
+
+def read_table(csv_path: str) -> pd.DataFrame:
+    """
+    Read a dataset from its columnar copy when available and up to date.
+    Otherwise (re)build the copy chunk by chunk and read that, so the CSV
+    is never parsed whole; if the directory isn't writable, the CSV is
+    parsed into memory instead, and again next time.
+    """
+    if not is_fresh(csv_path):
+        try:
+            build_store(csv_path)
+        except OSError:
+            return pd.read_csv(csv_path)
+    return read_columnar(columnar_path(csv_path))
+
+
+def build_store(csv_path: str, chunk_rows: int = CHUNK_ROWS) -> str:
+    """
+    Write the columnar copy of a CSV next to it, parsing `chunk_rows`
+    rows at a time.
+    """
+    directory = columnar_path(csv_path)
+    with pd.read_csv(csv_path, chunksize=chunk_rows) as reader:
+        write_columnar_chunks(reader, directory, source=csv_path)
+    return directory
+
+
+def build_all(model_root: str = "outputs/ml_pipeline/electricity_cost"):
+    """Build columnar copies of the datasets and every version's splits."""
+    csv_paths = list(DATASET_CSVS)
+    if os.path.isdir(model_root):
+        for version in sorted(os.listdir(model_root)):
+            for file_name in SPLIT_FILES:
+                path = f"{model_root}/{version}/{file_name}"
+                if os.path.exists(path):
+                    csv_paths.append(path)
+
+    for path in csv_paths:
+        if os.path.exists(path):
+            print(f"{path} -> {build_store(path)}")
+
+
+if __name__ == "__main__":
+    build_all()
@@ -1,45 +1,34 @@
-import joblib
-import pandas as pd
 import streamlit as st
 
+from src import metrics
+from src.columnar_store import read_table
+from src.dataset_stats import read_dataset_stats, rebuild_dataset_stats
+from src.hashing import file_hash
+from src.machine_learning.schema import standardise_columns
+from src.machine_learning.tree_engine import CompiledForest
+
+
+RAW_DATA_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+CLEANED_DATA_PATH = "outputs/datasets/cleaned/ElectricityCostCleaned.csv"
+
 
 @st.cache_data
+@metrics.loader("raw_data")
 def load_electricity_data_raw():
     """
     Load the raw dataset for non-technical preview purposes,
     and standardise column names (including fixing known typos).
     """
-    file_path = "inputs/datasets/raw/electricity_cost_dataset.csv"
+    file_path = RAW_DATA_PATH
 
     try:
-        df = pd.read_csv(file_path)
+        df = read_table(file_path)
         if df.empty:
             st.error("Raw dataset is empty.")
             st.stop()
 
-        df.columns = (
-            df.columns.str.strip()
-            .str.lower()
-            .str.replace(" ", "_")
-        )
-
-        rename_map = {
-            "site_area": "site_area",
-            "structure_type": "structure_type",
-            "water_consumption": "water_consumption",
-            "recycling_rate": "recycling_rate",
-            "utilisation_rate": "utilisation_rate",
-            "air_qality_index": "air_quality_index",            # raw data typo
-            "issue reolution time": "issue_resolution_time",    # raw data typo
-            "resident_count": "resident_count",
-            "electricity_cost": "electricity_cost",
-        }
-
-        valid_renames = {
-            k: v for k, v in rename_map.items() if k in df.columns
-        }
-
-        df = df.rename(columns=valid_renames)
+        # snake_case headers and known raw typos, as in feature engineering
+        df = standardise_columns(df)
 
         return df
 
@@ -52,14 +41,15 @@ def load_electricity_data_raw():
         st.stop()
 
 
+@metrics.loader("cleaned_data")
 def load_electricity_data():
     """
     Load the cleaned dataset with standardised names and basic error handling.
     """
-    file_path = "outputs/datasets/cleaned/ElectricityCostCleaned.csv"
+    file_path = CLEANED_DATA_PATH
 
     try:
-        df = pd.read_csv(file_path)
+        df = read_table(file_path)
         if df.empty:
             st.error(
                 "Dataset is empty. Please rerun Notebook 01 (Data Collection)."
@@ -79,8 +69,64 @@ def load_electricity_data():
         st.stop()
 
 
+def load_dataset_stats():
+    """
+    Load the precomputed dataset statistics (ranges, quantiles, correlation
+    matrix, value counts). The cache is keyed on the cleaned CSV's content
+    hash, and the artifact is recomputed from the datasets if it is
+    missing or was built from a different cleaned CSV.
+    """
+    try:
+        source_hash = file_hash(CLEANED_DATA_PATH)
+    except FileNotFoundError:
+        source_hash = None
+    return _load_dataset_stats(source_hash)
+
+
+@st.cache_data
+def _load_dataset_stats(source_hash: str):
+    try:
+        stats = read_dataset_stats()
+    except FileNotFoundError:
+        stats = None
+
+    if stats is None or (
+        source_hash is not None and stats.get("source_hash") != source_hash
+    ):
+        stats = rebuild_dataset_stats()
+    return stats
+
+
+@metrics.loader("model_splits")
+def load_model_splits(model_path: str):
+    """
+    Load the saved train/test splits of a model version.
+
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test)
+    """
+    try:
+        X_train = read_table(f"{model_path}/X_train.csv")
+        X_test = read_table(f"{model_path}/X_test.csv")
+        y_train = read_table(f"{model_path}/y_train.csv").squeeze()
+        y_test = read_table(f"{model_path}/y_test.csv").squeeze()
+        return X_train, X_test, y_train, y_test
+
+    except FileNotFoundError as e:
+        st.error(
+            f"Train/test split not found: `{e.filename}`.\n\n"
+            "Please run Notebook 04 (Modelling & Evaluation)."
+        )
+        st.stop()
+
+
+@metrics.loader("pkl_file")
 def load_pkl_file(file_path: str):
     """Load a pickle file (model/features) with error handling."""
+    # joblib (and, via the unpickled model, scikit-learn) is only imported
+    # by the pages that need a pickle
+    import joblib
+
     try:
         return joblib.load(file_path)
 
@@ -94,3 +140,24 @@ def load_pkl_file(file_path: str):
     except Exception as e:
         st.error(f"Unexpected error while loading file:\n\n{e}")
         st.stop()
+
+
+@metrics.loader("compact_model")
+def load_compact_model(directory: str) -> CompiledForest:
+    """
+    Load a compact model artifact with its node arrays memory-mapped
+    instead of unpickling the full sklearn forest.
+    """
+    try:
+        return CompiledForest.load_compact(directory, mmap=True)
+
+    except FileNotFoundError:
+        st.error(
+            f"Compact model not found at `{directory}`.\n\n"
+            "Please run `python -m src.machine_learning.compact_model`."
+        )
+        st.stop()
+
+    except Exception as e:
+        st.error(f"Unexpected error while loading compact model:\n\n{e}")
+        st.stop()
@@ -0,0 +1,279 @@
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import CHUNK_ROWS, read_table
+from src.hashing import file_hash
+from src.machine_learning.schema import standardise_columns
+
+
+STATS_PATH = "outputs/datasets/cleaned/ElectricityCostStats.json"
+CLEANED_PATH = "outputs/datasets/cleaned/ElectricityCostCleaned.csv"
+RAW_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+
+# Columns the pages need summary statistics for (widget bounds, bands).
+SUMMARY_COLUMNS = [
+    "site_area",
+    "water_consumption",
+    "recycling_rate",
+    "utilisation_rate",
+    "air_quality_index",
+    "issue_resolution_time",
+    "resident_count",
+    "electricity_cost",
+]
+
+
+def row_slices(rows: int, chunk_rows: int = CHUNK_ROWS):
+    """Yield slices covering `rows` rows, `chunk_rows` at a time."""
+    for start in range(0, rows, chunk_rows):
+        yield slice(start, min(start + chunk_rows, rows))
+
+
+def order_statistics(values: np.ndarray, ranks, chunk_rows: int = CHUNK_ROWS,
+                     bins: int = 1024) -> dict:
+    """
+    Exact k-th smallest values (0-based ranks) of a 1D array of finite
+    numbers, read `chunk_rows` at a time so a memory-mapped column is
+    never loaded whole. Each pass histograms the interval known to hold a
+    rank and narrows it to one bin; once the interval holds no more than
+    a chunk of values, or a single repeated one, it is resolved.
+
+    Returns:
+        dict: value by rank.
+    """
+    low = min(values[s].min() for s in row_slices(len(values), chunk_rows))
+    high = max(values[s].max() for s in row_slices(len(values), chunk_rows))
+    # Per rank: the closed interval holding it, and how many values lie
+    # below the interval
+    pending = {k: (low, high, 0) for k in ranks}
+    found = {}
+    while pending:
+        counts = {k: np.zeros(bins, dtype=np.int64) for k in pending}
+        spans = {k: (np.inf, -np.inf) for k in pending}
+        for s in row_slices(len(values), chunk_rows):
+            chunk = values[s]
+            for k, (lo, hi, _) in pending.items():
+                inside = chunk[(chunk >= lo) & (chunk <= hi)]
+                if not len(inside):
+                    continue
+                # Bin j holds [edges[j], edges[j + 1]), the last one hi
+                # too; searchsorted copes with edges that coincide when
+                # the interval is a few floats wide
+                edges = np.linspace(lo, hi, bins + 1)
+                index = np.searchsorted(edges, inside, side="right") - 1
+                counts[k] += np.bincount(
+                    np.minimum(index, bins - 1), minlength=bins
+                )
+                spans[k] = (min(spans[k][0], inside.min()),
+                            max(spans[k][1], inside.max()))
+
+        gather = {}
+        for k, (lo, hi, below) in list(pending.items()):
+            if spans[k][0] == spans[k][1]:
+                found[k] = spans[k][0]
+                del pending[k]
+            elif counts[k].sum() <= chunk_rows:
+                gather[k] = pending.pop(k)
+            else:
+                edges = np.linspace(lo, hi, bins + 1)
+                j = int(np.searchsorted(
+                    below + np.cumsum(counts[k]), k, side="right"
+                ))
+                narrowed = (edges[j], edges[j + 1],
+                            below + int(counts[k][:j].sum()))
+                if narrowed[:2] == (lo, hi):
+                    gather[k] = pending.pop(k)
+                else:
+                    pending[k] = narrowed
+
+        for k, (lo, hi, below) in gather.items():
+            inside = np.sort(np.concatenate([
+                values[s][(values[s] >= lo) & (values[s] <= hi)]
+                for s in row_slices(len(values), chunk_rows)
+            ]))
+            found[k] = inside[k - below]
+    return found
+
+
+def quantiles(values: np.ndarray, qs, chunk_rows: int = CHUNK_ROWS) -> list:
+    """
+    Quantiles with linear interpolation, as `Series.quantile` computes
+    them, from the two order statistics around each position.
+    """
+    n = len(values)
+    positions = [q * (n - 1) for q in qs]
+    ranks = {int(np.floor(p)) for p in positions}
+    ranks |= {min(k + 1, n - 1) for k in ranks}
+    found = order_statistics(values, sorted(ranks), chunk_rows)
+    result = []
+    for p in positions:
+        k = int(np.floor(p))
+        pair = np.array([found[k], found[min(k + 1, n - 1)]], dtype=float)
+        # numpy's own interpolation between the pair, at the same fraction
+        result.append(float(np.quantile(pair, p - k)))
+    return result
+
+
+def compute_dataset_stats(df: pd.DataFrame, df_raw,
+                          chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Summarise the cleaned dataset (and the raw one for categorical counts)
+    into a small, JSON-serialisable dict.
+
+    The cleaned dataset is read `chunk_rows` rows at a time, so a
+    memory-mapped one (`read_table`) is never copied into memory whole;
+    its values are finite, as the pipeline validates them.
+
+    Args:
+        df: cleaned dataset (Notebook 03 output).
+        df_raw: raw dataset with standardised column names, or an
+            iterable of its chunks.
+    """
+    rows = df.shape[0]
+    columns = {}
+    for col in SUMMARY_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        total = sum(
+            int(values[s].sum()) if values.dtype.kind in "iub"
+            else float(values[s].sum())
+            for s in row_slices(rows, chunk_rows)
+        )
+        q25, q50, q75 = quantiles(values, [0.25, 0.50, 0.75], chunk_rows)
+        columns[col] = {
+            "min": float(min(values[s].min()
+                             for s in row_slices(rows, chunk_rows))),
+            "max": float(max(values[s].max()
+                             for s in row_slices(rows, chunk_rows))),
+            "mean": total / rows,
+            "median": q50,
+            "q25": q25,
+            "q75": q75,
+        }
+
+    # Selected by dtype rather than select_dtypes, which would copy a
+    # memory-mapped frame into one block
+    numeric_cols = [
+        col for col, dtype in df.dtypes.items()
+        if dtype in ("int64", "float64")
+    ]
+    corr = correlation(
+        [df[col].to_numpy() for col in numeric_cols], chunk_rows
+    )
+
+    if isinstance(df_raw, pd.DataFrame):
+        df_raw = [df_raw]
+    structure_type, residents = Counter(), Counter()
+    for chunk in df_raw:
+        structure_type.update(chunk["structure_type"].value_counts().to_dict())
+        # A text resident_count is not zero residents
+        no_residents = pd.to_numeric(
+            chunk["resident_count"], errors="coerce"
+        ).eq(0)
+        residents.update(no_residents.map(
+            {True: "No residents", False: "Has residents"}
+        ).value_counts().to_dict())
+
+    return {
+        "rows": int(rows),
+        "columns": columns,
+        "correlation": {
+            "columns": numeric_cols,
+            "matrix": corr.round(6).tolist(),
+        },
+        "value_counts": {
+            "structure_type": {
+                k: int(v) for k, v in structure_type.most_common()
+            },
+            "residents": {
+                k: int(v) for k, v in residents.most_common()
+            },
+        },
+    }
+
+
+def correlation(columns: list, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """
+    Pearson correlation matrix of numeric column arrays, from the column
+    means and then centred cross-products accumulated a chunk at a time.
+    """
+    rows = len(columns[0]) if columns else 0
+
+    def chunks():
+        for s in row_slices(rows, chunk_rows):
+            yield np.column_stack([values[s] for values in columns]).astype(
+                float
+            )
+
+    means = sum(chunk.sum(axis=0) for chunk in chunks()) / rows
+    products = np.zeros((len(columns), len(columns)))
+    for chunk in chunks():
+        chunk -= means
+        products += chunk.T @ chunk
+    scale = np.sqrt(np.diag(products))
+    # Constant columns correlate as NaN, as in DataFrame.corr
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return products / np.outer(scale, scale)
+
+
+def save_dataset_stats(stats: dict, file_path: str = STATS_PATH) -> None:
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, file_path)
+
+
+def read_dataset_stats(file_path: str = STATS_PATH) -> dict:
+    with open(file_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cost_quartiles(stats: dict) -> tuple:
+    """Return the (q25, median, q75) of electricity_cost."""
+    cost = stats["columns"]["electricity_cost"]
+    return cost["q25"], cost["median"], cost["q75"]
+
+
+def correlation_matrix(stats: dict) -> pd.DataFrame:
+    """Rebuild the stored correlation matrix as a DataFrame."""
+    corr = stats["correlation"]
+    return pd.DataFrame(
+        corr["matrix"], index=corr["columns"], columns=corr["columns"]
+    )
+
+
+def rebuild_dataset_stats(file_path: str = STATS_PATH,
+                          csv_path: str = CLEANED_PATH,
+                          raw_path: str = RAW_PATH,
+                          chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Recompute the statistics artifact from the dataset CSVs and save it,
+    recording the cleaned CSV's content hash it was computed from. The
+    cleaned data is read from its memory-mapped columnar copy and the raw
+    CSV in chunks, so memory is bounded by `chunk_rows`.
+    """
+    df = read_table(csv_path)
+    with pd.read_csv(raw_path, chunksize=chunk_rows) as reader:
+        stats = compute_dataset_stats(
+            df, map(standardise_columns, reader), chunk_rows
+        )
+    stats["source_hash"] = file_hash(csv_path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    save_dataset_stats(stats, file_path)
+    return stats
+
+
+def build_stats():
+    """Recompute the statistics artifact from the dataset CSVs."""
+    rebuild_dataset_stats()
+    print(f"Saved {STATS_PATH}")
+
+
+if __name__ == "__main__":
+    build_stats()
@@ -0,0 +1,101 @@
+import io
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+
+# Same output as st.pyplot's defaults
+PNG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+
+def render_png(fig) -> bytes:
+    """Render a matplotlib figure to PNG bytes and close it."""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, **PNG_OPTIONS)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of rendered figures (PNG bytes).
+
+    Keys should identify everything a plot depends on: the plot name, a
+    hash of the dataset or model it was drawn from and its parameters.
+    The cache is bounded by the total size of the stored images.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        """Return the cached PNG bytes, or None on a miss."""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key: tuple, png: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = png
+            self._size += len(png)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key: tuple, draw) -> bytes:
+        """
+        Return the PNG for `key`, calling `draw()` (which must return a
+        matplotlib figure) only on a miss. Data needed for the plot should
+        be loaded inside `draw`, so that a hit doesn't load it at all.
+        """
+        png = self.get(key)
+        if png is None:
+            png = render_png(draw())
+            self.put(key, png)
+        return png
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Shared by every session in the process.
+figure_cache = FigureCache()
+
+
+def show_figure(key: tuple, draw, cache: FigureCache = figure_cache):
+    """Display a cached figure in place of st.pyplot(draw())."""
+    st.image(cache.get_or_render(key, draw), use_container_width=True)
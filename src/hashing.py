@@ -0,0 +1,28 @@
+import hashlib
+import os
+
+
+# Digest per path with the (size, mtime) it was computed for. Shared by
+# every session in the process.
+_file_hashes = {}
+
+
+def file_hash(file_path: str) -> str:
+    """
+    SHA-256 of a file's content. The digest is memoised against the file's
+    size and mtime, so repeated calls only cost a stat().
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+
+    cached = _file_hashes.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    _file_hashes[file_path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
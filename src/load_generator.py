@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.machine_learning.schema import STRUCTURE_TYPES
+
+
+def random_profile(rng: random.Random) -> dict:
+    """Draw a site profile within the ranges seen in the training data."""
+    return {
+        "site_area": rng.randint(500, 5000),
+        "water_consumption": rng.randint(1000, 10000),
+        "recycling_rate": rng.randint(10, 90),
+        "utilisation_rate": rng.randint(30, 100),
+        "air_quality_index": rng.randint(0, 200),
+        "issue_resolution_time": rng.randint(1, 72),
+        "resident_count": rng.randint(0, 500),
+        "structure_type": rng.choice(STRUCTURE_TYPES),
+    }
+
+
+def post_json(url: str, payload: dict, timeout: float = 30.0) -> dict:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+
+def run_load(url: str, concurrency: int, requests: int,
+             seed: int = 0) -> dict:
+    """
+    Fire `requests` single-profile predictions from `concurrency` client
+    threads and summarise throughput, latency and the error rate. Latency
+    percentiles cover successful requests only, and are None if every
+    request failed.
+    """
+    rng = random.Random(seed)
+    profiles = [random_profile(rng) for _ in range(requests)]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def send(profile):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            post_json(url, profile)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, profiles))
+    wall = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        **{
+            f"p{q}_ms": (
+                round(float(np.percentile(lat_ms, q)), 2) if len(lat_ms)
+                else None
+            )
+            for q in (50, 95, 99)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load generator for the prediction service."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8502/predict")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 8, 32, 64],
+        help="One run per concurrency level."
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for level in args.concurrency:
+        print(json.dumps(run_load(args.url, level, args.requests, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
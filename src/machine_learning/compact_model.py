@@ -0,0 +1,192 @@
+"""
+Export a model version as a compact serving artifact and report what it
+saves.
+
+    python -m src.machine_learning.compact_model --version v1 --register \
+        --report
+
+The artifact (see CompiledForest.save_compact) keeps only what inference
+needs, in float32 where that is exact or close enough, and is loaded by
+memory-mapping instead of unpickling the sklearn forest. It is exported
+once, when a version is published (train.py does this for new versions),
+and committed with the version's manifest entry, so the app never builds
+it at start-up.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from src.data_management import load_model_splits, load_pkl_file
+from src.model_registry import (
+    COMPACT_DIR, artifact_paths, current_version, file_hash,
+    publish_version, read_manifest, version_path)
+from src.machine_learning.tree_engine import CompiledForest
+
+
+# Largest acceptable prediction difference (USD) from float32 leaf values
+PARITY_ATOL = 0.01
+
+# Run in a fresh interpreter so load time and RSS are not flattered by
+# modules or pages already in memory.
+LOAD_SCRIPT = """
+import sys, time
+import pandas as pd
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+kind, path, X_path = sys.argv[1:4]
+X = pd.read_csv(X_path)
+if kind == "pickle":
+    import joblib
+    import sklearn.ensemble
+    before = rss_mb()
+    start = time.perf_counter()
+    model = joblib.load(path)
+else:
+    from src.machine_learning.tree_engine import CompiledForest
+    before = rss_mb()
+    start = time.perf_counter()
+    model = CompiledForest.load_compact(path)
+load_s = time.perf_counter() - start
+loaded_rss = rss_mb()
+model.predict(X)
+print(load_s, loaded_rss - before, rss_mb() - before)
+"""
+
+
+def directory_size(path: str) -> int:
+    """Size in bytes of a file, or of all files in a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+    )
+
+
+def check_compact_parity(model, compact: CompiledForest, X) -> dict:
+    """
+    Compare the compact engine against `model.predict` on X. Thresholds
+    are rounded down to float32, so every row must reach exactly the same
+    leaves; only the float32 leaf values may differ slightly.
+    """
+    full = CompiledForest.from_sklearn(model)
+    same_leaves = bool(np.array_equal(full.leaves(X), compact.leaves(X)))
+    diff = np.abs(compact.predict(X) - np.asarray(model.predict(X)))
+    return {
+        "rows": len(X),
+        "same_leaves": same_leaves,
+        "max_abs_diff": float(diff.max()),
+        "parity": same_leaves and float(diff.max()) <= PARITY_ATOL,
+    }
+
+
+def measure_load(kind: str, path: str, X_path: str) -> dict:
+    """
+    Load time of one artifact in a fresh process, and the resident memory
+    it adds once loaded and after scoring the rows in `X_path` (which
+    pages in the memory-mapped arrays).
+    """
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    output = subprocess.check_output(
+        [sys.executable, "-c", LOAD_SCRIPT, kind, path, X_path],
+        env=env, text=True,
+    )
+    load_s, loaded_mb, scored_mb = map(float, output.split())
+    return {
+        "size_mb": round(directory_size(path) / 1024 ** 2, 2),
+        "load_s": round(load_s, 3),
+        "rss_after_load_mb": round(loaded_mb, 1),
+        "rss_after_predict_mb": round(scored_mb, 1),
+    }
+
+
+def register_compact(version: str) -> None:
+    """Point the version's manifest entry at its compact artifact."""
+    entry = dict(read_manifest()["versions"][version])
+    entry["compact"] = COMPACT_DIR
+    publish_version(
+        version, artifacts=entry, make_current=version == current_version()
+    )
+
+
+def export_compact(version: str = None, compress: bool = False,
+                   register: bool = False) -> dict:
+    """
+    Write the compact artifact of a version, check it against the sklearn
+    model on the saved splits and (optionally) serve it from now on.
+
+    Returns:
+        dict: parity results on the train and test splits.
+
+    Raises:
+        ValueError: if the compact artifact does not match the model.
+    """
+    version = version or current_version()
+    model_path = version_path(version)
+    paths = artifact_paths(version)
+
+    model = load_pkl_file(paths["model"])
+    directory = f"{model_path}/{COMPACT_DIR}"
+    CompiledForest.from_sklearn(model).save_compact(
+        directory, compress=compress,
+        source_model_hash=file_hash(paths["model"]),
+    )
+
+    compact = CompiledForest.load_compact(directory)
+    X_train, X_test, _, _ = load_model_splits(model_path)
+    parity = {
+        "train": check_compact_parity(model, compact, X_train),
+        "test": check_compact_parity(model, compact, X_test),
+    }
+    if not all(result["parity"] for result in parity.values()):
+        raise ValueError(f"Compact model does not match: {parity}")
+
+    if register:
+        register_compact(version)
+    return parity
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a slim, memory-mappable model artifact."
+    )
+    parser.add_argument("--version", default=None,
+                        help="Defaults to the current serving version.")
+    parser.add_argument("--compress", action="store_true",
+                        help="Compress the arrays (no memory-mapping).")
+    parser.add_argument("--register", action="store_true",
+                        help="Serve the version from the compact artifact.")
+    parser.add_argument("--report", action="store_true",
+                        help="Compare size, load time and RSS with the "
+                             "pickled model.")
+    args = parser.parse_args()
+
+    version = args.version or current_version()
+    parity = export_compact(version, args.compress, args.register)
+    print(json.dumps(parity, indent=2))
+    if not args.report:
+        return
+
+    X_path = f"{version_path(version)}/X_test.csv"
+    report = {
+        "pickle": measure_load(
+            "pickle", artifact_paths(version)["model"], X_path
+        ),
+        "compact": measure_load(
+            "compact", f"{version_path(version)}/{COMPACT_DIR}", X_path
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
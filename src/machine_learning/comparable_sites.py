@@ -0,0 +1,197 @@
+"""
+Comparable-sites lookup: the k historical sites most similar to a profile,
+with their actual electricity cost.
+
+    python -m src.machine_learning.comparable_sites
+
+The index is built once from the cleaned dataset and stored next to it
+as `comparable_sites.joblib`. It holds one KD-tree per structure type over
+the standardised numeric profile columns, so comparable sites always share
+the query's structure type and every lookup is a tree query (O(log n) per
+site) rather than a scan of the dataset.
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import CHUNK_ROWS, read_table
+from src.data_management import CLEANED_DATA_PATH
+from src.model_registry import file_hash
+from src.machine_learning.schema import (
+    NUMERIC_COLUMNS, STRUCTURE_DUMMIES, STRUCTURE_TYPES, TARGET)
+from src.machine_learning.stored_index import (
+    StoredIndex, load_stored_index, standard_scale)
+
+
+COMPARABLE_INDEX_PATH = "outputs/datasets/cleaned/comparable_sites.joblib"
+COMPARABLE_K = 5
+
+
+def structure_types(df: pd.DataFrame) -> np.ndarray:
+    """
+    Recover `structure_type` from the cleaned dataset's one-hot columns
+    (no dummy set means the dropped reference level, Commercial).
+    """
+    labels = np.array(["Commercial"] + STRUCTURE_DUMMIES, dtype=object)
+    dummies = df[[f"structure_type_{s}" for s in STRUCTURE_DUMMIES]]
+    onehot = dummies.to_numpy(dtype=bool)
+    return labels[np.where(onehot.any(axis=1), onehot.argmax(axis=1) + 1, 0)]
+
+
+class ComparableSites(StoredIndex):
+    """
+    Per-structure-type KD-trees over standardised numeric columns, with
+    the unscaled values and actual cost of every indexed site.
+    """
+
+    STATE = ("trees", "sites", "mean", "scale", "source_hash")
+
+    def __init__(self, trees, sites, mean, scale, source_hash=None):
+        self.trees = trees
+        self.sites = sites
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.source_hash = source_hash
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, source_hash: str = None,
+              chunk_rows: int = CHUNK_ROWS):
+        """
+        Index a cleaned-dataset DataFrame (features plus target). It is
+        read `chunk_rows` rows at a time and split by structure type as
+        it goes, so a memory-mapped frame is only copied once, into the
+        sites the index keeps.
+        """
+        from sklearn.neighbors import KDTree
+
+        parts = {label: [] for label in STRUCTURE_TYPES}
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            stype = structure_types(chunk)
+            values = chunk[NUMERIC_COLUMNS].to_numpy(dtype=float)
+            cost = chunk[TARGET].to_numpy(dtype=float)
+            for label in STRUCTURE_TYPES:
+                rows = np.flatnonzero(stype == label)
+                parts[label].append((start + rows, values[rows], cost[rows]))
+
+        sites = {}
+        for label in STRUCTURE_TYPES:
+            # Popped so each label's chunks are freed once joined
+            rows, values, cost = (
+                np.concatenate(arrays) for arrays in zip(*parts.pop(label))
+            )
+            if len(rows):
+                sites[label] = {"row": rows, "values": values, "cost": cost}
+        mean, scale = standard_scale(
+            [site["values"] for site in sites.values()]
+        )
+        trees = {
+            label: KDTree((site["values"] - mean) / scale)
+            for label, site in sites.items()
+        }
+        return cls(trees, sites, mean, scale, source_hash)
+
+    def query(self, site_profiles: pd.DataFrame,
+              k: int = COMPARABLE_K) -> pd.DataFrame:
+        """
+        Find the k most similar indexed sites for each profile (one tree
+        query per structure type present in the batch).
+
+        Args:
+            site_profiles: raw profiles with the columns in
+                PROFILE_COLUMNS (standardised names).
+
+        Returns:
+            DataFrame: k rows per profile, with `query` (position in
+            `site_profiles`), `rank`, `distance`, the site's dataset row,
+            its structure type, numeric columns and actual cost.
+        """
+        stype = site_profiles["structure_type"].astype(str).str.strip()
+        scaled = (
+            site_profiles[NUMERIC_COLUMNS].to_numpy(dtype=float) - self.mean
+        ) / self.scale
+
+        parts = []
+        for label in stype.unique():
+            if label not in self.trees:
+                continue
+            queries = np.flatnonzero(stype.to_numpy() == label)
+            sites = self.sites[label]
+            k_label = min(k, len(sites["row"]))
+            distance, neighbour = self.trees[label].query(
+                scaled[queries], k=k_label
+            )
+
+            neighbour = neighbour.ravel()
+            part = pd.DataFrame(
+                sites["values"][neighbour], columns=NUMERIC_COLUMNS
+            )
+            part.insert(0, "query", np.repeat(queries, k_label))
+            part.insert(1, "rank", np.tile(np.arange(1, k_label + 1),
+                                           len(queries)))
+            part.insert(2, "distance", distance.ravel())
+            part.insert(3, "dataset_row", sites["row"][neighbour])
+            part.insert(4, "structure_type", label)
+            part[TARGET] = sites["cost"][neighbour]
+            parts.append(part)
+
+        if not parts:
+            return pd.DataFrame(
+                columns=["query", "rank", "distance", "dataset_row",
+                         "structure_type"] + NUMERIC_COLUMNS + [TARGET]
+            )
+        return (
+            pd.concat(parts, ignore_index=True)
+            .sort_values(["query", "rank"], ignore_index=True)
+        )
+
+    @property
+    def size(self) -> int:
+        return sum(len(sites["row"]) for sites in self.sites.values())
+
+
+def build_comparable_index(
+    csv_path: str = CLEANED_DATA_PATH,
+    index_path: str = COMPARABLE_INDEX_PATH,
+) -> ComparableSites:
+    """Build and store the comparable-sites index of the cleaned data."""
+    index = ComparableSites.build(
+        read_table(csv_path), source_hash=file_hash(csv_path)
+    )
+    index.save(index_path)
+    return index
+
+
+def load_comparable_index(
+    csv_path: str = CLEANED_DATA_PATH,
+    index_path: str = COMPARABLE_INDEX_PATH,
+) -> ComparableSites:
+    """
+    Return the comparable-sites index, loaded once per process. It is
+    rebuilt if missing or built from a different cleaned dataset.
+    """
+    return load_stored_index(
+        ComparableSites, index_path, file_hash(csv_path),
+        lambda: build_comparable_index(csv_path, index_path),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the comparable-sites index of the cleaned data."
+    )
+    parser.add_argument("--input", default=CLEANED_DATA_PATH)
+    parser.add_argument("--output", default=COMPARABLE_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = build_comparable_index(args.input, args.output)
+    print(json.dumps({
+        label: len(sites["row"]) for label, sites in index.sites.items()
+    }, indent=2))
+    print(f"Indexed {index.size:,} sites in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
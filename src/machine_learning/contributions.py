@@ -0,0 +1,315 @@
+"""
+Exact per-feature contributions (path-dependent TreeSHAP values) of the
+forest's predictions, computed from the CompiledForest node arrays with
+NumPy only.
+
+For a leaf with value v and d distinct features on its path, let z_j be
+the product of the cover fractions of the path's splits on feature j and
+o_j(x) = 1 if x meets all of the path's conditions on j (else 0). The
+leaf adds to feature j's contribution
+
+    v * (o_j - z_j) * integral_0^1 prod_{k != j} (z_k (1 - u) + o_k u) du
+
+because the Shapley weights s! (d - s - 1)! / d! are Beta integrals. The
+integrand is a polynomial of degree d - 1 in u, so Gauss-Legendre
+quadrature with ceil(d / 2) nodes is exact. Leaves are grouped by d and
+each group is evaluated as arrays of shape (rows, leaves, d, nodes): the
+cost is linear in the number of leaves, with no per-row Python loop, but
+still about 20 ms per row for the shipped forest, so the app explains
+uploads EXPLAIN_CHUNK_ROWS rows at a time.
+
+The leaf table is not kept: each call walks TREES_PER_GROUP trees at a
+time from the forest's (memory-mapped) node arrays, explains the rows
+with their leaves and drops them. Walking the whole forest takes about
+0.3 s, while holding its table would take 80 MB and twice that to build.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.schema import PROFILE_COLUMNS, profile_input
+from src.machine_learning.tree_engine import float32_floor
+
+
+# Elements per (path features x nodes x leaves x rows) work array, and
+# rows explained together
+BLOCK_ELEMENTS = 1 << 18
+ROW_BLOCK = 256
+
+# Rows from which a block's contributions are summed into model features
+# with a one-hot matmul rather than np.bincount
+ONEHOT_MIN_ROWS = 16
+
+# Trees walked together when building the leaf table (bounds its memory)
+TREES_PER_GROUP = 5
+
+# Rows the app explains per call (about 10 s on one core), so the
+# contributions of a large upload are computed in bounded memory
+EXPLAIN_CHUNK_ROWS = 500
+
+_lock = threading.Lock()
+_explainers = {}
+
+
+def quadrature(d: int) -> tuple:
+    """Gauss-Legendre nodes and weights on [0, 1], exact to degree d - 1."""
+    nodes, weights = np.polynomial.legendre.leggauss(max(1, (d + 1) // 2))
+    return (nodes + 1) / 2, weights / 2
+
+
+def leaf_paths(forest, roots, n_features: int) -> dict:
+    """
+    Walk the trees starting at `roots` top-down, level by level, and
+    record for each leaf the interval (lo, hi] its path allows for each
+    feature, the product of cover fractions of the path's splits on that
+    feature and whether the feature is on the path at all.
+
+    Returns:
+        dict: leaf `value` (n_leaves,) and dense (n_leaves, n_features)
+        arrays `lo`, `hi`, `z` and `on_path`.
+    """
+    nodes = np.asarray(roots)
+    shape = (len(nodes), n_features)
+    state = {
+        "lo": np.full(shape, -np.inf),
+        "hi": np.full(shape, np.inf),
+        "z": np.ones(shape),
+        "on_path": np.zeros(shape, dtype=bool),
+    }
+    leaves = {"node": [], **{name: [] for name in state}}
+
+    while len(nodes):
+        is_leaf = np.asarray(forest._is_leaf[nodes])
+        leaves["node"].append(nodes[is_leaf])
+        for name, values in state.items():
+            leaves[name].append(values[is_leaf])
+
+        nodes = nodes[~is_leaf]
+        state = {name: values[~is_leaf] for name, values in state.items()}
+        rows = np.arange(len(nodes))
+        feature = np.asarray(forest.feature[nodes])
+        threshold = np.asarray(forest.threshold[nodes], dtype=np.float64)
+        cover = np.asarray(forest.cover[nodes], dtype=np.float64)
+        left = np.asarray(forest.left[nodes])
+        right = np.asarray(forest.right[nodes])
+
+        # left child: x <= threshold, right child: x > threshold
+        on_left = {name: values.copy() for name, values in state.items()}
+        on_right = state
+        on_left["hi"][rows, feature] = np.minimum(
+            on_left["hi"][rows, feature], threshold
+        )
+        on_right["lo"][rows, feature] = np.maximum(
+            on_right["lo"][rows, feature], threshold
+        )
+        on_left["z"][rows, feature] *= forest.cover[left] / cover
+        on_right["z"][rows, feature] *= forest.cover[right] / cover
+        on_left["on_path"][rows, feature] = True
+        on_right["on_path"][rows, feature] = True
+
+        nodes = np.concatenate([left, right])
+        state = {
+            name: np.concatenate([on_left[name], on_right[name]])
+            for name in state
+        }
+
+    node = np.concatenate(leaves["node"])
+    return {
+        "value": np.asarray(forest.value[node], dtype=np.float64),
+        **{name: np.concatenate(leaves[name]) for name in state},
+    }
+
+
+def leaf_groups(paths: dict) -> dict:
+    """
+    Group the leaves of `leaf_paths` by the number d of distinct features
+    on their path, keeping per leaf only those d features: their index,
+    interval, cover fraction product and the leaf value.
+
+    Returns:
+        dict: arrays by d, in increasing order of d.
+    """
+    groups = {}
+    depth = paths["on_path"].sum(axis=1)
+    for d in np.unique(depth[depth > 0]):
+        leaves = np.flatnonzero(depth == d)
+        feature = np.nonzero(paths["on_path"][leaves])[1]
+        feature = feature.reshape(len(leaves), d)
+        rows = leaves[:, None]
+        groups[int(d)] = {
+            "feature": feature.astype(np.int32),
+            # exact on float32 inputs, see float32_floor
+            "lo": float32_floor(paths["lo"][rows, feature]),
+            "hi": float32_floor(paths["hi"][rows, feature]),
+            "z": paths["z"][rows, feature],
+            "value": paths["value"][leaves],
+        }
+    return groups
+
+
+class ForestExplainer:
+    """
+    Exact contributions of a CompiledForest's predictions, computed from
+    its node arrays a group of trees at a time.
+
+    Raises:
+        ValueError: if the forest has no node cover (a compact artifact
+            exported before cover was stored).
+    """
+
+    def __init__(self, forest):
+        if forest.cover is None:
+            raise ValueError(
+                "The model has no node cover; re-export it to explain "
+                "predictions."
+            )
+        self.forest = forest
+        self.feature_names = forest.feature_names
+        self.n_features = (
+            len(forest.feature_names) if forest.feature_names is not None
+            else int(np.max(forest.feature)) + 1
+        )
+        self.expected_value = sum(
+            float(paths["value"] @ paths["z"].prod(axis=1))
+            for paths in self.tree_paths()
+        ) / forest.n_trees
+
+    def tree_paths(self):
+        """Yield the `leaf_paths` of TREES_PER_GROUP trees at a time."""
+        roots = self.forest.roots
+        for start in range(0, self.forest.n_trees, TREES_PER_GROUP):
+            yield leaf_paths(
+                self.forest, roots[start:start + TREES_PER_GROUP],
+                self.n_features,
+            )
+
+    def shap_values(self, X) -> np.ndarray:
+        """
+        Contributions of every feature to every row's prediction, shape
+        (n_rows, n_features). For each row, `expected_value` plus the
+        row's contributions equals the forest's prediction.
+
+        Memory is bounded by one group of trees' leaves and the rows
+        passed in; callers with many rows pass them in chunks.
+        """
+        X = self.forest._as_matrix(X).astype(np.float32)
+        phi = np.zeros((self.n_features, len(X)))
+        X_blocks = [
+            (r0, np.ascontiguousarray(X[r0:r0 + ROW_BLOCK].T))
+            for r0 in range(0, len(X), ROW_BLOCK)
+        ]
+
+        for paths in self.tree_paths():
+            for d, group in leaf_groups(paths).items():
+                u, w = quadrature(d)
+                for r0, X_block in X_blocks:
+                    leaf_block = max(
+                        1, BLOCK_ELEMENTS // (d * len(u) * X_block.shape[1])
+                    )
+                    for l0 in range(0, len(group["value"]), leaf_block):
+                        part = {
+                            name: values[l0:l0 + leaf_block]
+                            for name, values in group.items()
+                        }
+                        phi[:, r0:r0 + ROW_BLOCK] += self._block(
+                            X_block, part, u, w
+                        )
+
+        return phi.T / self.forest.n_trees
+
+    def _block(self, X_block, part, u, w) -> np.ndarray:
+        """
+        Contributions of one block of leaves with the same path length d
+        to a block of rows, shape (n_features, rows).
+
+        Each path feature's factor at quadrature node u is z (1 - u) if
+        the row doesn't meet its conditions and z (1 - u) + u if it does,
+        so the log of their product is a fixed per-leaf term plus the
+        (d,) met indicators times a (nodes, d) matrix: one batched matmul
+        over the block's leaves instead of d elementwise passes. The leaf
+        values are folded into the per-leaf weights, and the (leaves, d,
+        rows) arrays are updated in place.
+        """
+        feature = part["feature"]
+        z = part["z"][:, None, :]
+        value = part["value"]
+        n_leaves, d = feature.shape
+        n_rows = X_block.shape[1]
+
+        # (leaves, d, rows): does the row meet the path's conditions?
+        x = X_block[feature]
+        met = (
+            (x > part["lo"][..., None]) & (x <= part["hi"][..., None])
+        ).astype(np.float64)
+
+        # (leaves, nodes, d) per-leaf terms
+        unmet_factor = z * (1 - u)[:, None]
+        met_factor = unmet_factor + u[:, None]
+        log_unmet = np.log(unmet_factor).sum(axis=2)
+        log_ratio = np.log(met_factor / unmet_factor)
+
+        # (leaves, nodes, rows)
+        product = log_ratio @ met
+        product += log_unmet[..., None]
+        np.exp(product, out=product)
+
+        # Unmet features: (0 - z) / (z (1 - u)) is the same for all of
+        # them. Met features: (1 - z) / (z (1 - u) + u), per feature.
+        unmet = np.einsum("k,lkn->ln", -w / (1 - u), product)
+        unmet *= value[:, None]
+        met_weight = (w[:, None] * (1 - z) / met_factor).transpose(0, 2, 1)
+        met_weight *= value[:, None, None]
+
+        # met ? met_sum : unmet, as unmet + met * (met_sum - unmet)
+        contribution = met_weight @ product
+        contribution -= unmet[:, None, :]
+        contribution *= met
+        contribution += unmet[:, None, :]
+
+        # Sum each path feature's contributions into its model feature
+        if n_rows >= ONEHOT_MIN_ROWS:
+            onehot = feature.reshape(-1, 1) == np.arange(self.n_features)
+            return onehot.T.astype(np.float64) @ contribution.reshape(
+                n_leaves * d, n_rows
+            )
+        index = feature[..., None] * n_rows + np.arange(n_rows)
+        return np.bincount(
+            index.ravel(), weights=contribution.ravel(),
+            minlength=self.n_features * n_rows,
+        ).reshape(self.n_features, n_rows)
+
+
+def get_explainer(engine, model_hash: str) -> ForestExplainer:
+    """
+    Return the explainer of a model version, built once per process and
+    rebuilt when the model's content hash changes.
+    """
+    explainer = _explainers.get(model_hash)
+    if explainer is not None:
+        return explainer
+
+    with _lock:
+        explainer = _explainers.get(model_hash)
+        if explainer is None:
+            explainer = ForestExplainer(engine)
+            # Only the most recently explained version is kept
+            _explainers.clear()
+            _explainers[model_hash] = explainer
+    return explainer
+
+
+def input_contributions(phi: np.ndarray, feature_names: list,
+                        index=None) -> pd.DataFrame:
+    """
+    Add up the contributions of model features derived from the same
+    profile input (e.g. the structure type dummies), one column per input
+    in PROFILE_COLUMNS order. Shapley values are additive, so each row
+    still sums to prediction minus expected value.
+    """
+    inputs = [profile_input(feature) for feature in feature_names]
+    mapping = np.array([
+        [source == column for column in PROFILE_COLUMNS]
+        for source in inputs
+    ], dtype=np.float64)
+    return pd.DataFrame(phi @ mapping, columns=PROFILE_COLUMNS, index=index)
@@ -0,0 +1,209 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import read_columnar, write_columnar
+from src.data_management import load_model_splits
+from src.model_registry import (
+    current_version, file_hash, get_model, model_hash, version_path)
+
+
+EVALUATION_FILE = "evaluation.json"
+PREDICTIONS_STORE = "evaluation_predictions.columnar"
+SPLIT_FILES = ["X_train.csv", "X_test.csv", "y_train.csv", "y_test.csv"]
+
+# Success thresholds (test set), from the ML business case
+SUCCESS_R2 = 0.90
+SUCCESS_RMSE = 300
+SUCCESS_MAE = 250
+
+# Failure thresholds
+FAIL_R2 = 0.85
+FAIL_RMSE = 400
+GAP_THRESHOLD = 0.05
+
+
+def regression_metrics(y_true, y_pred):
+    """
+    Helper function to compute regression metrics
+
+    Returns:
+        tuple: (r2, rmse, mae)
+    """
+    # Imported here: the Model Performance page reads stored evaluations
+    # and should not need scikit-learn for that
+    from sklearn.metrics import (
+        r2_score, root_mean_squared_error, mean_absolute_error)
+
+    r2 = r2_score(y_true, y_pred)
+    rmse = root_mean_squared_error(y_true, y_pred)
+    mae = mean_absolute_error(y_true, y_pred)
+    return r2, rmse, mae
+
+
+def success_verdicts(r2_train, r2_test, rmse_test, mae_test) -> dict:
+    """
+    Check test-set metrics against the success and failure criteria.
+
+    Returns:
+        dict: per-criterion flags and an overall "status" of "pass",
+        "fail" or "borderline".
+    """
+    meets_r2 = r2_test >= SUCCESS_R2
+    meets_rmse = rmse_test <= SUCCESS_RMSE
+    meets_mae = mae_test <= SUCCESS_MAE
+    criteria_pass = meets_r2 and meets_rmse and meets_mae
+
+    train_test_gap = r2_train - r2_test
+    gap_ok = train_test_gap <= GAP_THRESHOLD
+
+    failure_triggered = (
+        (r2_test < FAIL_R2)
+        or (rmse_test > FAIL_RMSE)
+        or (not gap_ok)
+    )
+
+    if criteria_pass and gap_ok:
+        status = "pass"
+    elif failure_triggered:
+        status = "fail"
+    else:
+        status = "borderline"
+
+    return {
+        "meets_r2": bool(meets_r2),
+        "meets_rmse": bool(meets_rmse),
+        "meets_mae": bool(meets_mae),
+        "below_fail_r2": bool(r2_test < FAIL_R2),
+        "above_fail_rmse": bool(rmse_test > FAIL_RMSE),
+        "train_test_gap": float(train_test_gap),
+        "gap_ok": bool(gap_ok),
+        "status": status,
+    }
+
+
+def evaluate_model(model, X_train, X_test, y_train, y_test):
+    """
+    Score a model on its saved splits.
+
+    Returns:
+        tuple: (summary dict with metrics and verdicts, DataFrame with one
+        row per split row: split, actual, predicted, residual)
+    """
+    y_train_pred = np.asarray(model.predict(X_train), dtype=float)
+    y_test_pred = np.asarray(model.predict(X_test), dtype=float)
+
+    r2_train, rmse_train, mae_train = regression_metrics(y_train, y_train_pred)
+    r2_test, rmse_test, mae_test = regression_metrics(y_test, y_test_pred)
+
+    summary = {
+        "metrics": {
+            "train": {"r2": r2_train, "rmse": rmse_train, "mae": mae_train},
+            "test": {"r2": r2_test, "rmse": rmse_test, "mae": mae_test},
+        },
+        "verdicts": success_verdicts(r2_train, r2_test, rmse_test, mae_test),
+    }
+
+    actual = np.concatenate([np.asarray(y_train), np.asarray(y_test)])
+    predicted = np.concatenate([y_train_pred, y_test_pred])
+    predictions = pd.DataFrame({
+        "split": ["train"] * len(y_train_pred) + ["test"] * len(y_test_pred),
+        "actual": actual.astype(float),
+        "predicted": predicted,
+        "residual": actual - predicted,
+    })
+    return summary, predictions
+
+
+def splits_hash(model_path: str) -> str:
+    """Combined content hash of a version's train/test split CSVs."""
+    combined = hashlib.sha256()
+    for file_name in SPLIT_FILES:
+        combined.update(file_hash(f"{model_path}/{file_name}").encode())
+    return combined.hexdigest()
+
+
+def read_evaluation(model_path: str):
+    """
+    Read a stored evaluation.
+
+    Returns:
+        tuple: (summary dict, predictions DataFrame), or (None, None) if
+        no evaluation has been stored for this version.
+    """
+    try:
+        with open(f"{model_path}/{EVALUATION_FILE}", encoding="utf-8") as f:
+            summary = json.load(f)
+        predictions = read_columnar(f"{model_path}/{PREDICTIONS_STORE}")
+    except (FileNotFoundError, ValueError):
+        return None, None
+    return summary, predictions
+
+
+def write_evaluation(model_path: str, summary: dict,
+                     predictions: pd.DataFrame) -> None:
+    """
+    Store an evaluation. The JSON summary is written last (atomically),
+    so a summary on disk always has its predictions next to it.
+    """
+    write_columnar(predictions, f"{model_path}/{PREDICTIONS_STORE}")
+    tmp_path = f"{model_path}/{EVALUATION_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, f"{model_path}/{EVALUATION_FILE}")
+
+
+def load_evaluation(version: str = None, recompute: bool = False):
+    """
+    Return the evaluation of a model version (default: current), computing
+    and storing it only if it is missing or was produced for a different
+    model or different splits. The model itself is only loaded when the
+    evaluation has to be recomputed.
+
+    Returns:
+        tuple: (summary dict, predictions DataFrame)
+    """
+    version = version or current_version()
+    model_path = version_path(version)
+    key = {
+        "model_hash": model_hash(version),
+        "splits_hash": splits_hash(model_path),
+    }
+
+    if not recompute:
+        summary, predictions = read_evaluation(model_path)
+        if summary is not None and summary.get("key") == key:
+            return summary, predictions
+
+    loaded = get_model(version)
+    X_train, X_test, y_train, y_test = load_model_splits(model_path)
+    summary, predictions = evaluate_model(
+        loaded.predictor(len(X_train)), X_train, X_test, y_train, y_test
+    )
+    summary = {"version": version, "key": key, **summary}
+    write_evaluation(model_path, summary, predictions)
+    return summary, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a model version and store the results."
+    )
+    parser.add_argument("--version", default=None,
+                        help="Defaults to the current serving version.")
+    parser.add_argument("--force", action="store_true",
+                        help="Recompute even if a stored result matches.")
+    args = parser.parse_args()
+
+    summary, _ = load_evaluation(args.version, recompute=args.force)
+    print(json.dumps(summary, indent=2))
+    print(f"Stored in {version_path(summary['version'])}/{EVALUATION_FILE}")
+
+
+if __name__ == "__main__":
+    main()
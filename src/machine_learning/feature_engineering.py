@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from src.machine_learning.schema import (  # noqa: F401 (re-exported)
+    COLUMN_TYPOS, MODEL_FEATURES, NUMERIC_COLUMNS, PROFILE_COLUMNS,
+    RESIDENT_DUMMIES, RESIDENT_EDGES, RESIDENT_LABELS, STRUCTURE_DUMMIES,
+    STRUCTURE_TYPES, TARGET, resident_group, standardise_columns)
+
+
+# Row labels quoted in validation errors
+MAX_REPORTED_ROWS = 10
+
+
+def row_labels(index) -> str:
+    """Comma-separated labels of the first offending rows."""
+    shown = ", ".join(map(str, index[:MAX_REPORTED_ROWS]))
+    return shown + (" ..." if len(index) > MAX_REPORTED_ROWS else "")
+
+
+class ElectricityFeatureEngineer(BaseEstimator, TransformerMixin):
+    """
+    Turn raw site profiles into the model's feature matrix.
+
+    Column renaming, `water_consumption_log`, binned resident groups and
+    the fixed-order one-hot columns are all computed column-wise with
+    NumPy, so the same transformer serves one form submission or millions
+    of rows for training.
+
+    Raises (transform):
+        ValueError: if required columns are missing, contain missing
+            values, a numeric column holds values that aren't finite
+            numbers, or a structure type is unknown.
+    """
+
+    def fit(self, X, y=None):
+        self.n_features_in_ = len(PROFILE_COLUMNS)
+        return self
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(MODEL_FEATURES, dtype=object)
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        X = standardise_columns(X)
+
+        missing = [c for c in PROFILE_COLUMNS if c not in X.columns]
+        if missing:
+            raise ValueError(
+                f"Missing required columns: {', '.join(missing)}"
+            )
+
+        incomplete = [c for c in PROFILE_COLUMNS if X[c].isna().any()]
+        if incomplete:
+            raise ValueError(
+                f"Missing values in column(s): {', '.join(incomplete)}"
+            )
+
+        numbers = X[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+        invalid = numbers.isna() | ~np.isfinite(numbers.astype(float))
+        if invalid.any().any():
+            raise ValueError(
+                "Values that aren't finite numbers in "
+                + "; ".join(
+                    f"{c} (row(s) {row_labels(X.index[invalid[c]])})"
+                    for c in NUMERIC_COLUMNS if invalid[c].any()
+                )
+            )
+
+        stype = X["structure_type"].astype(str).str.strip().to_numpy()
+        unknown = sorted(set(np.unique(stype)) - set(STRUCTURE_TYPES))
+        if unknown:
+            raise ValueError(
+                f"Unknown structure type(s): {', '.join(unknown)}"
+            )
+
+        columns = {col: numbers[col].to_numpy() for col in NUMERIC_COLUMNS}
+
+        for label in STRUCTURE_DUMMIES:
+            columns[f"structure_type_{label}"] = stype == label
+
+        group_idx = np.searchsorted(
+            RESIDENT_EDGES, columns["resident_count"], side="left"
+        )
+        for label in RESIDENT_DUMMIES:
+            columns[f"resident_group_{label}"] = (
+                group_idx == RESIDENT_LABELS.index(label)
+            )
+
+        columns["water_consumption_log"] = np.log1p(
+            columns["water_consumption"].astype(float)
+        )
+
+        return pd.DataFrame(columns, index=X.index)[MODEL_FEATURES]
+
+
+def build_cleaned_dataset(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Produce the cleaned dataset (Notebook 03 output): model features with
+    `electricity_cost` in its original position after `resident_count`.
+    """
+    df_raw = standardise_columns(df_raw)
+    features = ElectricityFeatureEngineer().fit_transform(df_raw)
+    features.insert(
+        NUMERIC_COLUMNS.index("resident_count") + 1,
+        TARGET,
+        df_raw[TARGET].to_numpy(),
+    )
+    return features
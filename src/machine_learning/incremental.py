@@ -0,0 +1,361 @@
+"""
+Incremental model updates from newly labelled site records.
+
+    python -m src.machine_learning.incremental ingest new_sites.csv
+    python -m src.machine_learning.incremental update --strategy warm_start
+    python -m src.machine_learning.incremental status
+
+New records are appended to an append-only log. An update either adds
+trees fitted on the records not yet seen by the serving model (warm
+start) or refits the whole forest on old plus new data (retrain). The
+result is always published as a new version, and only becomes the
+serving version if it passes the success criteria both on the base
+version's test split and on the new records' hold-out, scored separately
+so a large old split cannot mask a poor fit to the new data.
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from src.data_management import load_model_splits, load_pkl_file
+from src.model_registry import (
+    MODEL_ROOT, artifact_paths, current_version, publish_version,
+    read_manifest, version_path)
+from src.machine_learning.evaluate import (
+    load_evaluation, regression_metrics, success_verdicts)
+from src.machine_learning.feature_engineering import (
+    PROFILE_COLUMNS, TARGET, ElectricityFeatureEngineer, standardise_columns)
+from src.machine_learning.train import (
+    RANDOM_STATE, TEST_SIZE, next_version, publish_model)
+
+
+INGEST_LOG = "inputs/datasets/ingest/labelled_records.jsonl"
+UPDATE_LOG = f"{MODEL_ROOT}/incremental_update.log"
+
+STRATEGIES = ["warm_start", "retrain"]
+DEFAULT_NEW_TREES = 20
+
+# Fewest rows the promotion gate scores a part on (R² needs two); an
+# update waits for enough new records to hold this many out
+MIN_HOLDOUT_ROWS = 2
+
+FEATURE_ENGINEER = ElectricityFeatureEngineer().fit(None)
+
+
+def validate_records(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Check new labelled records and return them with standardised column
+    names, profile columns and target only.
+
+    Raises:
+        ValueError: if columns are missing, the profiles are invalid or
+            the target is missing or not numeric.
+    """
+    df = standardise_columns(df)
+    if TARGET not in df.columns:
+        raise ValueError(f"Missing target column `{TARGET}`.")
+
+    # Same profile checks as live predictions
+    FEATURE_ENGINEER.transform(df)
+
+    target = pd.to_numeric(df[TARGET], errors="coerce")
+    if target.isna().any():
+        raise ValueError(f"`{TARGET}` must be numeric and present.")
+
+    records = df[PROFILE_COLUMNS].copy()
+    records[TARGET] = target.astype(float)
+    return records
+
+
+def read_log(log_path: str = INGEST_LOG) -> pd.DataFrame:
+    """
+    Read every logged record, with its `batch` number and `ingested_at`
+    timestamp. Returns an empty DataFrame if nothing was ingested yet.
+    """
+    if not os.path.exists(log_path):
+        return pd.DataFrame(
+            columns=["batch", "ingested_at"] + PROFILE_COLUMNS + [TARGET]
+        )
+    return pd.read_json(log_path, lines=True, dtype=False)
+
+
+def last_batch(log_path: str = INGEST_LOG) -> int:
+    """Number of the newest logged batch (0 if the log is empty)."""
+    log = read_log(log_path)
+    return int(log["batch"].max()) if len(log) else 0
+
+
+def append_records(df: pd.DataFrame, log_path: str = INGEST_LOG) -> int:
+    """
+    Validate new labelled records and append them to the ingestion log
+    as one batch. Existing lines are never rewritten.
+
+    Returns:
+        int: the batch number.
+    """
+    records = validate_records(df)
+    batch = last_batch(log_path) + 1
+    ingested_at = datetime.now(timezone.utc).isoformat()
+
+    lines = [
+        json.dumps({"batch": batch, "ingested_at": ingested_at, **row})
+        for row in records.to_dict(orient="records")
+    ]
+
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return batch
+
+
+def pending_records(version: str, log_path: str = INGEST_LOG):
+    """
+    Logged records not yet used by a version (batches after the version's
+    `ingested_through`).
+
+    Returns:
+        tuple: (records DataFrame, newest batch number in the log)
+    """
+    entry = read_manifest()["versions"][version]
+    seen = int(entry.get("ingested_through", 0))
+    log = read_log(log_path)
+    return log[log["batch"] > seen], (
+        int(log["batch"].max()) if len(log) else seen
+    )
+
+
+def warm_start_model(model, X_new, y_new, new_trees: int):
+    """
+    Return a copy of a fitted forest with `new_trees` extra trees fitted
+    on the new rows only; the existing trees are kept unchanged.
+    """
+    updated = copy.deepcopy(model)
+    updated.set_params(
+        warm_start=True, n_estimators=len(model.estimators_) + new_trees
+    )
+    updated.fit(X_new, y_new)
+    updated.set_params(warm_start=False)
+    return updated
+
+
+def promotion_gate(predictions: pd.DataFrame, old_train_rows: int,
+                   old_test_rows: int) -> dict:
+    """
+    Check an updated version's predictions against the success criteria
+    separately for the base version's rows (the first `old_train_rows`
+    train and `old_test_rows` test rows) and for the new records (the
+    rest). Each part's train-test gap compares R² on its own train and
+    test rows, so the old rows can't hide overfitting to the new ones.
+    A part too small to score fails the gate.
+
+    Returns:
+        dict: metrics and verdicts per part, and "promote", True only if
+        both parts pass.
+    """
+    train = predictions[predictions["split"] == "train"]
+    test = predictions[predictions["split"] == "test"]
+    parts = {
+        "old_test": (train.iloc[:old_train_rows], test.iloc[:old_test_rows]),
+        "new_holdout": (train.iloc[old_train_rows:],
+                        test.iloc[old_test_rows:]),
+    }
+
+    gate = {}
+    for name, (train_rows, rows) in parts.items():
+        if min(len(train_rows), len(rows)) < MIN_HOLDOUT_ROWS:
+            gate[name] = {"rows": len(rows), "status": "too_few_rows"}
+            continue
+        r2_train = regression_metrics(
+            train_rows["actual"], train_rows["predicted"]
+        )[0]
+        r2, rmse, mae = regression_metrics(rows["actual"], rows["predicted"])
+        verdicts = success_verdicts(r2_train, r2, rmse, mae)
+        gate[name] = {
+            "rows": len(rows),
+            "metrics": {"r2_train": r2_train, "r2": r2, "rmse": rmse,
+                        "mae": mae},
+            "status": verdicts["status"],
+        }
+    gate["promote"] = all(part["status"] == "pass"
+                          for part in gate.values())
+    return gate
+
+
+def holdout_rows(n_records: int) -> int:
+    """Hold-out rows `train_test_split` takes from `n_records` records."""
+    return math.ceil(TEST_SIZE * n_records)
+
+
+def update_model(strategy: str = "warm_start",
+                 new_trees: int = DEFAULT_NEW_TREES,
+                 base_version: str = None,
+                 log_path: str = INGEST_LOG):
+    """
+    Update the serving model with the records logged since it was built.
+
+    The new records are split like the original data; the new version's
+    splits are the base version's splits plus the new rows, so its stored
+    evaluation covers old and new hold-out data. It replaces the serving
+    version only if it passes on both, see promotion_gate.
+
+    Too few new records to hold out MIN_HOLDOUT_ROWS defer the update:
+    nothing is published and the records stay pending until more arrive.
+
+    Returns:
+        tuple: (version, evaluation summary with the promotion `gate`),
+        (None, None) if there are no new records, or (None, a "deferred"
+        summary) if there are too few.
+    """
+    base_version = base_version or current_version()
+    records, through = pending_records(base_version, log_path)
+    if records.empty:
+        return None, None
+
+    new_holdout = holdout_rows(len(records))
+    if new_holdout < MIN_HOLDOUT_ROWS:
+        return None, {
+            "status": "deferred",
+            "new_records": len(records),
+            "new_holdout_rows": new_holdout,
+            "min_holdout_rows": MIN_HOLDOUT_ROWS,
+        }
+
+    base_path = version_path(base_version)
+    model = load_pkl_file(artifact_paths(base_version)["model"])
+    X_train, X_test, y_train, y_test = load_model_splits(base_path)
+
+    X_new = FEATURE_ENGINEER.transform(records)[list(X_train.columns)]
+    y_new = records[TARGET].rename(y_train.name)
+    X_new_train, X_new_test, y_new_train, y_new_test = train_test_split(
+        X_new, y_new, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    old_train_rows, old_test_rows = len(X_train), len(X_test)
+    X_train = pd.concat([X_train, X_new_train], ignore_index=True)
+    y_train = pd.concat([y_train, y_new_train], ignore_index=True)
+    X_test = pd.concat([X_test, X_new_test], ignore_index=True)
+    y_test = pd.concat([y_test, y_new_test], ignore_index=True)
+
+    if strategy == "warm_start":
+        updated = warm_start_model(model, X_new_train, y_new_train,
+                                   new_trees)
+    else:
+        updated = clone(model).set_params(n_jobs=-1)
+        updated.fit(X_train, y_train)
+
+    report = {
+        "strategy": strategy,
+        "base_version": base_version,
+        "new_records": len(records),
+        "new_train_rows": len(X_new_train),
+        "new_holdout_rows": len(X_new_test),
+        "n_estimators": len(updated.estimators_),
+    }
+    version = publish_model(
+        updated, X_train, X_test, y_train, y_test, report,
+        search=None, version=next_version(), activate=False,
+        details={"parent": base_version, "ingested_through": through},
+    )
+
+    evaluation, predictions = load_evaluation(version)
+    gate = promotion_gate(predictions, old_train_rows, old_test_rows)
+    if gate["promote"]:
+        entry = read_manifest()["versions"][version]
+        publish_version(version, artifacts=entry, make_current=True)
+    return version, {**evaluation, "gate": gate}
+
+
+def start_background_update(strategy: str = "warm_start",
+                            new_trees: int = DEFAULT_NEW_TREES):
+    """
+    Run update_model in a separate process so the app keeps serving the
+    current version; running apps pick up a promoted version on their
+    next rerun. Output goes to UPDATE_LOG.
+
+    Returns:
+        subprocess.Popen: the update process.
+    """
+    with open(UPDATE_LOG, "a", encoding="utf-8") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "src.machine_learning.incremental",
+             "update", "--strategy", strategy,
+             "--new-trees", str(new_trees)],
+            stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingest labelled records and update the model."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Append a CSV to the log.")
+    ingest.add_argument("csv_path")
+
+    update = commands.add_parser("update", help="Publish an updated model.")
+    update.add_argument("--strategy", choices=STRATEGIES,
+                        default="warm_start")
+    update.add_argument("--new-trees", type=int, default=DEFAULT_NEW_TREES,
+                        help="Trees to add with --strategy warm_start.")
+    update.add_argument("--background", action="store_true",
+                        help=f"Run detached, logging to {UPDATE_LOG}.")
+
+    commands.add_parser("status", help="Show records pending an update.")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        batch = append_records(pd.read_csv(args.csv_path))
+        print(f"Logged {args.csv_path} as batch {batch} in {INGEST_LOG}")
+
+    elif args.command == "status":
+        version = current_version()
+        records, through = pending_records(version)
+        print(f"Serving {version}; {len(records)} record(s) pending "
+              f"(log through batch {through})")
+
+    elif args.background:
+        process = start_background_update(args.strategy, args.new_trees)
+        print(f"Started update (pid {process.pid}), logging to {UPDATE_LOG}")
+
+    else:
+        version, evaluation = update_model(args.strategy, args.new_trees)
+        if evaluation is None:
+            print("No new records since the serving version was built.")
+            return
+        if version is None:
+            print(
+                f"Update deferred: {evaluation['new_records']} new "
+                f"record(s) give {evaluation['new_holdout_rows']} hold-out "
+                f"row(s), {evaluation['min_holdout_rows']} are needed to "
+                f"score it. The records stay pending."
+            )
+            return
+        gate = evaluation["gate"]
+        print(json.dumps({
+            "version": version,
+            **{
+                name: {
+                    **part,
+                    "metrics": {k: round(float(v), 3)
+                                for k, v in part.get("metrics", {}).items()},
+                }
+                for name, part in gate.items() if name != "promote"
+            },
+            "promoted": current_version() == version,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
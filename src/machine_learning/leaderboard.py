@@ -0,0 +1,325 @@
+"""
+Leaderboard of candidate regressors: accuracy next to serving cost.
+
+    python -m src.machine_learning.leaderboard --cv-folds 5
+
+Every candidate is cross-validated on the training split of Notebook 04,
+with all (model, fold) fits spread over a process pool, then refitted on
+the whole training split and scored on the test split. The refitted
+models are then measured one at a time in this process, so timings don't
+compete with each other: single-row latency (sklearn, and the compiled
+engine the app serves forests with), batch throughput, pickled artifact
+size and load time.
+
+The leaderboard is published as `leaderboard.json` and `leaderboard.csv`
+under the model root and shown on the Model Performance page.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.model_registry import MODEL_ROOT, compile_engine
+from src.machine_learning.evaluate import (
+    SUCCESS_MAE, SUCCESS_R2, SUCCESS_RMSE, regression_metrics)
+
+
+LEADERBOARD_PATH = f"{MODEL_ROOT}/leaderboard.json"
+LEADERBOARD_CSV = f"{MODEL_ROOT}/leaderboard.csv"
+
+# Same seed as train.py
+RANDOM_STATE = 0
+
+# Estimator (module, class) and parameters per candidate; n_jobs=1 so
+# parallelism comes from the process pool only. Classes are imported when
+# needed: the Model Performance page reads the published leaderboard and
+# should not need scikit-learn for that.
+CANDIDATES = {
+    "linear_regression": ("sklearn.linear_model", "LinearRegression", {}),
+    "random_forest": ("sklearn.ensemble", "RandomForestRegressor", {
+        "n_estimators": 100, "n_jobs": 1, "random_state": RANDOM_STATE,
+    }),
+    "hist_gradient_boosting": (
+        "sklearn.ensemble", "HistGradientBoostingRegressor",
+        {"random_state": RANDOM_STATE},
+    ),
+    "extra_trees": ("sklearn.ensemble", "ExtraTreesRegressor", {
+        "n_estimators": 100, "n_jobs": 1, "random_state": RANDOM_STATE,
+    }),
+}
+
+# Timed calls per measurement (the median is reported)
+LATENCY_CALLS = 200
+THROUGHPUT_CALLS = 5
+LOAD_CALLS = 3
+
+# Training data for the worker processes, set once by _init_worker
+_worker_data = {}
+
+
+def make_candidate(name: str):
+    """Return an unfitted estimator for a candidate name."""
+    module, class_name, params = CANDIDATES[name]
+    return getattr(importlib.import_module(module), class_name)(**params)
+
+
+def _init_worker(X_train, y_train, cv_folds):
+    from sklearn.model_selection import KFold
+
+    cv = KFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+    _worker_data["X"] = X_train
+    _worker_data["y"] = y_train
+    _worker_data["folds"] = list(cv.split(X_train))
+
+
+def run_fold(task: tuple) -> dict:
+    """
+    Fit one candidate on one cross-validation fold and score it on the
+    held-out part. Runs inside a worker process.
+    """
+    name, fold = task
+    X, y = _worker_data["X"], _worker_data["y"]
+    train_rows, valid_rows = _worker_data["folds"][fold]
+
+    model = make_candidate(name)
+    start = time.perf_counter()
+    model.fit(X.iloc[train_rows], y.iloc[train_rows])
+    fit_time = time.perf_counter() - start
+
+    r2, rmse, mae = regression_metrics(
+        y.iloc[valid_rows], model.predict(X.iloc[valid_rows])
+    )
+    return {"model": name, "fold": fold, "r2": r2, "rmse": rmse,
+            "mae": mae, "fit_time_s": fit_time}
+
+
+def fit_full(name: str):
+    """Refit a candidate on the whole training split (worker process)."""
+    return make_candidate(name).fit(_worker_data["X"], _worker_data["y"])
+
+
+def cross_validate(X_train, y_train, names: list, cv_folds: int = 5,
+                   workers: int = None) -> tuple:
+    """
+    Cross-validate every candidate and refit each on the whole training
+    split, all in one process pool.
+
+    Returns:
+        tuple: (per-fold results DataFrame, dict of fitted models)
+    """
+    workers = workers or os.cpu_count()
+    tasks = [(name, fold) for name in names for fold in range(cv_folds)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(X_train, y_train, cv_folds),
+    ) as pool:
+        folds = list(pool.map(run_fold, tasks))
+        models = dict(zip(names, pool.map(fit_full, names)))
+
+    return pd.DataFrame(folds), models
+
+
+def median_time(call, repeats: int) -> float:
+    """Median wall time of `call()` over `repeats` calls, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def serving_costs(model, X_test: pd.DataFrame) -> dict:
+    """
+    Measure what serving a fitted model costs: single-row latency (and
+    through the compiled engine for forests), batch throughput on the
+    test split, pickled size and load time.
+    """
+    # Imported here, like the estimators: the Model Performance page
+    # reads the published leaderboard from this module
+    import joblib
+
+    row = X_test.iloc[[0]]
+    latency = median_time(lambda: model.predict(row), LATENCY_CALLS)
+
+    engine = compile_engine(model)
+    engine_latency = (
+        median_time(lambda: engine.predict(row), LATENCY_CALLS)
+        if engine is not None else None
+    )
+
+    batch_time = median_time(lambda: model.predict(X_test), THROUGHPUT_CALLS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = f"{tmp_dir}/model.pkl"
+        joblib.dump(model, file_path)
+        size = os.path.getsize(file_path)
+        load_time = median_time(lambda: joblib.load(file_path), LOAD_CALLS)
+
+    return {
+        "latency_ms": latency * 1000,
+        "engine_latency_ms": (
+            engine_latency * 1000 if engine is not None else None
+        ),
+        "serving_latency_ms": (
+            min(latency, engine_latency) if engine is not None else latency
+        ) * 1000,
+        "batch_rows_per_s": len(X_test) / batch_time,
+        "artifact_mb": size / 1024 ** 2,
+        "load_time_ms": load_time * 1000,
+    }
+
+
+def pareto_optimal(accuracy, cost) -> np.ndarray:
+    """
+    True for each model that no other model beats on both accuracy
+    (higher is better) and cost (lower is better).
+    """
+    accuracy = np.asarray(accuracy, dtype=float)
+    cost = np.asarray(cost, dtype=float)
+    better_or_equal = (
+        (accuracy[None, :] >= accuracy[:, None])
+        & (cost[None, :] <= cost[:, None])
+    )
+    strictly_better = (
+        (accuracy[None, :] > accuracy[:, None])
+        | (cost[None, :] < cost[:, None])
+    )
+    return ~(better_or_equal & strictly_better).any(axis=1)
+
+
+def build_leaderboard(names: list = None, cv_folds: int = 5,
+                      workers: int = None) -> dict:
+    """
+    Run the full comparison.
+
+    Returns:
+        dict: run settings and `models`, one entry per candidate, best
+        cross-validated R² first.
+    """
+    from src.machine_learning.train import load_training_data
+
+    names = names or list(CANDIDATES)
+    X_train, X_test, y_train, y_test = load_training_data()
+
+    start = time.perf_counter()
+    folds, models = cross_validate(
+        X_train, y_train, names, cv_folds=cv_folds, workers=workers
+    )
+    cv_time = time.perf_counter() - start
+
+    rows = []
+    for name in names:
+        scores = folds[folds["model"] == name]
+        r2, rmse, mae = regression_metrics(
+            y_test, models[name].predict(X_test)
+        )
+        rows.append({
+            "model": name,
+            "cv_r2_mean": scores["r2"].mean(),
+            "cv_r2_std": scores["r2"].std(ddof=0),
+            "cv_rmse_mean": scores["rmse"].mean(),
+            "cv_mae_mean": scores["mae"].mean(),
+            "fit_time_s": scores["fit_time_s"].mean(),
+            "test_r2": r2,
+            "test_rmse": rmse,
+            "test_mae": mae,
+            "meets_success": bool(
+                r2 >= SUCCESS_R2 and rmse <= SUCCESS_RMSE
+                and mae <= SUCCESS_MAE
+            ),
+            **serving_costs(models[name], X_test),
+        })
+
+    rows.sort(key=lambda r: -r["cv_r2_mean"])
+    optimal = pareto_optimal(
+        [r["cv_r2_mean"] for r in rows],
+        [r["serving_latency_ms"] for r in rows],
+    )
+    for row, is_optimal in zip(rows, optimal):
+        row["pareto_optimal"] = bool(is_optimal)
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cv_folds": cv_folds,
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "workers": workers or os.cpu_count(),
+        "cv_wall_time_s": round(cv_time, 2),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "models": [
+            {key: (round(value, 6) if isinstance(value, float) else value)
+             for key, value in row.items()}
+            for row in rows
+        ],
+    }
+
+
+def write_leaderboard(leaderboard: dict, json_path: str = LEADERBOARD_PATH,
+                      csv_path: str = LEADERBOARD_CSV) -> None:
+    """Publish the leaderboard as JSON (with settings) and as a CSV table."""
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(leaderboard, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, json_path)
+    leaderboard_table(leaderboard).to_csv(csv_path, index=False)
+
+
+def read_leaderboard(json_path: str = LEADERBOARD_PATH):
+    """Read the published leaderboard, or None if there is none."""
+    try:
+        with open(json_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def leaderboard_table(leaderboard: dict) -> pd.DataFrame:
+    """One row per candidate, best cross-validated R² first."""
+    return pd.DataFrame(leaderboard["models"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cross-validate the candidate regressors and publish "
+                    "an accuracy versus serving-cost leaderboard."
+    )
+    parser.add_argument("--cv-folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Process pool size (default: CPU count).")
+    parser.add_argument("--models", nargs="+", choices=list(CANDIDATES),
+                        help="Candidates to compare (default: all).")
+    args = parser.parse_args()
+
+    leaderboard = build_leaderboard(
+        names=args.models, cv_folds=args.cv_folds, workers=args.workers
+    )
+    write_leaderboard(leaderboard)
+
+    columns = ["model", "cv_r2_mean", "test_rmse", "test_mae",
+               "serving_latency_ms", "batch_rows_per_s", "artifact_mb",
+               "load_time_ms", "pareto_optimal"]
+    print(leaderboard_table(leaderboard)[columns].round(3).to_string(
+        index=False
+    ))
+    print(f"Published {LEADERBOARD_PATH} and {LEADERBOARD_CSV}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Permutation importance of a model version on its test split.
+
+    python -m src.machine_learning.permutation_importance --version v1
+
+Each profile input is shuffled across the test rows and the drop in test
+R² is recorded; inputs that become several model features (the structure
+type dummies, water consumption and its log) are shuffled together, so
+their importance isn't split between correlated columns. Every (input,
+repeat) pair is an independent task spread over a process pool, and each
+one draws its own seeded permutation, so results don't depend on the
+number of workers.
+
+The result is stored next to the model as `permutation_importance.json`,
+keyed on the model and test-split hashes and the settings, and is only
+recomputed when one of those changes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import load_model_splits
+from src.model_registry import (
+    current_version, file_hash, get_model, model_hash, version_path)
+from src.machine_learning.schema import PROFILE_COLUMNS, profile_input
+
+
+IMPORTANCE_FILE = "permutation_importance.json"
+TEST_FILES = ["X_test.csv", "y_test.csv"]
+
+N_REPEATS = 10
+RANDOM_STATE = 0
+CONFIDENCE = 0.95
+
+# Model and test split for the worker processes, set once by _init_worker
+_worker_data = {}
+
+
+def input_groups(model_features: list) -> dict:
+    """Model feature columns per profile input, in PROFILE_COLUMNS order."""
+    groups = {column: [] for column in PROFILE_COLUMNS}
+    for feature in model_features:
+        groups.setdefault(profile_input(feature), []).append(feature)
+    return {column: features for column, features in groups.items()
+            if features}
+
+
+def _r2(y_true: np.ndarray, y_pred) -> float:
+    residual = y_true - np.asarray(y_pred, dtype=float)
+    total = y_true - y_true.mean()
+    return 1.0 - (residual @ residual) / (total @ total)
+
+
+def _init_worker(version, X_test, y_test, groups):
+    loaded = get_model(version)
+    _worker_data["model"] = loaded.predictor(n_rows=len(X_test))
+    _worker_data["X"] = X_test
+    _worker_data["y"] = np.asarray(y_test, dtype=float)
+    _worker_data["groups"] = groups
+
+
+def run_permutation(task: tuple) -> tuple:
+    """
+    Shuffle one input's columns with the permutation seeded by
+    (random_state, input position, repeat) and score the model. Runs
+    inside a worker process.
+
+    Returns:
+        tuple: (input position, repeat, test R² with the input shuffled)
+    """
+    position, repeat, random_state = task
+    X = _worker_data["X"]
+    columns = list(_worker_data["groups"].values())[position]
+
+    rng = np.random.default_rng([random_state, position, repeat])
+    shuffled = X.copy()
+    shuffled[columns] = X[columns].to_numpy()[rng.permutation(len(X))]
+
+    return position, repeat, _r2(
+        _worker_data["y"], _worker_data["model"].predict(shuffled)
+    )
+
+
+def permutation_importance(version: str, X_test: pd.DataFrame, y_test,
+                           n_repeats: int = N_REPEATS,
+                           random_state: int = RANDOM_STATE,
+                           workers: int = None,
+                           confidence: float = CONFIDENCE) -> dict:
+    """
+    Compute the permutation importance of every profile input.
+
+    Returns:
+        dict: `baseline_r2`, and `importances`, one row per input (most
+        important first) with the mean R² drop, its standard deviation
+        over repeats and a t-based confidence interval of the mean.
+    """
+    from scipy.stats import t
+
+    loaded = get_model(version)
+    y = np.asarray(y_test, dtype=float)
+    baseline = _r2(y, loaded.predictor(n_rows=len(X_test)).predict(X_test))
+
+    groups = input_groups(loaded.model_features)
+    tasks = [
+        (position, repeat, random_state)
+        for position in range(len(groups))
+        for repeat in range(n_repeats)
+    ]
+    workers = workers or os.cpu_count()
+
+    start = time.perf_counter()
+    if workers == 1:
+        # In-process, e.g. from the app, where forking is best avoided
+        _init_worker(version, X_test, y_test, groups)
+        results = [run_permutation(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(version, X_test, y_test, groups),
+        ) as pool:
+            results = list(pool.map(
+                run_permutation, tasks,
+                chunksize=max(1, len(tasks) // (4 * workers)),
+            ))
+    wall_time = time.perf_counter() - start
+
+    drops = np.empty((len(groups), n_repeats))
+    for position, repeat, score in results:
+        drops[position, repeat] = baseline - score
+
+    mean = drops.mean(axis=1)
+    std = drops.std(axis=1, ddof=1) if n_repeats > 1 else np.zeros(len(mean))
+    margin = (
+        t.ppf((1 + confidence) / 2, n_repeats - 1) * std / np.sqrt(n_repeats)
+        if n_repeats > 1 else np.zeros(len(mean))
+    )
+
+    rows = [
+        {
+            "input": column,
+            "features": features,
+            "importance": float(mean[i]),
+            "std": float(std[i]),
+            "ci_low": float(mean[i] - margin[i]),
+            "ci_high": float(mean[i] + margin[i]),
+        }
+        for i, (column, features) in enumerate(groups.items())
+    ]
+    return {
+        "baseline_r2": float(baseline),
+        "importances": sorted(rows, key=lambda r: -r["importance"]),
+        "workers": workers,
+        "wall_time_s": round(wall_time, 2),
+    }
+
+
+def importance_key(version: str, n_repeats: int, random_state: int,
+                   confidence: float) -> dict:
+    """What a stored result depends on: model, test split and settings."""
+    model_path = version_path(version)
+    combined = hashlib.sha256()
+    for file_name in TEST_FILES:
+        combined.update(file_hash(f"{model_path}/{file_name}").encode())
+    return {
+        "model_hash": model_hash(version),
+        "test_hash": combined.hexdigest(),
+        "n_repeats": n_repeats,
+        "random_state": random_state,
+        "confidence": confidence,
+    }
+
+
+def read_importance(model_path: str):
+    """Read a stored result, or None if there is none."""
+    try:
+        with open(f"{model_path}/{IMPORTANCE_FILE}", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_importance(model_path: str, summary: dict) -> None:
+    tmp_path = f"{model_path}/{IMPORTANCE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, f"{model_path}/{IMPORTANCE_FILE}")
+
+
+def load_permutation_importance(version: str = None,
+                                recompute: bool = False,
+                                n_repeats: int = N_REPEATS,
+                                random_state: int = RANDOM_STATE,
+                                workers: int = None,
+                                confidence: float = CONFIDENCE) -> dict:
+    """
+    Return the permutation importance of a model version (default:
+    current), computing and storing it only if it is missing or was
+    produced for a different model, test split or settings.
+
+    Returns:
+        dict: the stored summary (see permutation_importance), with its
+        `version` and `key`.
+    """
+    version = version or current_version()
+    model_path = version_path(version)
+    key = importance_key(version, n_repeats, random_state, confidence)
+
+    if not recompute:
+        summary = read_importance(model_path)
+        if summary is not None and summary.get("key") == key:
+            return summary
+
+    _, X_test, _, y_test = load_model_splits(model_path)
+    summary = {
+        "version": version,
+        "key": key,
+        **permutation_importance(
+            version, X_test, y_test, n_repeats=n_repeats,
+            random_state=random_state, workers=workers,
+            confidence=confidence,
+        ),
+    }
+    write_importance(model_path, summary)
+    return summary
+
+
+def importance_table(summary: dict) -> pd.DataFrame:
+    """One row per input, most important first, for display."""
+    return pd.DataFrame(summary["importances"]).drop(columns="features")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute and store the permutation importance of a "
+                    "model version on its test split."
+    )
+    parser.add_argument("--version", default=None,
+                        help="Defaults to the current serving version.")
+    parser.add_argument("--repeats", type=int, default=N_REPEATS)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Process pool size (default: CPU count).")
+    parser.add_argument("--force", action="store_true",
+                        help="Recompute even if a stored result matches.")
+    args = parser.parse_args()
+
+    summary = load_permutation_importance(
+        args.version, recompute=args.force, n_repeats=args.repeats,
+        workers=args.workers,
+    )
+    print(importance_table(summary).round(4).to_string(index=False))
+    print(f"Baseline test R²: {summary['baseline_r2']:.4f}")
+    print(f"Stored in {version_path(summary['version'])}/{IMPORTANCE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
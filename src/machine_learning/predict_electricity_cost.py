@@ -1,20 +1,21 @@
+import threading
+import time
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 
+from src import metrics
+from src.machine_learning.feature_engineering import (
+    PROFILE_COLUMNS, ElectricityFeatureEngineer)
+from src.machine_learning.tree_engine import CompiledForest
 
-def resident_group(resident_count: int) -> str:
-    """
-    Group resident_count into the same categories used during
-    feature engineering (Notebook 03): none, low, medium, high.
-    """
-    if resident_count == 0:
-        return "none"
-    elif resident_count <= 50:
-        return "low"
-    elif resident_count <= 150:
-        return "medium"
-    else:
-        return "high"
+
+# Shared with training, see feature_engineering.py
+FEATURE_ENGINEER = ElectricityFeatureEngineer().fit(None)
+
+# Prediction interval: 10th to 90th percentile of the individual trees
+INTERVAL_QUANTILES = (0.10, 0.90)
 
 
 def prepare_features(user_inputs: dict, model_features: list) -> pd.DataFrame:
@@ -23,40 +24,225 @@ def prepare_features(user_inputs: dict, model_features: list) -> pd.DataFrame:
     matching the trained model's features (including engineered/encoded
     features)
     """
-    row = {feature: 0 for feature in model_features}
-
-    row["site_area"] = user_inputs["site_area"]
-    row["water_consumption"] = user_inputs["water_consumption"]
-    row["recycling_rate"] = user_inputs["recycling_rate"]
-    row["utilisation_rate"] = user_inputs["utilisation_rate"]
-    row["air_quality_index"] = user_inputs["air_quality_index"]
-    row["issue_resolution_time"] = user_inputs["issue_resolution_time"]
-    row["resident_count"] = user_inputs["resident_count"]
-
-    row["water_consumption_log"] = np.log1p(user_inputs["water_consumption"])
+    return prepare_features_batch(
+        site_profiles=pd.DataFrame([user_inputs]),
+        model_features=model_features
+    )
 
-    group = resident_group(user_inputs["resident_count"])
-    if group == "low":
-        row["resident_group_low"] = 1
-    elif group == "medium":
-        row["resident_group_medium"] = 1
-    elif group == "none":
-        row["resident_group_none"] = 1
-    # if "high", all cols stay 0
 
-    stype = user_inputs["structure_type"]
-    if stype == "Industrial":
-        row["structure_type_Industrial"] = 1
-    elif stype == "Mixed-use":
-        row["structure_type_Mixed-use"] = 1
-    elif stype == "Residential":
-        row["structure_type_Residential"] = 1
-    # if "Commercial", all cols stay 0
+def prepare_features_batch(
+    site_profiles: pd.DataFrame, model_features: list
+) -> pd.DataFrame:
+    """
+    Convert a DataFrame of raw site profiles (one row per site, columns as
+    in PROFILE_COLUMNS) into the model feature matrix, using the same
+    transformer as training.
 
-    X_live = pd.DataFrame([row])[model_features]
-    return X_live
+    Raises:
+        ValueError: if required columns are missing or invalid.
+    """
+    return FEATURE_ENGINEER.transform(site_profiles)[model_features]
 
 
+@metrics.timed(metrics.PREDICTION_SECONDS, metrics.PREDICTION_BATCH_SIZE,
+               size_arg="X_live", path="single")
 def predict_cost(model, X_live: pd.DataFrame) -> float:
-    """Return a single electricity cost prediction as a float."""
+    """
+    Return a single electricity cost prediction as a float. A
+    CompiledForest uses its low-latency single-row path.
+    """
+    if isinstance(model, CompiledForest):
+        return model.predict_one(X_live)
     return float(model.predict(X_live)[0])
+
+
+@metrics.timed(metrics.PREDICTION_SECONDS, metrics.PREDICTION_BATCH_SIZE,
+               size_arg="X", path="batch")
+def predict_cost_batch(model, X: pd.DataFrame) -> np.ndarray:
+    """Return electricity cost predictions for every row in one call."""
+    return np.asarray(model.predict(X), dtype=float)
+
+
+def predict_cost_interval(engine: CompiledForest, X_live: pd.DataFrame,
+                          quantiles: tuple = INTERVAL_QUANTILES) -> tuple:
+    """
+    Return a single prediction with its empirical interval across the
+    forest's trees.
+
+    Returns:
+        tuple: (prediction, lower bound, upper bound)
+    """
+    per_tree = engine.predict_one_per_tree(X_live)
+    low, high = np.quantile(per_tree, quantiles)
+    return float(per_tree.mean()), float(low), float(high)
+
+
+def predict_cost_batch_interval(engine: CompiledForest, X: pd.DataFrame,
+                                quantiles: tuple = INTERVAL_QUANTILES):
+    """
+    Batch version of predict_cost_interval: every row's trees are stacked
+    into one array, so the mean and both bounds come from the same pass.
+
+    Returns:
+        tuple: (predictions, lower bounds, upper bounds) as float arrays
+    """
+    means, bounds = engine.predict_quantiles(X, quantiles)
+    return means, bounds[:, 0], bounds[:, 1]
+
+
+def sensitivity_sweep(user_inputs: dict, feature: str, values,
+                      model, model_features: list) -> pd.DataFrame:
+    """
+    Predict the cost of a site profile while one input takes each of
+    `values` and the others stay as entered. All grid points are scored in
+    one batch.
+
+    Returns:
+        DataFrame: one row per value, columns `feature` and
+        `predicted_electricity_cost`.
+    """
+    values = np.asarray(values)
+    site_profiles = pd.DataFrame({
+        name: values if name == feature
+        else np.repeat(user_inputs[name], len(values))
+        for name in PROFILE_COLUMNS
+    })
+    X = prepare_features_batch(site_profiles, model_features)
+    return pd.DataFrame({
+        feature: values,
+        "predicted_electricity_cost": predict_cost_batch(model, X),
+    })
+
+
+def canonical_profile(user_inputs: dict) -> tuple:
+    """
+    Return a hashable, order-independent key for a site profile, with
+    numbers normalised so that e.g. 70 and 70.0 map to the same entry.
+    """
+    key = []
+    for name in PROFILE_COLUMNS:
+        value = user_inputs[name]
+        if name == "resident_count":
+            value = int(value)
+        elif name != "structure_type":
+            value = float(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions keyed on (model hash, canonical
+    profile), with an optional time-to-live per entry. Values are stored
+    as given, e.g. a (prediction, low, high) tuple.
+
+    Entries belong to one model version; when a different model hash is
+    seen, every entry of the previous model is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._model_hash = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _switch_model(self, model_hash: str) -> None:
+        if model_hash != self._model_hash:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._model_hash = model_hash
+
+    def get(self, model_hash: str, key: tuple):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            self._switch_model(model_hash)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() - entry[1] > self.ttl:
+                    del self._entries[key]
+                    self.evictions += 1
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model_hash: str, key: tuple, prediction) -> None:
+        with self._lock:
+            self._switch_model(model_hash)
+            self._entries[key] = (prediction, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        # Read together, so the counters come from one moment
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            evictions, size = self.evictions, len(self._entries)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+            "size": size,
+            "maxsize": self.maxsize,
+        }
+
+
+# Shared by every session in the process.
+prediction_cache = PredictionCache(maxsize=1024)
+
+
+def predict_cost_cached(user_inputs: dict, loaded,
+                        X_live: pd.DataFrame = None,
+                        cache: PredictionCache = prediction_cache) -> tuple:
+    """
+    Return the prediction for a site profile with its per-tree interval,
+    re-using a cached result for the same profile and model version. On a
+    miss, a forest's estimate and interval come from one per-tree pass.
+
+    Args:
+        loaded: the LoadedModel to predict with.
+        X_live: the profile's feature row, if the caller has it already.
+
+    Returns:
+        tuple: (prediction, lower bound, upper bound); the bounds are None
+        for models without a compiled engine.
+    """
+    key = canonical_profile(user_inputs)
+    entry = cache.get(loaded.model_hash, key)
+    if entry is None:
+        if X_live is None:
+            X_live = prepare_features(
+                user_inputs=user_inputs,
+                model_features=loaded.model_features
+            )
+        if loaded.engine is not None:
+            entry = predict_cost_interval(engine=loaded.engine, X_live=X_live)
+        else:
+            entry = (
+                predict_cost(model=loaded.predictor(1), X_live=X_live),
+                None, None,
+            )
+        cache.put(loaded.model_hash, key, entry)
+    return entry
@@ -0,0 +1,105 @@
+"""
+Column names, categories and header clean-up for the electricity dataset.
+
+Kept free of scikit-learn so that the data loaders and the lighter pages
+can use them without importing the ML stack; feature_engineering.py
+re-exports everything here.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Raw site profile fields (after column standardisation).
+PROFILE_COLUMNS = [
+    "site_area",
+    "water_consumption",
+    "recycling_rate",
+    "utilisation_rate",
+    "air_quality_index",
+    "issue_resolution_time",
+    "resident_count",
+    "structure_type",
+]
+NUMERIC_COLUMNS = PROFILE_COLUMNS[:-1]
+
+# Display labels of every profile input
+INPUT_LABELS = {
+    "site_area": "Site area",
+    "water_consumption": "Water consumption",
+    "recycling_rate": "Recycling rate",
+    "utilisation_rate": "Utilisation rate",
+    "air_quality_index": "Air quality index",
+    "issue_resolution_time": "Issue resolution time",
+    "resident_count": "Resident / occupant count",
+    "structure_type": "Structure type",
+}
+TARGET = "electricity_cost"
+
+# Numeric columns the raw dataset records as whole numbers (the others,
+# water consumption and the target, are written as floats)
+INTEGER_COLUMNS = [
+    c for c in NUMERIC_COLUMNS if c != "water_consumption"
+]
+
+STRUCTURE_TYPES = ["Commercial", "Residential", "Mixed-use", "Industrial"]
+
+# resident_count bins (right-inclusive upper edges): 0 -> none,
+# 1-50 -> low, 51-150 -> medium, above -> high
+RESIDENT_EDGES = [0, 50, 150]
+RESIDENT_LABELS = ["none", "low", "medium", "high"]
+
+# One-hot categories kept after pd.get_dummies(drop_first=True) in
+# Notebook 03; "Commercial" and "high" are the dropped reference levels.
+STRUCTURE_DUMMIES = ["Industrial", "Mixed-use", "Residential"]
+RESIDENT_DUMMIES = ["low", "medium", "none"]
+
+# Column order of the cleaned dataset / trained model (without target)
+MODEL_FEATURES = (
+    NUMERIC_COLUMNS
+    + [f"structure_type_{s}" for s in STRUCTURE_DUMMIES]
+    + [f"resident_group_{g}" for g in RESIDENT_DUMMIES]
+    + ["water_consumption_log"]
+)
+
+# Known typos in the raw dataset headers
+COLUMN_TYPOS = {
+    "air_qality_index": "air_quality_index",
+    "issue_reolution_time": "issue_resolution_time",
+}
+
+
+def standardise_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with snake_case column names and the raw dataset's header
+    typos fixed (e.g. `air qality index` -> `air_quality_index`).
+    """
+    df = df.copy(deep=False)
+    df.columns = (
+        df.columns.str.strip()
+        .str.lower()
+        .str.replace(" ", "_")
+    )
+    return df.rename(columns=COLUMN_TYPOS)
+
+
+def resident_group(resident_count: int) -> str:
+    """
+    Group resident_count into the same categories used during
+    feature engineering (Notebook 03): none, low, medium, high.
+    """
+    return RESIDENT_LABELS[np.searchsorted(RESIDENT_EDGES, resident_count)]
+
+
+def profile_input(feature: str) -> str:
+    """
+    Return the profile column a model feature is derived from, e.g.
+    `structure_type_Industrial` -> `structure_type` and
+    `water_consumption_log` -> `water_consumption`.
+    """
+    if feature.startswith("structure_type_"):
+        return "structure_type"
+    if feature.startswith("resident_group_"):
+        return "resident_count"
+    if feature == "water_consumption_log":
+        return "water_consumption"
+    return feature
@@ -0,0 +1,86 @@
+"""
+Shared plumbing of the KD-tree indexes stored next to the data they are
+built from (support_index.py, comparable_sites.py): standardisation,
+persistence as a plain dict, and process-wide reuse keyed on the source
+data's content hash.
+"""
+import os
+import threading
+
+import numpy as np
+
+
+# Loaded indexes by file path, shared by every session of the process
+_lock = threading.Lock()
+_indexes = {}
+
+
+def standard_scale(values) -> tuple:
+    """
+    Column means and standard deviations of a 2D array, or of the rows of
+    a list of 2D arrays taken together without concatenating them.
+    Constant columns would divide by zero; any scale works for them, so
+    they get 1.
+
+    Returns:
+        tuple: (mean, scale)
+    """
+    blocks = values if isinstance(values, list) else [values]
+    rows = sum(len(block) for block in blocks)
+    # The two passes of ndarray.mean and ndarray.std, block by block
+    mean = sum(block.sum(axis=0) for block in blocks) / rows
+    std = np.sqrt(
+        sum(((block - mean) ** 2).sum(axis=0) for block in blocks) / rows
+    )
+    return mean, np.where(std > 0, std, 1.0)
+
+
+class StoredIndex:
+    """
+    Base class of an index persisted with joblib. Subclasses list their
+    constructor arguments in `STATE`, which must include `source_hash`;
+    storing them as a plain dict keeps loading independent of where the
+    class was imported from.
+    """
+
+    STATE = ("source_hash",)
+
+    def save(self, file_path: str) -> None:
+        """Store the index atomically, so readers never see half of it."""
+        import joblib
+
+        state = {name: getattr(self, name) for name in self.STATE}
+        tmp_path = f"{file_path}.tmp"
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str):
+        import joblib
+
+        return cls(**joblib.load(file_path))
+
+
+def load_stored_index(cls, file_path: str, source_hash: str, build):
+    """
+    Return the index stored at `file_path`, loaded once per process. If
+    it is missing or was built from different data, `build()` rebuilds
+    (and stores) it.
+    """
+    index = _indexes.get(file_path)
+    if index is not None and index.source_hash == source_hash:
+        return index
+
+    with _lock:
+        index = _indexes.get(file_path)
+        if index is not None and index.source_hash == source_hash:
+            return index
+
+        try:
+            index = cls.load(file_path)
+        except FileNotFoundError:
+            index = None
+        if index is None or index.source_hash != source_hash:
+            index = build()
+        _indexes[file_path] = index
+    return index
@@ -0,0 +1,217 @@
+"""
+Build the cleaned dataset from the raw CSV in fixed-size chunks.
+
+    python -m src.machine_learning.streaming_pipeline --chunk-rows 50000
+
+Same output as Notebook 03 / build_cleaned_dataset, but the raw file is
+never held in memory at once: each chunk is read, its headers
+standardised, validated, feature-engineered and appended to the output
+before the next one is read, so memory is bounded by the chunk size
+rather than the size of the site registry.
+
+After the cleaned CSV is replaced, its columnar copy, the dataset
+statistics and the comparable-sites index are rebuilt from it, again
+chunk by chunk: the columnar copy is assembled from parsed chunks and
+the statistics and index are read from its memory-mapped columns.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import CHUNK_ROWS, build_store
+from src.data_management import CLEANED_DATA_PATH, RAW_DATA_PATH
+from src.dataset_stats import STATS_PATH, rebuild_dataset_stats
+from src.machine_learning.comparable_sites import (
+    COMPARABLE_INDEX_PATH, build_comparable_index)
+from src.machine_learning.feature_engineering import (
+    NUMERIC_COLUMNS, PROFILE_COLUMNS, STRUCTURE_TYPES, TARGET,
+    build_cleaned_dataset, standardise_columns)
+from src.machine_learning.schema import INTEGER_COLUMNS
+
+
+# Raw line numbers quoted in validation errors
+MAX_REPORTED_ROWS = 10
+
+
+def read_raw_chunks(file_path: str = RAW_DATA_PATH,
+                    chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield the raw dataset `chunk_rows` rows at a time, with standardised
+    column names (snake_case, `air_qality_index` -> `air_quality_index`).
+    """
+    with pd.read_csv(file_path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield standardise_columns(chunk)
+
+
+def invalid_rows(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    Boolean mask of rows the feature engineering can't use: missing,
+    non-numeric or infinite numbers, a missing target or an unknown
+    structure type.
+
+    Raises:
+        ValueError: if required columns are missing.
+    """
+    missing = [
+        c for c in PROFILE_COLUMNS + [TARGET] if c not in chunk.columns
+    ]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    numbers = chunk[NUMERIC_COLUMNS + [TARGET]].apply(
+        pd.to_numeric, errors="coerce"
+    )
+    stype = chunk["structure_type"].astype(str).str.strip()
+    return (
+        ~np.isfinite(numbers.to_numpy(dtype=float)).all(axis=1)
+        | ~stype.isin(STRUCTURE_TYPES).to_numpy()
+    )
+
+
+def numeric_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the numeric columns of valid rows. A text value (resident_count
+    "unknown") leaves its column as strings, and a missing or infinite
+    value makes pandas read an integer column as floats; once such rows
+    are dropped, the integer columns are cast back so every chunk is
+    written in the same format as a clean one.
+    """
+    numbers = {
+        c: pd.to_numeric(chunk[c]) for c in NUMERIC_COLUMNS + [TARGET]
+    }
+    for c in INTEGER_COLUMNS:
+        if numbers[c].dtype.kind == "f" and (numbers[c] % 1 == 0).all():
+            numbers[c] = numbers[c].astype("int64")
+    return chunk.assign(**numbers)
+
+
+def validated_chunks(chunks, drop_invalid: bool = False,
+                     report: dict = None):
+    """
+    Check each chunk and yield it with the profile and target columns
+    only. Invalid rows either stop the pipeline or, with `drop_invalid`,
+    are left out and counted in `report["rows_dropped"]`.
+
+    Raises:
+        ValueError: on the first chunk with invalid rows, quoting their
+            line numbers in the raw CSV, unless `drop_invalid` is set.
+    """
+    report = {} if report is None else report
+    report.setdefault("rows_read", 0)
+    report.setdefault("rows_dropped", 0)
+
+    for chunk in chunks:
+        bad = invalid_rows(chunk)
+        if bad.any():
+            if not drop_invalid:
+                # +2: 1-based line numbers after the header line
+                lines = (np.flatnonzero(bad) + report["rows_read"] + 2)
+                shown = ", ".join(map(str, lines[:MAX_REPORTED_ROWS]))
+                raise ValueError(
+                    f"{bad.sum()} invalid row(s) at line(s) {shown}"
+                    f"{' ...' if len(lines) > MAX_REPORTED_ROWS else ''}"
+                )
+            report["rows_dropped"] += int(bad.sum())
+
+        report["rows_read"] += len(chunk)
+        chunk = numeric_chunk(chunk.loc[~bad, PROFILE_COLUMNS + [TARGET]])
+        if len(chunk):
+            yield chunk
+
+
+def cleaned_chunks(chunks):
+    """Yield the cleaned-dataset rows (features + target) of each chunk."""
+    for chunk in chunks:
+        yield build_cleaned_dataset(chunk)
+
+
+def write_chunks(chunks, output_path: str = CLEANED_DATA_PATH) -> int:
+    """
+    Append chunks to a CSV, writing the header once. The file is written
+    next to `output_path` and moved into place at the end, so readers
+    never see a partial dataset and a failed run leaves the old one.
+
+    Returns:
+        int: rows written.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    rows = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=rows == 0, index=False)
+                rows += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return rows
+
+
+def build_cleaned_csv(raw_path: str = RAW_DATA_PATH,
+                      output_path: str = CLEANED_DATA_PATH,
+                      chunk_rows: int = CHUNK_ROWS,
+                      drop_invalid: bool = False) -> dict:
+    """
+    Stream the raw CSV through validation and feature engineering into
+    the cleaned CSV, then rebuild the artifacts derived from it.
+
+    Returns:
+        dict: rows read, written and dropped, the chunk size used and the
+        rebuilt artifacts.
+    """
+    report = {"chunk_rows": chunk_rows}
+    chunks = validated_chunks(
+        read_raw_chunks(raw_path, chunk_rows), drop_invalid, report
+    )
+    report["rows_written"] = write_chunks(cleaned_chunks(chunks),
+                                          output_path)
+    report["rebuilt"] = rebuild_derived(output_path, raw_path, chunk_rows)
+    return report
+
+
+def rebuild_derived(output_path: str = CLEANED_DATA_PATH,
+                    raw_path: str = RAW_DATA_PATH,
+                    chunk_rows: int = CHUNK_ROWS) -> list:
+    """
+    Rebuild what is derived from the cleaned CSV: its columnar copy and,
+    for the app's dataset, the summary statistics (with the categorical
+    counts of `raw_path`) and comparable-sites index. Support indexes are
+    built from each model version's X_train, not from this file, and are
+    unaffected.
+
+    Returns:
+        list: paths of the rebuilt artifacts.
+    """
+    rebuilt = [build_store(output_path, chunk_rows)]
+    if os.path.abspath(output_path) == os.path.abspath(CLEANED_DATA_PATH):
+        rebuild_dataset_stats(STATS_PATH, output_path, raw_path, chunk_rows)
+        build_comparable_index(output_path)
+        rebuilt += [STATS_PATH, COMPARABLE_INDEX_PATH]
+    return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the cleaned dataset from the raw CSV in chunks."
+    )
+    parser.add_argument("--input", default=RAW_DATA_PATH)
+    parser.add_argument("--output", default=CLEANED_DATA_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--drop-invalid", action="store_true",
+                        help="Skip invalid rows instead of stopping.")
+    args = parser.parse_args()
+
+    report = build_cleaned_csv(
+        args.input, args.output, args.chunk_rows, args.drop_invalid
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Out-of-distribution check for live inputs.
+
+    python -m src.machine_learning.support_index --version v1
+
+A KD-tree over the standardised training features is built once per model
+version (at training time, or on first use for older versions) and stored
+next to the model as `support_index.joblib`. Each input is scored by its
+mean distance to its nearest training sites, relative to how far training
+sites typically are from their own neighbours: a score above 1 means the
+input is further from the data than 99% of the training sites are.
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import load_model_splits
+from src.model_registry import current_version, file_hash, version_path
+from src.machine_learning.stored_index import (
+    StoredIndex, load_stored_index, standard_scale)
+
+
+SUPPORT_FILE = "support_index.joblib"
+
+# Neighbours averaged per query, and the quantile of the training sites'
+# own neighbour distances that maps to a score of 1
+SUPPORT_K = 5
+SUPPORT_QUANTILE = 0.99
+
+
+class SupportIndex(StoredIndex):
+    """
+    KD-tree over standardised training rows, with the per-feature ranges
+    and the distance threshold that define "inside the training data".
+    """
+
+    STATE = ("tree", "features", "mean", "scale", "minimum", "maximum",
+             "threshold", "k", "source_hash")
+
+    def __init__(self, tree, features, mean, scale, minimum, maximum,
+                 threshold, k=SUPPORT_K, source_hash=None):
+        self.tree = tree
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.minimum = np.asarray(minimum, dtype=float)
+        self.maximum = np.asarray(maximum, dtype=float)
+        self.threshold = float(threshold)
+        self.k = int(k)
+        self.source_hash = source_hash
+
+    @classmethod
+    def build(cls, X_train: pd.DataFrame, k: int = SUPPORT_K,
+              quantile: float = SUPPORT_QUANTILE, source_hash: str = None):
+        """
+        Standardise X_train, index it and set the threshold from each
+        training row's distance to its k nearest other rows.
+        """
+        from sklearn.neighbors import KDTree
+
+        X = X_train.to_numpy(dtype=float)
+        mean, scale = standard_scale(X)
+        scaled = (X - mean) / scale
+        tree = KDTree(scaled)
+
+        # k + 1: every training row is its own nearest neighbour
+        distances, _ = tree.query(scaled, k=k + 1)
+        threshold = np.quantile(distances[:, 1:].mean(axis=1), quantile)
+
+        return cls(tree, X_train.columns, mean, scale, X.min(axis=0),
+                   X.max(axis=0), threshold, k, source_hash)
+
+    def _matrix(self, X: pd.DataFrame) -> np.ndarray:
+        return X[self.features].to_numpy(dtype=float)
+
+    def distance(self, X: pd.DataFrame) -> np.ndarray:
+        """Mean distance of each row to its k nearest training rows."""
+        scaled = (self._matrix(X) - self.mean) / self.scale
+        distances, _ = self.tree.query(scaled, k=self.k)
+        return distances.mean(axis=1)
+
+    def out_of_range(self, X: pd.DataFrame) -> list:
+        """Per row, the features outside the range seen in training."""
+        values = self._matrix(X)
+        outside = (values < self.minimum) | (values > self.maximum)
+        features = np.array(self.features, dtype=object)
+        return [list(features[row]) for row in outside]
+
+    def score(self, X: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score model-feature rows against the training data.
+
+        Returns:
+            DataFrame: `support_score` (distance relative to the
+            threshold), `outside_training_data` (score above 1 or any
+            feature out of range) and `out_of_range_features`.
+        """
+        score = self.distance(X) / self.threshold
+        out_of_range = self.out_of_range(X)
+        return pd.DataFrame({
+            "support_score": score,
+            "outside_training_data": (
+                (score > 1) | np.array([bool(f) for f in out_of_range])
+            ),
+            "out_of_range_features": [", ".join(f) for f in out_of_range],
+        }, index=X.index)
+
+
+def build_support_index(version: str = None) -> SupportIndex:
+    """Build and store the support index of a version from its X_train."""
+    version = version or current_version()
+    model_path = version_path(version)
+    X_train, _, _, _ = load_model_splits(model_path)
+    index = SupportIndex.build(
+        X_train, source_hash=file_hash(f"{model_path}/X_train.csv")
+    )
+    index.save(f"{model_path}/{SUPPORT_FILE}")
+    return index
+
+
+def load_support_index(version: str = None) -> SupportIndex:
+    """
+    Return the support index of a version (default: current), loaded once
+    per process. It is rebuilt if missing or built from a different
+    X_train.
+    """
+    version = version or current_version()
+    model_path = version_path(version)
+    return load_stored_index(
+        SupportIndex, f"{model_path}/{SUPPORT_FILE}",
+        file_hash(f"{model_path}/X_train.csv"),
+        lambda: build_support_index(version),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the out-of-distribution index of a version."
+    )
+    parser.add_argument("--version", default=None,
+                        help="Defaults to the current serving version.")
+    args = parser.parse_args()
+
+    version = args.version or current_version()
+    index = build_support_index(version)
+    print(json.dumps({
+        "version": version,
+        "rows": int(index.tree.data.shape[0]),
+        "k": index.k,
+        "threshold": round(index.threshold, 4),
+    }, indent=2))
+    print(f"Stored in {version_path(version)}/{SUPPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Array-backed inference engine for the trained Random Forest.
+
+The forest's node arrays are exported once into flat, contiguous NumPy
+buffers and evaluated with NumPy only, so serving does not pay sklearn's
+per-call input validation or joblib thread dispatch. This module must not
+import sklearn; `from_sklearn` only reads attributes of the fitted model.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Rows per chunk in batch prediction; (rows x trees) work arrays stay small
+CHUNK_ROWS = 2048
+
+# Compact artifact layout (see save_compact)
+COMPACT_META = "meta.json"
+COMPACT_ARRAYS = ["children", "is_leaf", "feature", "threshold", "value",
+                  "roots"]
+COMPACT_COMPRESSED = "arrays.npz"
+COMPACT_FORMAT = 1
+
+
+def float32_floor(values) -> np.ndarray:
+    """
+    Cast to float32, rounding down instead of to nearest. For any float32
+    x, `x <= t` then holds exactly when `x <= float32_floor(t)`, so split
+    thresholds keep their decisions on (float32-rounded) inputs.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompiledForest:
+    """
+    A regression forest flattened into contiguous node arrays.
+
+    All trees share one set of arrays; `roots` holds the index of each
+    tree's root node. Leaves point to themselves in `left`/`right`, so a
+    walk that has reached a leaf simply stays there. `cover` (the weighted
+    training samples reaching each node) is only needed for feature
+    contributions, see contributions.py.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 max_depth, feature_names=None, cover=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.feature_names = (
+            list(feature_names) if feature_names is not None else None
+        )
+        self.cover = (
+            np.ascontiguousarray(cover, dtype=np.float64)
+            if cover is not None else None
+        )
+
+        # Interleaved (right, left) children: child = _children[2 * node +
+        # went_left] replaces a np.where over two gathers.
+        self._children = np.stack([self.right, self.left], axis=1).ravel()
+        self._is_leaf = self.left == np.arange(self.n_nodes)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """
+        Export a fitted RandomForestRegressor (single output) into flat
+        arrays. Node indices are offset so they index the shared arrays.
+        """
+        features, thresholds, lefts, rights, values, roots, covers = (
+            [], [], [], [], [], [], []
+        )
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(left)
+            rights.append(right)
+            values.append(tree.value[:, 0, 0])
+            covers.append(tree.weighted_n_node_samples)
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots),
+            max_depth=max_depth,
+            feature_names=getattr(model, "feature_names_in_", None),
+            cover=np.concatenate(covers),
+        )
+
+    def save(self, file_path: str) -> None:
+        """Save the node arrays to a single `.npz` file."""
+        np.savez(
+            file_path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=np.array(self.max_depth),
+            feature_names=np.array(self.feature_names or [], dtype=str),
+            **({"cover": self.cover} if self.cover is not None else {}),
+        )
+
+    def save_compact(self, directory: str, compress: bool = False,
+                     **details) -> None:
+        """
+        Write a slim serving artifact: float32 thresholds (rounded down,
+        see float32_floor) and leaf values, the interleaved child array and
+        a leaf mask, one `.npy` file each so they can be memory-mapped.
+        Node cover, when known, is stored too (float32 holds the sample
+        counts exactly).
+        With `compress`, the arrays go into one compressed `.npz` instead
+        (smaller on disk, but loaded into memory). `details` are stored in
+        the metadata file.
+        """
+        arrays = {
+            "children": self._children.astype(np.int32),
+            "is_leaf": self._is_leaf,
+            "feature": self.feature,
+            "threshold": float32_floor(self.threshold),
+            "value": self.value.astype(np.float32),
+            "roots": self.roots,
+        }
+        if self.cover is not None:
+            arrays["cover"] = self.cover.astype(np.float32)
+
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        if compress:
+            np.savez_compressed(f"{tmp_dir}/{COMPACT_COMPRESSED}", **arrays)
+        else:
+            for name, values in arrays.items():
+                np.save(f"{tmp_dir}/{name}.npy",
+                        np.ascontiguousarray(values))
+
+        meta = {
+            "format": COMPACT_FORMAT,
+            "compressed": compress,
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+            "max_depth": self.max_depth,
+            "feature_names": self.feature_names,
+            **details,
+        }
+        with open(f"{tmp_dir}/{COMPACT_META}", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load_compact(cls, directory: str,
+                     mmap: bool = True) -> "CompiledForest":
+        """
+        Load an artifact written by `save_compact`. Uncompressed arrays are
+        memory-mapped read-only with `mmap`, so loading reads no node data
+        until predictions touch it, and processes share the pages.
+        """
+        with open(f"{directory}/{COMPACT_META}", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != COMPACT_FORMAT:
+            raise ValueError(
+                f"Unsupported compact model format in `{directory}`"
+            )
+
+        if meta["compressed"]:
+            with np.load(f"{directory}/{COMPACT_COMPRESSED}") as data:
+                arrays = {
+                    name: data[name] for name in COMPACT_ARRAYS + ["cover"]
+                    if name in data
+                }
+        else:
+            mmap_mode = "r" if mmap else None
+            # cover is optional: artifacts exported before it was added
+            # still load, without feature contributions
+            arrays = {
+                name: np.load(f"{directory}/{name}.npy", mmap_mode=mmap_mode)
+                for name in COMPACT_ARRAYS + ["cover"]
+                if name in COMPACT_ARRAYS
+                or os.path.exists(f"{directory}/{name}.npy")
+            }
+
+        # Bypass __init__: it would copy (and upcast) every array.
+        forest = cls.__new__(cls)
+        forest.feature = arrays["feature"]
+        forest.threshold = arrays["threshold"]
+        forest.value = arrays["value"]
+        forest.roots = arrays["roots"]
+        forest._children = arrays["children"]
+        forest._is_leaf = arrays["is_leaf"]
+        forest.left = forest._children[1::2]
+        forest.right = forest._children[0::2]
+        forest.max_depth = int(meta["max_depth"])
+        forest.feature_names = meta["feature_names"]
+        forest.cover = arrays.get("cover")
+        return forest
+
+    @classmethod
+    def load(cls, file_path: str) -> "CompiledForest":
+        """Load node arrays written by `save`."""
+        with np.load(file_path) as data:
+            names = data["feature_names"].tolist() or None
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                value=data["value"],
+                roots=data["roots"],
+                max_depth=int(data["max_depth"]),
+                feature_names=names,
+                cover=data["cover"] if "cover" in data else None,
+            )
+
+    def _as_matrix(self, X) -> np.ndarray:
+        """
+        Return X as a 2D float array in training column order. Values are
+        rounded through float32, as sklearn does before comparing them to
+        the split thresholds.
+        """
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X.astype(np.float64)
+
+    def leaves(self, X) -> np.ndarray:
+        """Return the leaf reached in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        n_rows = X.shape[0]
+
+        # Work on flat (tree, row) pairs in tree-major order so consecutive
+        # lookups hit the same tree's nodes; X is gathered feature-major.
+        X_flat = np.ascontiguousarray(X.T).ravel()
+        nodes = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        position = np.arange(nodes.size)
+        result = nodes.copy()
+
+        for _ in range(self.max_depth):
+            go_left = (
+                X_flat[self.feature[nodes] * n_rows + rows]
+                <= self.threshold[nodes]
+            )
+            nodes = self._children[2 * nodes + go_left]
+
+            # Drop pairs that reached a leaf so later levels do less work.
+            done = self._is_leaf[nodes]
+            if done.any():
+                result[position[done]] = nodes[done]
+                active = ~done
+                nodes, rows, position = (
+                    nodes[active], rows[active], position[active]
+                )
+                if not nodes.size:
+                    break
+
+        return result.reshape(self.n_trees, n_rows).T
+
+    def predict_per_tree(self, X) -> np.ndarray:
+        """Return every tree's prediction, shape (n_rows, n_trees)."""
+        return self.value[self.leaves(X)].astype(np.float64, copy=False)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Vectorised batch prediction: the mean over trees for each row.
+        Rows are processed in chunks to bound the working memory.
+        """
+        X = self._as_matrix(X)
+        return np.concatenate([
+            self.predict_per_tree(X[i:i + CHUNK_ROWS]).mean(axis=1)
+            for i in range(0, max(len(X), 1), CHUNK_ROWS)
+        ])
+
+    def predict_quantiles(self, X, quantiles) -> tuple:
+        """
+        Mean and empirical quantiles of the per-tree predictions, from one
+        pass over the stacked (rows x trees) outputs of each chunk.
+
+        Returns:
+            tuple: (means with shape (n_rows,), quantiles with shape
+            (n_rows, len(quantiles)))
+        """
+        X = self._as_matrix(X)
+        means, bounds = [], []
+        for i in range(0, max(len(X), 1), CHUNK_ROWS):
+            per_tree = self.predict_per_tree(X[i:i + CHUNK_ROWS])
+            means.append(per_tree.mean(axis=1))
+            bounds.append(np.quantile(per_tree, quantiles, axis=1).T)
+        return np.concatenate(means), np.concatenate(bounds)
+
+    def predict_one_per_tree(self, x) -> np.ndarray:
+        """
+        Low-latency path for a single row: walks all trees together on
+        1D arrays, stops as soon as every tree has reached a leaf and
+        returns each tree's prediction.
+        """
+        x = self._as_matrix(x)[0]
+        nodes = self.roots
+
+        for _ in range(self.max_depth):
+            next_nodes = self._children[
+                2 * nodes + (x[self.feature[nodes]] <= self.threshold[nodes])
+            ]
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+
+        return self.value[nodes].astype(np.float64, copy=False)
+
+    def predict_one(self, x) -> float:
+        """Single-row prediction, see predict_one_per_tree."""
+        return float(self.predict_one_per_tree(x).mean())
+
+
+def check_parity(model, engine: CompiledForest, X, atol=1e-6) -> dict:
+    """
+    Compare the engine against `model.predict` on X, for both the batch
+    and single-row paths, and report timings.
+
+    Returns:
+        dict: max absolute differences, whether they are within `atol`,
+        and mean per-call times in milliseconds.
+    """
+    start = time.perf_counter()
+    expected = np.asarray(model.predict(X), dtype=float)
+    sklearn_batch_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    batch = engine.predict(X)
+    engine_batch_ms = (time.perf_counter() - start) * 1000
+
+    X_rows = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+    if isinstance(X, pd.DataFrame) and engine.feature_names is not None:
+        X_rows = X[engine.feature_names].to_numpy()
+
+    start = time.perf_counter()
+    single = np.array([engine.predict_one(row) for row in X_rows])
+    engine_single_ms = (time.perf_counter() - start) * 1000 / len(X_rows)
+
+    start = time.perf_counter()
+    n_sklearn_single = min(len(X_rows), 20)
+    for i in range(n_sklearn_single):
+        model.predict(X.iloc[[i]] if isinstance(X, pd.DataFrame)
+                      else X_rows[i:i + 1])
+    sklearn_single_ms = (
+        (time.perf_counter() - start) * 1000 / n_sklearn_single
+    )
+
+    batch_diff = float(np.max(np.abs(batch - expected)))
+    single_diff = float(np.max(np.abs(single - expected)))
+
+    return {
+        "rows": len(X_rows),
+        "batch_max_abs_diff": batch_diff,
+        "single_max_abs_diff": single_diff,
+        "parity": batch_diff <= atol and single_diff <= atol,
+        "sklearn_batch_ms": sklearn_batch_ms,
+        "engine_batch_ms": engine_batch_ms,
+        "sklearn_single_ms": sklearn_single_ms,
+        "engine_single_ms": engine_single_ms,
+    }
+
+
+def main():
+    """
+    Compile a saved model version, check parity against `model.predict`
+    on its saved X_test.csv, and store the compiled arrays next to it.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--version", default="v1")
+    parser.add_argument(
+        "--root", default="outputs/ml_pipeline/electricity_cost"
+    )
+    args = parser.parse_args()
+
+    import joblib
+
+    model_path = f"{args.root}/{args.version}"
+    model = joblib.load(f"{model_path}/random_forest_model.pkl")
+    engine = CompiledForest.from_sklearn(model)
+    X_test = pd.read_csv(f"{model_path}/X_test.csv")
+
+    report = check_parity(model, engine, X_test)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+    if not report["parity"]:
+        raise SystemExit("Compiled forest does not match model.predict")
+
+    engine.save(f"{model_path}/compiled_forest.npz")
+    print(f"Saved {model_path}/compiled_forest.npz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Process-wide latency/throughput metrics in the Prometheus text format.
+
+Metrics are off unless the ELECTRICITY_METRICS environment variable is
+set (e.g. ELECTRICITY_METRICS=1) when the process starts. While off, the
+`timed` and `loader` decorators return the undecorated function, so
+instrumented code pays nothing per call.
+
+Exporting:
+    ELECTRICITY_METRICS_FILE=<path>  rewrite a text file after each rerun
+    ELECTRICITY_METRICS_PORT=<port>  serve GET /metrics from the app process
+The prediction service also serves GET /metrics when metrics are enabled.
+"""
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ENABLED = os.environ.get("ELECTRICITY_METRICS", "") not in ("", "0")
+METRICS_FILE = os.environ.get("ELECTRICITY_METRICS_FILE")
+METRICS_PORT = os.environ.get("ELECTRICITY_METRICS_PORT")
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+_lock = threading.Lock()
+_server = None
+
+
+def _label_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> list:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",),
+                                    series["counts"]):
+                cumulative += count
+                bucket_key = key + (("le", bound),)
+                lines.append(
+                    f"{self.name}_bucket{_label_text(bucket_key)} "
+                    f"{cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_label_text(key)} {series['sum']}")
+            lines.append(
+                f"{self.name}_count{_label_text(key)} {series['count']}"
+            )
+        return lines
+
+    def summary(self) -> list:
+        """One row per label set: count, mean and total."""
+        with _lock:
+            items = sorted(self.series.items())
+        return [
+            {
+                **dict(key),
+                "count": series["count"],
+                "mean": series["sum"] / series["count"],
+                "total": series["sum"],
+            }
+            for key, series in items
+        ]
+
+
+class Gauge:
+    """Last value seen, one series per label set."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.series = {}
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self.series[tuple(sorted(labels.items()))] = value
+
+    def samples(self) -> list:
+        return [
+            f"{self.name}{_label_text(key)} {value}"
+            for key, value in sorted(self.series.items())
+        ]
+
+
+PAGE_RENDER_SECONDS = Histogram(
+    "electricity_page_render_seconds",
+    "Time to render one dashboard page (one Streamlit rerun).",
+    LATENCY_BUCKETS,
+)
+LOADER_SECONDS = Histogram(
+    "electricity_loader_seconds",
+    "I/O time of a data/model loader call (cache misses only for "
+    "st.cache_data loaders).",
+    LATENCY_BUCKETS,
+)
+LOADER_ROWS = Gauge(
+    "electricity_loader_rows", "Rows returned by the last loader call."
+)
+LOADER_BYTES = Gauge(
+    "electricity_loader_bytes",
+    "In-memory size of the data returned by the last loader call.",
+)
+PREDICTION_SECONDS = Histogram(
+    "electricity_prediction_seconds",
+    "Latency of one predict_cost / predict_cost_batch call.",
+    LATENCY_BUCKETS,
+)
+PREDICTION_BATCH_SIZE = Histogram(
+    "electricity_prediction_batch_size",
+    "Rows scored per prediction call.",
+    SIZE_BUCKETS,
+)
+
+REGISTRY = [
+    PAGE_RENDER_SECONDS, LOADER_SECONDS, LOADER_ROWS, LOADER_BYTES,
+    PREDICTION_SECONDS, PREDICTION_BATCH_SIZE,
+]
+
+
+def timed(histogram: Histogram, size_histogram: Histogram = None,
+          size_arg: str = None, **labels):
+    """
+    Decorator recording the call duration in `histogram`. With
+    `size_histogram`, the length of the argument named `size_arg` is
+    recorded as the batch size.
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            histogram.observe(time.perf_counter() - start, **labels)
+            if size_histogram is not None:
+                sized = signature.bind(*args, **kwargs).arguments[size_arg]
+                size_histogram.observe(len(sized), **labels)
+            return result
+        return wrapper
+    return decorate
+
+
+def _rows_and_bytes(result):
+    """Rows and in-memory bytes of a DataFrame/Series/tuple of them."""
+    parts = result if isinstance(result, tuple) else (result,)
+    rows = nbytes = 0
+    for part in parts:
+        if hasattr(part, "memory_usage"):
+            rows += len(part)
+            # DataFrame.memory_usage is per column, Series' is a scalar
+            usage = part.memory_usage(index=True)
+            nbytes += int(usage.sum() if hasattr(usage, "sum") else usage)
+    return rows, nbytes
+
+
+def loader(name: str):
+    """Decorator recording a loader's I/O time, rows and bytes."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            LOADER_SECONDS.observe(
+                time.perf_counter() - start, loader=name
+            )
+            rows, nbytes = _rows_and_bytes(result)
+            if rows:
+                LOADER_ROWS.set(rows, loader=name)
+                LOADER_BYTES.set(nbytes, loader=name)
+            return result
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in REGISTRY:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str = None) -> None:
+    """Atomically write the metrics to `path` (textfile-collector style)."""
+    path = path or METRICS_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Silence per-scrape logging."""
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> None:
+    """Serve GET /metrics on a daemon thread; later calls are no-ops."""
+    global _server
+    with _lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+
+def export() -> None:
+    """Push metrics to the exporters configured in the environment."""
+    if METRICS_FILE:
+        write_textfile(METRICS_FILE)
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT))
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+
+from src.data_management import load_compact_model, load_pkl_file
+from src.hashing import file_hash
+from src.machine_learning.tree_engine import COMPACT_META, CompiledForest
+
+
+MODEL_ROOT = "outputs/ml_pipeline/electricity_cost"
+MANIFEST_PATH = f"{MODEL_ROOT}/manifest.json"
+
+DEFAULT_ARTIFACTS = {
+    "model": "random_forest_model.pkl",
+    "features": "model_features.pkl",
+}
+
+# Directory of a version's slim serving artifact (see compact_model.py)
+COMPACT_DIR = "compact_model"
+
+# Batch size above which sklearn's predict beats the compiled engine
+# (measured with the benchmark suite, see benchmarks/).
+ENGINE_MAX_ROWS = 1000
+
+# Used when no manifest has been published yet (original v1 layout).
+DEFAULT_MANIFEST = {
+    "current": "v1",
+    "versions": {"v1": dict(DEFAULT_ARTIFACTS)},
+}
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """
+    A model version loaded into memory, plus its content hash and, for
+    tree ensembles, the compiled array engine used for fast inference.
+    """
+    version: str
+    model: object
+    model_features: list
+    model_hash: str
+    engine: CompiledForest = None
+
+    @property
+    def path(self) -> str:
+        return version_path(self.version)
+
+    def predictor(self, n_rows: int = 1):
+        """
+        Return the faster scorer for a batch of `n_rows`: the compiled
+        engine has no per-call overhead, while sklearn's Cython traversal
+        wins on large batches. A version served from its compact artifact
+        has only the engine (`model` is the engine too).
+        """
+        if self.engine is not None and n_rows <= ENGINE_MAX_ROWS:
+            return self.engine
+        return self.model
+
+
+# Process-wide state. Streamlit serves every session from one process, so
+# these are shared by all users; the lock guards concurrent reruns.
+_lock = threading.Lock()
+_models = {}
+
+
+def version_path(version: str) -> str:
+    """Return the output directory of a model version."""
+    return f"{MODEL_ROOT}/{version}"
+
+
+def read_manifest() -> dict:
+    """
+    Read the model manifest. It is small and re-read on every call, which
+    is what lets a newly published version be picked up without restart.
+    """
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_MANIFEST
+
+
+def write_manifest(manifest: dict) -> None:
+    """Write the manifest atomically so readers never see a partial file."""
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def current_version() -> str:
+    """Return the version currently marked for serving."""
+    return read_manifest()["current"]
+
+
+def publish_version(version: str, artifacts: dict = None,
+                    make_current: bool = True, **details) -> None:
+    """
+    Register a version directory in the manifest and (by default) make it
+    the serving version. Running apps switch over on their next rerun.
+    """
+    manifest = read_manifest()
+    manifest = {
+        "current": manifest["current"],
+        "versions": dict(manifest["versions"]),
+    }
+    entry = dict(artifacts or DEFAULT_ARTIFACTS)
+    entry.update(details)
+    manifest["versions"][version] = entry
+    if make_current:
+        manifest["current"] = version
+    write_manifest(manifest)
+
+
+def artifact_paths(version: str) -> dict:
+    """
+    Return the file paths of a version's artifacts from the manifest. A
+    version directory that is not in the manifest yet (one being built by
+    train.publish_model) has the default layout, plus its compact artifact
+    once that has been exported, which is what it is published with.
+    """
+    versions = read_manifest()["versions"]
+    if version in versions:
+        artifacts = {**DEFAULT_ARTIFACTS, **versions[version]}
+    elif os.path.isdir(version_path(version)):
+        artifacts = dict(DEFAULT_ARTIFACTS)
+        if os.path.isdir(f"{version_path(version)}/{COMPACT_DIR}"):
+            artifacts["compact"] = COMPACT_DIR
+    else:
+        raise KeyError(f"Unknown model version `{version}`")
+    base = version_path(version)
+    paths = {
+        "model": f"{base}/{artifacts['model']}",
+        "features": f"{base}/{artifacts['features']}",
+    }
+    # Optional slim serving artifact, see machine_learning/compact_model.py
+    if "compact" in artifacts:
+        paths["compact"] = f"{base}/{artifacts['compact']}"
+    return paths
+
+
+def serves_compact(paths: dict) -> bool:
+    """True if a version is served from its compact artifact."""
+    return "compact" in paths and os.path.isdir(paths["compact"])
+
+
+def model_hash(version: str) -> str:
+    """
+    Combined content hash of a version's model and feature list. For a
+    compact artifact, its metadata file (which records the hash of the
+    model it was exported from) stands in for the model.
+    """
+    paths = artifact_paths(version)
+    model_file = (
+        f"{paths['compact']}/{COMPACT_META}" if serves_compact(paths)
+        else paths["model"]
+    )
+    combined = hashlib.sha256()
+    for file_path in (model_file, paths["features"]):
+        combined.update(file_hash(file_path).encode())
+    return combined.hexdigest()
+
+
+def compile_engine(model):
+    """
+    Compile a fitted forest into a CompiledForest, or return None if the
+    model is not a tree ensemble.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not hasattr(estimators[0], "tree_"):
+        return None
+    return CompiledForest.from_sklearn(model)
+
+
+def get_model(version: str = None) -> LoadedModel:
+    """
+    Return the requested (default: current) model version.
+
+    Each version is unpickled once per process and reused by every session.
+    If the artifacts on disk change, the content hash changes and the
+    version is reloaded; versions no longer requested are dropped.
+    """
+    version = version or current_version()
+    paths = artifact_paths(version)
+
+    try:
+        content_hash = model_hash(version)
+    except FileNotFoundError:
+        # Let the loader surface the usual "file not found" message.
+        needed = ["features"] if serves_compact(paths) else [
+            "model", "features"]
+        for key in needed:
+            if not os.path.exists(paths[key]):
+                load_pkl_file(paths[key])
+        raise
+
+    loaded = _models.get(version)
+    if loaded is not None and loaded.model_hash == content_hash:
+        return loaded
+
+    with _lock:
+        loaded = _models.get(version)
+        if loaded is not None and loaded.model_hash == content_hash:
+            return loaded
+
+        if serves_compact(paths):
+            # Memory-mapped arrays; the sklearn pickle is never loaded
+            engine = model = load_compact_model(paths["compact"])
+        else:
+            model = load_pkl_file(paths["model"])
+            engine = compile_engine(model)
+
+        loaded = LoadedModel(
+            version=version,
+            model=model,
+            model_features=load_pkl_file(paths["features"]),
+            model_hash=content_hash,
+            engine=engine,
+        )
+
+        # Keep the serving version plus the one just requested.
+        keep = {version, current_version()}
+        for stale in [v for v in _models if v not in keep]:
+            del _models[stale]
+        _models[version] = loaded
+
+    return loaded
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+# Above this many points, scatter plots switch to a binned density view
+DENSITY_THRESHOLD = 20_000
+DENSITY_BINS = 120
+
+
+def density_grid(x, y, bins: int = DENSITY_BINS):
+    """
+    Count points per cell of a `bins` x `bins` grid spanning the data.
+
+    Returns:
+        tuple: (counts with shape (bins, bins) indexed [x, y], x edges,
+        y edges)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return np.histogram2d(x, y, bins=bins)
+
+
+def scatter_or_density(ax, x, y, alpha: float = 0.4,
+                       threshold: int = DENSITY_THRESHOLD,
+                       bins: int = DENSITY_BINS, **scatter_kwargs) -> str:
+    """
+    Draw `y` against `x` on `ax`: every point while there are at most
+    `threshold` of them, otherwise a log-scaled 2D histogram whose cost to
+    draw (and size as an image) doesn't grow with the number of points.
+
+    Returns:
+        str: "scatter" or "density", the mode that was used.
+    """
+    if len(x) <= threshold:
+        ax.scatter(x, y, alpha=alpha, **scatter_kwargs)
+        return "scatter"
+
+    from matplotlib.colors import LogNorm
+
+    counts, x_edges, y_edges = density_grid(x, y, bins=bins)
+    # empty cells stay blank instead of taking the lowest colour
+    counts = np.ma.masked_equal(counts.T, 0)
+    mesh = ax.pcolormesh(
+        x_edges, y_edges, counts, norm=LogNorm(), cmap="viridis",
+        shading="flat",
+    )
+    ax.figure.colorbar(mesh, ax=ax, label="Points per bin")
+    return "density"
+
+
+def waterfall(ax, base: float, contributions, labels=None,
+              base_label: str = "Average site",
+              total_label: str = "This profile") -> None:
+    """
+    Draw a horizontal waterfall on `ax`: starting from `base`, one bar per
+    contribution (largest first, top to bottom), ending at their sum.
+    Increases are red and decreases green, as the bars are costs.
+    """
+    contributions = np.asarray(contributions, dtype=float)
+    labels = list(labels) if labels is not None else [
+        str(i) for i in range(len(contributions))
+    ]
+    order = np.argsort(-np.abs(contributions), kind="stable")
+    steps = contributions[order]
+    starts = base + np.concatenate([[0.0], np.cumsum(steps)[:-1]])
+    total = base + steps.sum()
+
+    positions = np.arange(len(steps) + 2)[::-1]
+    ax.barh(positions[0], base, color="tab:gray")
+    ax.barh(positions[1:-1], steps, left=starts,
+            color=np.where(steps >= 0, "tab:red", "tab:green"))
+    ax.barh(positions[-1], total, color="tab:blue")
+
+    for position, start, step in zip(positions[1:-1], starts, steps):
+        ax.annotate(f"{step:+,.0f}", (max(start, start + step), position),
+                    xytext=(3, 0), textcoords="offset points",
+                    va="center", fontsize=8)
+    ax.set_yticks(
+        positions,
+        [f"{base_label} ({base:,.0f})"]
+        + [labels[i] for i in order]
+        + [f"{total_label} ({total:,.0f})"],
+    )
+    ax.axvline(base, color="tab:gray", linewidth=0.8, linestyle=":")
+
+    # Zoom on the steps; the base and total bars run off the left edge
+    ends = np.concatenate([[base, total], starts, starts + steps])
+    pad = max(ends.max() - ends.min(), 1.0) * 0.1
+    ax.set_xlim(ends.min() - pad, ends.max() + 2 * pad)
+
+
+def importance_bars(ax, table) -> None:
+    """
+    Draw permutation importances (most important at the top) with their
+    confidence intervals as error bars. `table` has the columns `input`,
+    `importance`, `ci_low` and `ci_high`.
+    """
+    ordered = table.iloc[::-1]
+    error = np.vstack([
+        ordered["importance"] - ordered["ci_low"],
+        ordered["ci_high"] - ordered["importance"],
+    ])
+    ax.barh(ordered["input"], ordered["importance"], xerr=error,
+            capsize=3, color="tab:blue")
+    ax.axvline(0, color="tab:gray", linewidth=0.8)
+    ax.set_xlabel("Drop in test R² when the input is shuffled")
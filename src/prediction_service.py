@@ -0,0 +1,258 @@
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from src import metrics
+from src.model_registry import get_model
+from src.machine_learning.feature_engineering import (
+    PROFILE_COLUMNS, STRUCTURE_TYPES)
+from src.machine_learning.predict_electricity_cost import (
+    prepare_features_batch, predict_cost_batch)
+
+
+def validate_profile(profile) -> dict:
+    """
+    Check a single site profile from a request body and return it with
+    numeric fields coerced to float/int. NaN and infinite values are
+    rejected, so one profile can't fail the batch it is scored in, and so
+    is a fractional resident count rather than silently truncated.
+
+    Raises:
+        ValueError: describing the first problem found.
+    """
+    if not isinstance(profile, dict):
+        raise ValueError("Each site profile must be a JSON object.")
+
+    missing = [c for c in PROFILE_COLUMNS if c not in profile]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    if profile["structure_type"] not in STRUCTURE_TYPES:
+        raise ValueError(
+            f"Unknown structure type `{profile['structure_type']}`."
+        )
+
+    clean = {"structure_type": profile["structure_type"]}
+    for col in PROFILE_COLUMNS[:-1]:
+        try:
+            clean[col] = float(profile[col])
+        except (TypeError, ValueError):
+            raise ValueError(f"Field `{col}` must be numeric.") from None
+        if not math.isfinite(clean[col]):
+            raise ValueError(f"Field `{col}` must be a finite number.")
+    if not clean["resident_count"].is_integer():
+        raise ValueError("Field `resident_count` must be a whole number.")
+    clean["resident_count"] = int(clean["resident_count"])
+    return clean
+
+
+class MicroBatcher:
+    """
+    Collect concurrent prediction requests for up to `window_ms` (or until
+    `max_batch` profiles are waiting) and score them in one vectorised
+    predict call on a single worker thread.
+    """
+
+    def __init__(self, window_ms: float = 5.0, max_batch: int = 512):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.profiles = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, profile: dict) -> Future:
+        """Queue one validated profile; the future resolves to a dict."""
+        future = Future()
+        self._queue.put((profile, future))
+        return future
+
+    def _collect(self) -> list:
+        """Block for the first request, then gather more within the window."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _score(profiles: list) -> list:
+        """Predict a list of profiles in one call; returns result dicts."""
+        loaded = get_model()
+        X_batch = prepare_features_batch(
+            site_profiles=pd.DataFrame(profiles),
+            model_features=loaded.model_features
+        )
+        preds = predict_cost_batch(
+            model=loaded.predictor(len(profiles)), X=X_batch
+        )
+        return [
+            {"prediction": round(float(pred), 2),
+             "model_version": loaded.version}
+            for pred in preds
+        ]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.profiles += len(batch)
+            try:
+                results = self._score([profile for profile, _ in batch])
+            except Exception:
+                # Score one by one, so a profile that fails only fails
+                # its own request
+                for profile, future in batch:
+                    try:
+                        future.set_result(self._score([profile])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "profiles": self.profiles,
+            "mean_batch_size": (
+                self.profiles / self.batches if self.batches else 0.0
+            ),
+            "queued": self._queue.qsize(),
+        }
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints:
+        POST /predict  body: one profile object, or {"profiles": [...]}
+        GET  /health   current model version
+        GET  /stats    micro-batching counters
+        GET  /metrics  Prometheus text format (if metrics are enabled)
+    """
+    batcher = None
+    timeout_s = 30.0
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            try:
+                loaded = get_model()
+            except Exception as e:
+                self._send_json(503, {
+                    "status": "unavailable",
+                    "error": f"Model could not be loaded: {e}",
+                })
+                return
+            self._send_json(200, {
+                "status": "ok",
+                "model_version": loaded.version,
+                "model_hash": loaded.model_hash,
+            })
+        elif self.path == "/stats":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/metrics" and metrics.ENABLED:
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            single = not (
+                isinstance(payload, dict) and "profiles" in payload
+            )
+            profiles = [payload] if single else payload["profiles"]
+            if not isinstance(profiles, list):
+                raise ValueError("`profiles` must be a list.")
+            profiles = [validate_profile(p) for p in profiles]
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            self._send_json(400, {"error": str(e)})
+            return
+
+        futures = [self.batcher.submit(p) for p in profiles]
+        try:
+            results = [f.result(timeout=self.timeout_s) for f in futures]
+        except Exception as e:
+            self._send_json(500, {"error": f"Prediction failed: {e}"})
+            return
+
+        self._send_json(200, results[0] if single else {"results": results})
+
+    def log_message(self, format, *args):
+        """Silence per-request logging; it dominates under load."""
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for bursty clients."""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def serve(host: str = "127.0.0.1", port: int = 8502,
+          window_ms: float = 5.0, max_batch: int = 512):
+    """Start the prediction service and block until interrupted."""
+    get_model()  # load the model before accepting traffic
+    PredictionHandler.batcher = MicroBatcher(
+        window_ms=window_ms, max_batch=max_batch
+    )
+    server = PredictionServer((host, port), PredictionHandler)
+    print(f"Serving predictions on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local HTTP/JSON electricity cost prediction service."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument(
+        "--window-ms", type=float, default=5.0,
+        help="How long to gather concurrent requests into one batch."
+    )
+    parser.add_argument("--max-batch", type=int, default=512)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.window_ms, args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
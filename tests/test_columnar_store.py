@@ -0,0 +1,100 @@
+"""
+Columnar copies of CSV files: built on a cold read and used only while
+they still match the CSV's content.
+
+    python -m pytest tests
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.columnar_store import (
+    build_store, columnar_path, is_fresh, read_columnar, read_table)
+
+
+def in_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy memory-mapped columns into plain arrays for comparison."""
+    return pd.DataFrame({name: np.array(df[name]) for name in df.columns})
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "sites.csv"
+    pd.DataFrame({
+        "site_area": [1200, 2500, 900],
+        "water_consumption": [1500.5, 2200.0, 800.25],
+        "structure_type": ["Commercial", "Residential", "Industrial"],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_cold_read_builds_store(csv_path):
+    assert not os.path.exists(columnar_path(csv_path))
+
+    df = in_memory(read_table(csv_path))
+
+    assert is_fresh(csv_path)
+    pd.testing.assert_frame_equal(
+        in_memory(read_columnar(columnar_path(csv_path))), df
+    )
+    pd.testing.assert_frame_equal(in_memory(read_table(csv_path)), df)
+    # only the finished store is left next to the CSV
+    assert sorted(os.listdir(os.path.dirname(csv_path))) == [
+        "sites.columnar", "sites.csv"]
+
+
+def test_cold_read_in_read_only_directory(csv_path):
+    directory = os.path.dirname(csv_path)
+    os.chmod(directory, 0o555)
+    try:
+        if os.access(directory, os.W_OK):
+            pytest.skip("running as a user that ignores permissions")
+        df = read_table(csv_path)
+    finally:
+        os.chmod(directory, 0o755)
+
+    assert list(df["site_area"]) == [1200, 2500, 900]
+    assert not os.path.exists(columnar_path(csv_path))
+
+
+def test_store_built_in_chunks_matches_csv(csv_path):
+    # The first chunk's water_consumption parses as integers and its
+    # structure_type is shorter than the second chunk's
+    df = pd.DataFrame({
+        "site_area": [1200, 2500, 900],
+        "water_consumption": [1500, 2200, 800.25],
+        "structure_type": ["Mixed-use", "Commercial", "Residential"],
+    })
+    df.to_csv(csv_path, index=False)
+
+    build_store(csv_path, chunk_rows=2)
+
+    pd.testing.assert_frame_equal(
+        in_memory(read_columnar(columnar_path(csv_path))),
+        pd.read_csv(csv_path),
+    )
+
+
+def test_rewritten_csv_makes_the_store_stale(csv_path):
+    read_table(csv_path)
+    assert is_fresh(csv_path)
+
+    # Same size and shape, different content
+    df = pd.read_csv(csv_path)
+    df["site_area"] = [2100, 5200, 900]
+    df.to_csv(csv_path, index=False)
+
+    assert not is_fresh(csv_path)
+    assert list(read_table(csv_path)["site_area"]) == [2100, 5200, 900]
+    assert is_fresh(csv_path)
+
+
+def test_store_without_its_csv_is_still_used(csv_path):
+    read_table(csv_path)
+    os.remove(csv_path)
+
+    # Deployments may ship only the columnar copy
+    assert is_fresh(csv_path)
+    assert list(read_table(csv_path)["site_area"]) == [1200, 2500, 900]
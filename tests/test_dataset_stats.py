@@ -0,0 +1,91 @@
+"""
+Dataset statistics computed a chunk at a time: exact quantiles, and the
+same summary whatever the chunk size or whether the data is in memory
+or memory-mapped.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset_stats import (
+    compute_dataset_stats, quantiles, rebuild_dataset_stats,
+    read_dataset_stats)
+from src.machine_learning.schema import standardise_columns
+
+
+CLEANED_PATH = "outputs/datasets/cleaned/ElectricityCostCleaned.csv"
+RAW_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+
+ROWS = 1000
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(0).normal(size=1001),
+    # heavy ties
+    np.random.default_rng(1).integers(0, 4, size=999).astype(float),
+    np.r_[np.zeros(500), 1e-300, np.ones(3)],
+    np.array([7.0]),
+], ids=["normal", "ties", "tiny_gap", "single"])
+@pytest.mark.parametrize("chunk_rows", [7, 100_000])
+def test_quantiles_match_pandas(values, chunk_rows):
+    assert quantiles(values, QUANTILES, chunk_rows) == (
+        pd.Series(values).quantile(QUANTILES).tolist()
+    )
+
+
+@pytest.fixture(scope="module")
+def frames():
+    df = pd.read_csv(CLEANED_PATH).head(ROWS)
+    df_raw = standardise_columns(pd.read_csv(RAW_PATH).head(ROWS))
+    return df, df_raw
+
+
+def test_stats_do_not_depend_on_chunk_size(frames):
+    df, df_raw = frames
+    whole = compute_dataset_stats(df, df_raw, chunk_rows=ROWS)
+    chunked = compute_dataset_stats(
+        df, [df_raw.iloc[:300], df_raw.iloc[300:]], chunk_rows=64
+    )
+
+    assert chunked["columns"] == whole["columns"]
+    assert chunked["value_counts"] == whole["value_counts"]
+    np.testing.assert_allclose(
+        chunked["correlation"]["matrix"], whole["correlation"]["matrix"],
+        atol=1e-6,
+    )
+
+
+def test_stats_match_pandas(frames):
+    df, df_raw = frames
+    stats = compute_dataset_stats(df, df_raw, chunk_rows=64)
+
+    cost = stats["columns"]["electricity_cost"]
+    assert cost["mean"] == pytest.approx(df["electricity_cost"].mean())
+    assert [cost["q25"], cost["median"], cost["q75"]] == (
+        df["electricity_cost"].quantile(QUANTILES).tolist()
+    )
+    numeric = df.select_dtypes(include=["int64", "float64"])
+    np.testing.assert_allclose(
+        stats["correlation"]["matrix"], numeric.corr().round(6), atol=2e-6
+    )
+    assert stats["value_counts"]["structure_type"] == (
+        df_raw["structure_type"].value_counts().to_dict()
+    )
+
+
+def test_rebuild_reads_the_given_paths(frames, tmp_path):
+    df, df_raw = frames
+    csv_path = str(tmp_path / "cleaned.csv")
+    raw_path = str(tmp_path / "raw.csv")
+    stats_path = str(tmp_path / "stats.json")
+    df.to_csv(csv_path, index=False)
+    pd.read_csv(RAW_PATH).head(ROWS).to_csv(raw_path, index=False)
+
+    rebuild_dataset_stats(stats_path, csv_path, raw_path, chunk_rows=64)
+
+    stats = read_dataset_stats(stats_path)
+    assert stats["rows"] == ROWS
+    assert stats["columns"] == compute_dataset_stats(df, df_raw)["columns"]
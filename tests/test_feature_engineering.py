@@ -0,0 +1,80 @@
+"""
+Validation in the feature transformer shared by live predictions,
+batch uploads and training: bad profiles are rejected with the column
+and row at fault instead of producing NaN features.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.machine_learning.feature_engineering import (
+    MODEL_FEATURES, ElectricityFeatureEngineer)
+
+
+@pytest.fixture
+def profiles():
+    return pd.DataFrame({
+        "site_area": [1200, 2500, 900],
+        "water_consumption": [1500.5, 2200.0, 800.25],
+        "recycling_rate": [50, 65, 30],
+        "utilisation_rate": [70, 85, 40],
+        "air_quality_index": [90, 120, 60],
+        "issue_resolution_time": [12, 24, 6],
+        "resident_count": [0, 40, 250],
+        "structure_type": ["Commercial", "Residential", "Industrial"],
+    })
+
+
+@pytest.fixture
+def engineer():
+    return ElectricityFeatureEngineer().fit(None)
+
+
+def test_transform_builds_model_features(engineer, profiles):
+    X = engineer.transform(profiles)
+
+    assert list(X.columns) == MODEL_FEATURES
+    assert np.isfinite(X.to_numpy(dtype=float)).all()
+    np.testing.assert_allclose(
+        X["water_consumption_log"], np.log1p(profiles["water_consumption"])
+    )
+
+
+def test_numeric_strings_are_accepted(engineer, profiles):
+    as_text = profiles.astype({"site_area": str, "resident_count": str})
+
+    pd.testing.assert_frame_equal(
+        engineer.transform(as_text).astype(float),
+        engineer.transform(profiles).astype(float),
+    )
+
+
+@pytest.mark.parametrize("value", ["unknown", np.inf, -np.inf])
+def test_values_that_arent_finite_numbers_are_rejected(engineer, profiles,
+                                                       value):
+    profiles["resident_count"] = profiles["resident_count"].astype(object)
+    profiles.loc[1, "resident_count"] = value
+
+    with pytest.raises(ValueError, match=r"resident_count \(row\(s\) 1\)"):
+        engineer.transform(profiles)
+
+
+def test_missing_values_are_rejected(engineer, profiles):
+    profiles.loc[2, "air_quality_index"] = np.nan
+
+    with pytest.raises(ValueError, match="Missing values.*air_quality"):
+        engineer.transform(profiles)
+
+
+def test_missing_columns_are_rejected(engineer, profiles):
+    with pytest.raises(ValueError, match="Missing required columns"):
+        engineer.transform(profiles.drop(columns="recycling_rate"))
+
+
+def test_unknown_structure_type_is_rejected(engineer, profiles):
+    profiles.loc[0, "structure_type"] = "Warehouse"
+
+    with pytest.raises(ValueError, match="Unknown structure type.*Warehouse"):
+        engineer.transform(profiles)
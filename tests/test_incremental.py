@@ -0,0 +1,97 @@
+"""
+The promotion gate of incremental updates, which scores the base
+version's rows and the new records separately, and the deferral of an
+update until enough new records arrive to hold some out.
+
+    python -m pytest tests
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.model_registry import MODEL_ROOT, read_manifest
+from src.machine_learning.incremental import (
+    MIN_HOLDOUT_ROWS, append_records, holdout_rows, promotion_gate,
+    update_model)
+
+
+RAW_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+
+OLD_TRAIN_ROWS = 2000
+OLD_TEST_ROWS = 500
+
+
+def split_predictions(rng, split: str, rows: int, noise: float):
+    actual = rng.normal(2800, 900, rows)
+    return pd.DataFrame({
+        "split": split,
+        "actual": actual,
+        "predicted": actual + rng.normal(0, noise, rows),
+    })
+
+
+def evaluation_predictions(new_train_noise: float,
+                           new_test_rows: int = 100) -> pd.DataFrame:
+    """
+    Stored-evaluation predictions of an updated version: train rows (old
+    then new) followed by test rows (old then new). The old rows fit
+    well; the new hold-out has an RMSE of about 250.
+    """
+    rng = np.random.default_rng(0)
+    return pd.concat([
+        split_predictions(rng, "train", OLD_TRAIN_ROWS, 50),
+        split_predictions(rng, "train", 400, new_train_noise),
+        split_predictions(rng, "test", OLD_TEST_ROWS, 150),
+        split_predictions(rng, "test", new_test_rows, 250),
+    ], ignore_index=True)
+
+
+def test_gate_passes_when_both_parts_meet_the_criteria():
+    gate = promotion_gate(evaluation_predictions(new_train_noise=230),
+                          OLD_TRAIN_ROWS, OLD_TEST_ROWS)
+
+    assert gate["old_test"]["status"] == "pass"
+    assert gate["old_test"]["rows"] == OLD_TEST_ROWS
+    # Judged against its own train rows (R² about 0.94), not the pooled
+    # train R² the old rows push above 0.99
+    assert gate["new_holdout"]["metrics"]["r2_train"] < 0.95
+    assert gate["new_holdout"]["status"] == "pass"
+    assert gate["promote"]
+
+
+def test_gate_fails_when_the_new_rows_are_overfitted():
+    gate = promotion_gate(evaluation_predictions(new_train_noise=20),
+                          OLD_TRAIN_ROWS, OLD_TEST_ROWS)
+
+    assert gate["old_test"]["status"] == "pass"
+    assert gate["new_holdout"]["status"] == "fail"
+    assert not gate["promote"]
+
+
+def test_gate_fails_on_a_hold_out_too_small_to_score():
+    gate = promotion_gate(
+        evaluation_predictions(new_train_noise=230, new_test_rows=1),
+        OLD_TRAIN_ROWS, OLD_TEST_ROWS,
+    )
+
+    assert gate["new_holdout"] == {"rows": 1, "status": "too_few_rows"}
+    assert not gate["promote"]
+
+
+def test_update_is_deferred_until_a_hold_out_can_be_scored(tmp_path):
+    log_path = str(tmp_path / "labelled_records.jsonl")
+    records = pd.read_csv(RAW_PATH).head(3)
+    assert holdout_rows(len(records)) < MIN_HOLDOUT_ROWS
+    append_records(records, log_path)
+    manifest = read_manifest()
+    versions = sorted(os.listdir(MODEL_ROOT))
+
+    version, summary = update_model(base_version="v1", log_path=log_path)
+
+    assert version is None
+    assert summary["status"] == "deferred"
+    assert summary["new_records"] == 3
+    # nothing was published
+    assert read_manifest() == manifest
+    assert sorted(os.listdir(MODEL_ROOT)) == versions
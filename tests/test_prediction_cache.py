@@ -0,0 +1,95 @@
+"""
+The shared prediction cache: least-recently-used eviction, time-to-live
+and dropping every entry when the serving model changes.
+
+    python -m pytest tests
+"""
+import pytest
+
+from src.machine_learning import predict_electricity_cost
+from src.machine_learning.predict_electricity_cost import (
+    PredictionCache, canonical_profile)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.monotonic for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(predict_electricity_cost.time, "monotonic",
+                        lambda: now[0])
+    return now
+
+
+def test_hit_and_miss_counters():
+    cache = PredictionCache(maxsize=4)
+    assert cache.get("m1", ("a",)) is None
+    cache.put("m1", ("a",), (2500.0, 2200.0, 2800.0))
+
+    assert cache.get("m1", ("a",)) == (2500.0, 2200.0, 2800.0)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2)
+    cache.put("m1", ("a",), 1.0)
+    cache.put("m1", ("b",), 2.0)
+    cache.get("m1", ("a",))  # "b" is now the least recently used
+    cache.put("m1", ("c",), 3.0)
+
+    assert cache.get("m1", ("b",)) is None
+    assert cache.get("m1", ("a",)) == 1.0
+    assert cache.get("m1", ("c",)) == 3.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss(clock):
+    cache = PredictionCache(maxsize=4, ttl=60)
+    cache.put("m1", ("a",), 1.0)
+
+    clock[0] += 59
+    assert cache.get("m1", ("a",)) == 1.0
+    clock[0] += 2
+    assert cache.get("m1", ("a",)) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_new_model_hash_evicts_previous_entries():
+    cache = PredictionCache(maxsize=4)
+    cache.put("m1", ("a",), 1.0)
+    cache.put("m1", ("b",), 2.0)
+
+    assert cache.get("m2", ("a",)) is None
+    assert cache.stats()["evictions"] == 2
+    cache.put("m2", ("a",), 10.0)
+    # going back to the old model doesn't bring its entries back
+    assert cache.get("m1", ("a",)) is None
+
+
+def test_clear_resets_entries_and_counters():
+    cache = PredictionCache(maxsize=1)
+    cache.put("m1", ("a",), 1.0)
+    cache.put("m1", ("b",), 2.0)
+    cache.get("m1", ("b",))
+    cache.get("m1", ("a",))
+
+    cache.clear()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"],
+            stats["size"]) == (0, 0, 0, 0)
+
+
+def test_canonical_profile_ignores_key_order_and_number_type():
+    profile = {
+        "site_area": 1200, "water_consumption": 2500.0,
+        "recycling_rate": 50, "utilisation_rate": 70,
+        "air_quality_index": 90, "issue_resolution_time": 12,
+        "resident_count": 40.0, "structure_type": "Commercial",
+    }
+    reordered = dict(reversed(list(profile.items())))
+    reordered["site_area"] = 1200.0
+    reordered["resident_count"] = 40
+
+    assert canonical_profile(profile) == canonical_profile(reordered)
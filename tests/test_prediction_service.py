@@ -0,0 +1,102 @@
+"""
+The prediction service's request validation and micro-batching: each
+profile is checked on its own, concurrent requests are scored together,
+and a profile that fails only fails its own request.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model_registry import get_model
+from src.prediction_service import MicroBatcher, validate_profile
+from src.machine_learning.predict_electricity_cost import (
+    predict_cost_batch, prepare_features_batch)
+
+
+PROFILE = {
+    "site_area": 1200,
+    "water_consumption": 2500.0,
+    "recycling_rate": 50,
+    "utilisation_rate": 70,
+    "air_quality_index": 90,
+    "issue_resolution_time": 12,
+    "resident_count": 40,
+    "structure_type": "Commercial",
+}
+
+# Long enough for every submitted profile to join the first batch
+WINDOW_MS = 500
+
+
+def test_valid_profile_is_coerced():
+    clean = validate_profile({**PROFILE, "site_area": "1200",
+                              "resident_count": 40.0})
+
+    assert clean["site_area"] == 1200.0
+    assert isinstance(clean["resident_count"], int)
+    assert clean["resident_count"] == 40
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"site_area": None}, "`site_area` must be numeric"),
+    ({"recycling_rate": "high"}, "`recycling_rate` must be numeric"),
+    ({"air_quality_index": float("nan")}, "must be a finite number"),
+    ({"utilisation_rate": float("inf")}, "must be a finite number"),
+    ({"resident_count": 12.7}, "`resident_count` must be a whole number"),
+    ({"structure_type": "Warehouse"}, "Unknown structure type"),
+])
+def test_invalid_profile_is_rejected(change, message):
+    with pytest.raises(ValueError, match=message):
+        validate_profile({**PROFILE, **change})
+
+
+def test_missing_fields_and_non_objects_are_rejected():
+    with pytest.raises(ValueError, match="Missing required fields: site_area"):
+        validate_profile({k: v for k, v in PROFILE.items()
+                          if k != "site_area"})
+    with pytest.raises(ValueError, match="JSON object"):
+        validate_profile([PROFILE])
+
+
+@pytest.fixture
+def profiles():
+    rng = np.random.default_rng(0)
+    return [
+        validate_profile({
+            **PROFILE,
+            "site_area": int(rng.integers(500, 5000)),
+            "resident_count": int(rng.integers(0, 500)),
+        })
+        for _ in range(10)
+    ]
+
+
+def test_concurrent_requests_are_scored_in_one_batch(profiles):
+    batcher = MicroBatcher(window_ms=WINDOW_MS)
+    futures = [batcher.submit(profile) for profile in profiles]
+    results = [future.result(timeout=30) for future in futures]
+
+    loaded = get_model()
+    X = prepare_features_batch(pd.DataFrame(profiles), loaded.model_features)
+    expected = predict_cost_batch(loaded.predictor(len(X)), X)
+
+    np.testing.assert_allclose(
+        [r["prediction"] for r in results], expected.round(2)
+    )
+    assert {r["model_version"] for r in results} == {loaded.version}
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["profiles"] == len(profiles)
+
+
+def test_failing_profile_only_fails_its_own_request(profiles):
+    batcher = MicroBatcher(window_ms=WINDOW_MS)
+    # Skipped validation: this profile makes the whole batch fail
+    bad = {**profiles[0], "structure_type": "Warehouse"}
+    futures = [batcher.submit(p) for p in [profiles[0], bad, profiles[1]]]
+
+    assert futures[0].result(timeout=30)["prediction"] > 0
+    assert futures[2].result(timeout=30)["prediction"] > 0
+    with pytest.raises(ValueError, match="Warehouse"):
+        futures[1].result(timeout=30)
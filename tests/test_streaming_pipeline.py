@@ -0,0 +1,79 @@
+"""
+The chunked cleaning pipeline writes the same cleaned dataset, and the
+same columnar copy, as cleaning the whole raw file at once.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.columnar_store import columnar_path, is_fresh, read_columnar
+from src.machine_learning.feature_engineering import build_cleaned_dataset
+from src.machine_learning.streaming_pipeline import build_cleaned_csv
+
+
+RAW_PATH = "inputs/datasets/raw/electricity_cost_dataset.csv"
+
+RAW_ROWS = 230
+CHUNK_ROWS = 50
+
+
+@pytest.fixture
+def raw(tmp_path):
+    df = pd.read_csv(RAW_PATH).head(RAW_ROWS)
+    path = tmp_path / "raw.csv"
+    df.to_csv(path, index=False)
+    return df, str(path)
+
+
+def test_chunked_output_matches_whole_file(raw, tmp_path):
+    df, raw_path = raw
+    output_path = str(tmp_path / "cleaned.csv")
+
+    report = build_cleaned_csv(raw_path, output_path, CHUNK_ROWS)
+
+    expected = build_cleaned_dataset(df)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), expected)
+    assert report["rows_written"] == RAW_ROWS
+    assert report["rows_dropped"] == 0
+
+    # The columnar copy is rebuilt from the new file, chunk by chunk
+    assert report["rebuilt"] == [columnar_path(output_path)]
+    assert is_fresh(output_path)
+    store = read_columnar(columnar_path(output_path))
+    pd.testing.assert_frame_equal(
+        pd.DataFrame({name: np.array(store[name]) for name in store}),
+        expected,
+    )
+
+
+def test_invalid_row_stops_the_pipeline(raw, tmp_path):
+    df, raw_path = raw
+    df["resident count"] = df["resident count"].astype(object)
+    df.loc[120, "resident count"] = "unknown"
+    df.to_csv(raw_path, index=False)
+
+    # line 122: 1-based, after the header
+    with pytest.raises(ValueError,
+                       match=r"1 invalid row\(s\) at line\(s\) 122"):
+        build_cleaned_csv(raw_path, str(tmp_path / "cleaned.csv"),
+                          CHUNK_ROWS)
+
+
+def test_invalid_rows_can_be_dropped(raw, tmp_path):
+    df, raw_path = raw
+    df["resident count"] = df["resident count"].astype(object)
+    df.loc[120, "resident count"] = "unknown"
+    df.loc[121, "structure type"] = "Warehouse"
+    df.to_csv(raw_path, index=False)
+    output_path = str(tmp_path / "cleaned.csv")
+
+    report = build_cleaned_csv(raw_path, output_path, CHUNK_ROWS,
+                               drop_invalid=True)
+
+    valid = pd.read_csv(RAW_PATH).head(RAW_ROWS).drop(index=[120, 121])
+    expected = build_cleaned_dataset(valid).reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), expected)
+    assert report["rows_dropped"] == 2
+    assert report["rows_written"] == RAW_ROWS - 2
@@ -0,0 +1,97 @@
+"""
+Parity of the compiled forest with the scikit-learn model it was built
+from, on the shipped model version's test split. The pickled model is a
+local training artifact, not part of the repository, so a small forest
+is fitted on the version's training split instead.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.machine_learning.tree_engine import CompiledForest, check_parity
+
+
+MODEL_PATH = "outputs/ml_pipeline/electricity_cost/v1"
+
+# float64 node arrays reproduce sklearn up to summation order; the compact
+# artifact stores leaf values as float32
+ATOL = 1e-6
+COMPACT_RTOL = 1e-6
+
+
+@pytest.fixture(scope="module")
+def model():
+    X_train = pd.read_csv(f"{MODEL_PATH}/X_train.csv")
+    y_train = pd.read_csv(f"{MODEL_PATH}/y_train.csv").iloc[:, 0]
+    return RandomForestRegressor(
+        n_estimators=20, min_samples_leaf=3, random_state=0
+    ).fit(X_train, y_train)
+
+
+@pytest.fixture(scope="module")
+def X_test():
+    return pd.read_csv(f"{MODEL_PATH}/X_test.csv")
+
+
+@pytest.fixture(scope="module")
+def expected(model, X_test):
+    return model.predict(X_test)
+
+
+@pytest.fixture(scope="module")
+def engine(model):
+    return CompiledForest.from_sklearn(model)
+
+
+def test_predict_matches_sklearn(engine, X_test, expected):
+    np.testing.assert_allclose(engine.predict(X_test), expected, atol=ATOL)
+
+
+def test_predict_one_matches_sklearn(engine, X_test, expected):
+    single = [engine.predict_one(X_test.iloc[[i]])
+              for i in range(len(X_test))]
+    np.testing.assert_allclose(single, expected, atol=ATOL)
+
+
+def test_check_parity(model, engine, X_test):
+    report = check_parity(model, engine, X_test, atol=ATOL)
+    assert report["parity"], report
+    assert report["rows"] == len(X_test)
+
+
+def test_save_load_round_trip(engine, X_test, expected, tmp_path):
+    file_path = tmp_path / "compiled_forest.npz"
+    engine.save(file_path)
+    loaded = CompiledForest.load(file_path)
+
+    for name in ["feature", "threshold", "left", "right", "value", "roots",
+                 "cover"]:
+        np.testing.assert_array_equal(
+            getattr(loaded, name), getattr(engine, name)
+        )
+    assert loaded.max_depth == engine.max_depth
+    assert loaded.feature_names == engine.feature_names
+    np.testing.assert_allclose(loaded.predict(X_test), expected, atol=ATOL)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_compact_round_trip(engine, X_test, expected, tmp_path, compress):
+    directory = tmp_path / "compact_model"
+    engine.save_compact(str(directory), compress=compress, version="v1")
+    loaded = CompiledForest.load_compact(str(directory))
+
+    assert loaded.n_trees == engine.n_trees
+    assert loaded.n_nodes == engine.n_nodes
+    assert loaded.max_depth == engine.max_depth
+    assert loaded.feature_names == engine.feature_names
+    np.testing.assert_array_equal(loaded.cover, engine.cover)
+    np.testing.assert_allclose(
+        loaded.predict(X_test), expected, rtol=COMPACT_RTOL
+    )
+    np.testing.assert_allclose(
+        [loaded.predict_one(X_test.iloc[[i]]) for i in range(len(X_test))],
+        expected, rtol=COMPACT_RTOL,
+    )